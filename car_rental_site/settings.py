@@ -1,3 +1,5 @@
+import os
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -30,11 +32,16 @@ INSTALLED_APPS = [
 # --------------------
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'rental.middleware.StaticFilesMiddleware',
+    'rental.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',   # обязателен!
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',  # обязателен!
     'django.contrib.messages.middleware.MessageMiddleware',
+    'rental.middleware.ReplicaPinMiddleware',
+    'rental.middleware.BranchScopeMiddleware',
+    'rental.middleware.AuditMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -56,6 +63,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',   # обязателен!
                 'django.contrib.auth.context_processors.auth',  # обязателен!
                 'django.contrib.messages.context_processors.messages',
+                'rental.context_processors.branch_scope',
             ],
         },
     },
@@ -75,9 +83,78 @@ DATABASES = {
         'PASSWORD': '2005',
         'HOST': 'localhost',
         'PORT': '5432',
+        # Таблицы приложения unmanaged (схема ведётся вне миграций), поэтому тестовая база
+        # создаётся копией рабочей: CREATE DATABASE test_car_rental TEMPLATE car_rental.
+        # На время создания к шаблонной базе не должно быть других подключений.
+        'TEST': {'TEMPLATE': os.environ.get("TEST_DB_TEMPLATE", 'car_rental')},
     }
 }
 
+# Реплика для отчётов и дашбордов. Включается переменными окружения;
+# для локальной проверки подойдёт второй Postgres или SQLite
+# (REPLICA_DB_ENGINE=django.db.backends.sqlite3, REPLICA_DB_NAME=/path/to/db).
+if os.environ.get("REPLICA_DB_NAME"):
+    DATABASES['replica'] = {
+        'ENGINE': os.environ.get("REPLICA_DB_ENGINE", 'django.db.backends.postgresql'),
+        'NAME': os.environ["REPLICA_DB_NAME"],
+        'USER': os.environ.get("REPLICA_DB_USER", 'postgres'),
+        'PASSWORD': os.environ.get("REPLICA_DB_PASSWORD", '2005'),
+        'HOST': os.environ.get("REPLICA_DB_HOST", 'localhost'),
+        'PORT': os.environ.get("REPLICA_DB_PORT", '5432'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['rental.db_routers.ReplicaRouter']
+
+TEST_RUNNER = 'rental.test_runner.RentalTestRunner'
+
+# Самая длинная аренда: активные договоры ищем только среди выданных за этот срок,
+# чтобы запрос попадал в последние секции contracts (см. manage.py partition_contracts).
+# Срок проверяют ContractForm и CHECK в базе (миграция 0016): при изменении — новая миграция
+CONTRACTS_MAX_RENTAL_DAYS = 366
+
+# Бронь машины на время оформления договора (rental/holds.py)
+CAR_HOLD_TTL_SECONDS = 600
+CAR_HOLD_LOCK_TIMEOUT_MS = 2000   # сколько ждать блокировку строки машины при сохранении договора
+
+# Готовые PDF-отчёты (rental/report_cache.py): ключ — тип, параметры и версии таблиц.
+# Каталог вне проекта: кеш не должен попадать в git и в сборку
+REPORT_CACHE_DIR = Path(os.environ.get("REPORT_CACHE_DIR", Path(tempfile.gettempdir()) / "car_rental_report_cache"))
+REPORT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Журнал изменений (rental/audit.py): True — фоновым потоком, запрос только кладёт записи
+# в очередь (~15 мкс против ~0,5 мс на INSERT до COMMIT); при сбое базы поток повторяет
+# запись, а не записанную пачку оставляет в логе. False — писать в конце запроса
+AUDIT_ASYNC = True
+
+# Живые показатели главной (rental/live.py, SSE): работают только под ASGI (uvicorn/daphne)
+LIVE_DEBOUNCE_SECONDS = 0.2      # NOTIFY за это время сливаются в один пересчёт
+LIVE_HEARTBEAT_SECONDS = 15      # комментарий-пинг, чтобы прокси не рвали тихое соединение
+LIVE_STREAM_MAX_SECONDS = 300    # после этого браузер переподключается (и получает полный снимок)
+LIVE_RETRY_MS = 3000
+LIVE_QUEUE_SIZE = 20             # столько дельт ждёт медленную вкладку, потом поток закрывается
+LIVE_DAY_CHECK_SECONDS = 60      # как часто проверять смену суток без изменений в базе
+
+# Кеши воркеров (rental/invalidation.py) сбрасываются по NOTIFY; на случай потерянных
+# уведомлений записи сверяются со счётчиками table_versions
+CACHE_BUS_RECHECK_SECONDS = 30    # пока слушатель LISTEN на связи
+CACHE_BUS_FALLBACK_SECONDS = 2    # пока слушателя нет (старт, обрыв соединения)
+FLEET_CHANGES_KEEP_HOURS = 24     # журнал cars_changes для снимка парка (rental/fleet.py)
+# журнал contract_month_changes для инкрементальной выгрузки (rental/exports.py): выгрузка,
+# запущенная реже, пересчитывает подписи всех месяцев
+EXPORT_CHANGES_KEEP_DAYS = 35
+
+LIST_PAGE_ROWS = 50               # строк в списках и в каждой порции поиска по мере ввода
+LIST_MAX_OFFSET = 10_000          # «Показать ещё» дальше не листает — дальше нужен поиск
+
+APPROX_COUNT_THRESHOLD = 100_000  # выше — оценка планировщика вместо COUNT(*)
+
+COMPRESSION_MIN_SIZE = 1024      # ответы меньше этого размера не сжимаем (байт)
+
+REPLICA_STICKY_SECONDS = 10       # после POST читаем с default столько секунд
+REPLICA_MAX_LAG_SECONDS = 5       # при большем отставании — fallback на default; None — не проверять
+REPLICA_LAG_CHECK_INTERVAL = 2    # как часто перепроверять отставание (сек)
+
 
 # --------------------
 # PASSWORD VALIDATION
@@ -102,6 +179,14 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [
      BASE_DIR / 'rental' / 'static',
 ]
+STATIC_ROOT = BASE_DIR / 'staticfiles'   # manage.py collectstatic
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    # имена с хешем содержимого + .gz/.br копии (brotli — если установлен)
+    "staticfiles": {"BACKEND": "rental.staticfiles.CompressedManifestStaticFilesStorage"},
+}
+STATIC_MAX_AGE = 60 * 60 * 24 * 365   # хешированные файлы кешируются «навсегда»
 
 
 # --------------------
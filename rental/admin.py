@@ -1,8 +1,52 @@
 from django.contrib import admin
-from .models import Clients, Cars, Employees, Contracts, Maintenance
 
-admin.site.register(Clients)
-admin.site.register(Cars)
-admin.site.register(Employees)
-admin.site.register(Contracts)
-admin.site.register(Maintenance)
+from .counts import EstimatedCountPaginator
+from .models import Clients, Cars, Employees, Contracts, Maintenance, PricingRules
+
+
+class FastCountAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+@admin.register(Clients)
+class ClientsAdmin(FastCountAdmin):
+    list_display = ("full_name", "passport", "phone", "email")
+    search_fields = ("full_name", "passport", "phone", "email")
+
+
+@admin.register(Cars)
+class CarsAdmin(FastCountAdmin):
+    list_display = ("plate", "brand", "model", "category", "status", "branch", "daily_price")
+    list_select_related = ("category", "status", "branch")
+    search_fields = ("plate", "vin", "brand", "model")
+
+
+@admin.register(Employees)
+class EmployeesAdmin(FastCountAdmin):
+    list_display = ("full_name", "role", "branch", "phone", "email")
+    list_select_related = ("role", "branch")
+    search_fields = ("full_name", "passport", "email")
+
+
+@admin.register(Contracts)
+class ContractsAdmin(FastCountAdmin):
+    list_display = ("contract_id", "client", "car", "issue_date", "return_date", "total_amount")
+    list_select_related = ("client", "car", "cstatus")
+    raw_id_fields = ("client", "car")
+    search_fields = ("client__full_name", "car__plate")
+
+
+@admin.register(Maintenance)
+class MaintenanceAdmin(FastCountAdmin):
+    list_display = ("maintenance_id", "car", "employee", "service_type", "service_date")
+    list_select_related = ("car", "employee__role")
+    raw_id_fields = ("car", "employee")
+
+
+@admin.register(PricingRules)
+class PricingRulesAdmin(admin.ModelAdmin):
+    list_display = ("name", "category", "branch", "date_from", "date_to", "min_days", "multiplier", "is_active")
+    list_filter = ("is_active", "category", "branch")
+    list_editable = ("multiplier", "is_active")
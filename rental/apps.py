@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class RentalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rental'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .staticfiles import check_vendor_assets, check_vendor_assets_deploy
+
+        checks.register(check_vendor_assets, checks.Tags.staticfiles)
+        checks.register(check_vendor_assets_deploy, checks.Tags.staticfiles, deploy=True)
@@ -0,0 +1,200 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections, router
+from django.utils.timezone import now
+
+from . import partitions
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+CREATE, UPDATE, DELETE = AuditLog.ACTION_CREATE, AuditLog.ACTION_UPDATE, AuditLog.ACTION_DELETE
+
+_REQUEST_ATTR = "_audit_entries"
+_BATCH_SIZE = 500
+_WRITE_ATTEMPTS = 3
+_RETRY_DELAY_SECONDS = 1
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def snapshot(instance):
+    # значения полей до сохранения формы: ModelForm меняет instance ещё в is_valid()
+    return {field.attname: _plain(getattr(instance, field.attname)) for field in instance._meta.concrete_fields}
+
+
+def _changes(action, before, after):
+    if action == UPDATE:
+        return {name: [old, after.get(name)] for name, old in before.items() if after.get(name) != old}
+    if action == CREATE:
+        return {name: [None, value] for name, value in after.items()}
+    return {name: [value, None] for name, value in before.items()}
+
+
+def _add(request, table, object_id, action, changes):
+    user = getattr(request, "user", None)
+    request.__dict__.setdefault(_REQUEST_ATTR, []).append(AuditLog(
+        changed_at=now(),
+        user_id=user.pk if user is not None and user.is_authenticated else None,
+        table_name=table,
+        object_id=object_id,
+        action=action,
+        changes=changes,
+    ))
+
+
+def record(request, instance, action, before=None):
+    # Копит запись в запросе; в базу она уйдёт пачкой после ответа (AuditMiddleware).
+    after = snapshot(instance) if action != DELETE else {}
+    if action == DELETE:
+        before = before or snapshot(instance)
+    changes = _changes(action, before or {}, after)
+    if action == UPDATE and not changes:
+        return
+    _add(request, instance._meta.db_table, instance.pk, action, changes)
+
+
+def snapshot_rows(queryset):
+    # {pk: снимок} для массовых update()/delete() — одним запросом, без загрузки объектов
+    meta = queryset.model._meta
+    names = [field.attname for field in meta.concrete_fields]
+    return {
+        row[meta.pk.attname]: {name: _plain(row[name]) for name in names}
+        for row in queryset.values(*names)
+    }
+
+
+def record_rows(request, model, before, action, after=None):
+    # по записи на строку: before/after — snapshot_rows() до и после изменения
+    for pk, old in before.items():
+        changes = _changes(action, old, (after or {}).get(pk, {}))
+        if action == UPDATE and not changes:
+            continue
+        _add(request, model._meta.db_table, pk, action, changes)
+
+
+def _lost(entry):
+    return {
+        "changed_at": entry.changed_at.isoformat(),
+        "user_id": entry.user_id,
+        "table_name": entry.table_name,
+        "object_id": entry.object_id,
+        "action": entry.action,
+        "changes": entry.changes,
+    }
+
+
+def pending(request):
+    return request.__dict__.pop(_REQUEST_ATTR, [])
+
+
+def write(entries):
+    db = router.db_for_write(AuditLog)
+    try:
+        AuditLog.objects.using(db).bulk_create(entries, batch_size=_BATCH_SIZE)
+    except DatabaseError:
+        # нет секции на текущий месяц — досоздаём и пробуем ещё раз
+        if not _ensure_partitions(db, max(e.changed_at for e in entries)):
+            raise
+        AuditLog.objects.using(db).bulk_create(entries, batch_size=_BATCH_SIZE)
+
+
+def _ensure_partitions(db, moment):
+    connection = connections[db]
+    if connection.vendor != "postgresql":
+        return False
+    until = partitions.next_period(partitions.period_start(moment.date(), "month"), "month")
+    with connection.cursor() as cursor:
+        return bool(partitions.ensure_partitions(cursor, until, "month", table=AuditLog._meta.db_table))
+
+
+class _Writer:
+    # Фоновый поток: собирает записи из всех запросов и пишет их bulk_create пачками,
+    # чтобы представления не ждали INSERT в журнал.
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, entries):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                    self.thread.start()
+                    atexit.register(self.flush)
+        self.queue.put(entries)
+
+    def _drain(self, first):
+        chunks = [first]
+        while sum(len(chunk) for chunk in chunks) < _BATCH_SIZE:
+            try:
+                chunks.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return chunks
+
+    def _run(self):
+        # пока пишется одна пачка, следующие запросы копятся в очереди и уходят одной вставкой
+        while True:
+            chunks = self._drain(self.queue.get())
+            batch = [entry for chunk in chunks for entry in chunk]
+            try:
+                self._write(batch)
+            finally:
+                for _ in chunks:
+                    self.queue.task_done()
+
+    @staticmethod
+    def _write(batch):
+        # база недоступна или соединение оборвалось — повторяем с паузой; если не вышло,
+        # пачка целиком уходит в лог уровня ERROR, чтобы её можно было восстановить
+        for attempt in range(_WRITE_ATTEMPTS):
+            try:
+                close_old_connections()
+                write(batch)
+                return
+            except Exception:
+                if attempt + 1 < _WRITE_ATTEMPTS:
+                    logger.warning("Журнал изменений: попытка %d не удалась", attempt + 1, exc_info=True)
+                    time.sleep(_RETRY_DELAY_SECONDS * 2 ** attempt)
+                    continue
+                logger.exception(
+                    "Не удалось записать %d записей журнала изменений: %s",
+                    len(batch),
+                    json.dumps([_lost(entry) for entry in batch], ensure_ascii=False),
+                )
+
+    def flush(self):
+        # при остановке процесса дожидаемся, пока поток допишет очередь
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.join()
+
+
+writer = _Writer()
+
+
+def submit(entries):
+    if not entries:
+        return
+    # синхронно (AUDIT_ASYNC = False) ошибка записи видна как ошибка запроса, а не только в логе
+    if getattr(settings, "AUDIT_ASYNC", True):
+        writer.submit(entries)
+    else:
+        write(entries)
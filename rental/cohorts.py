@@ -0,0 +1,129 @@
+import io
+from datetime import date
+
+import numpy as np
+from django.db import connections, router
+
+from . import invalidation
+from .db_routers import read_from_replica
+from .models import Contracts
+
+# COPY ... (FORMAT binary) с фиксированной шириной строки читается прямо в структурный массив:
+# int16 число полей, затем для каждого поля int32 длина + значение (всё big-endian)
+_COPY_SQL = """
+    COPY (
+        SELECT client_id, (issue_date - DATE '1970-01-01')::int4, total_amount::float8
+        FROM contracts {where}
+    ) TO STDOUT WITH (FORMAT binary)
+"""
+
+_COPY_DTYPE = np.dtype([
+    ("nfields", ">i2"),
+    ("len_client", ">i4"), ("client", ">i4"),
+    ("len_day", ">i4"), ("day", ">i4"),
+    ("len_amount", ">i4"), ("amount", ">f8"),
+])
+_COPY_HEADER_SIZE = 19
+_COPY_TRAILER_SIZE = 2
+
+
+def _months(days):
+    # дни от 1970-01-01 -> месяцы от января 1970
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+@read_from_replica
+def load_contract_arrays(branch_id=None):
+    # -> (client_id int64, день от 1970-01-01 int64, сумма float64)
+    # branch_id — как в Contracts.objects.for_branch: договоры, выданные филиалом
+    conn = connections[router.db_for_read(Contracts)]
+    if conn.vendor == "postgresql":
+        # COPY не принимает параметры запроса; branch_id — целое из BranchScopeMiddleware
+        where = "" if branch_id is None else f"WHERE issue_branch_id = {int(branch_id)}"
+        buffer = io.BytesIO()
+        with conn.cursor() as cursor:
+            cursor.copy_expert(_COPY_SQL.format(where=where), buffer)
+        raw = buffer.getbuffer()[_COPY_HEADER_SIZE:-_COPY_TRAILER_SIZE]
+        records = np.frombuffer(raw, dtype=_COPY_DTYPE)
+        return (
+            records["client"].astype(np.int64),
+            records["day"].astype(np.int64),
+            records["amount"].astype(np.float64),
+        )
+
+    rows = list(
+        Contracts.objects.using(conn.alias).for_branch(branch_id).order_by()
+        .values_list("client_id", "issue_date", "total_amount")
+    )
+    epoch = date(1970, 1, 1)
+    return (
+        np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)),
+        np.fromiter(((r[1] - epoch).days for r in rows), dtype=np.int64, count=len(rows)),
+        np.fromiter((float(r[2]) for r in rows), dtype=np.float64, count=len(rows)),
+    )
+
+
+def compute_cohorts(client, day, amount):
+    if client.size == 0:
+        return None
+
+    # client_id плотные, поэтому «group by клиент» — это индексация массивом размера max(id)+1
+    month = _months(day)
+    first_month = np.full(int(client.max()) + 1, np.iinfo(np.int64).max)
+    np.minimum.at(first_month, client, month)
+    contracts_per_client = np.bincount(client)
+    has_contracts = contracts_per_client > 0
+
+    first_cohort = int(first_month[has_contracts].min())
+    cohort = first_month[client] - first_cohort
+    offset = month - first_month[client]
+    n_cohorts = int(cohort.max()) + 1
+    width = int(offset.max()) + 1
+    cells = n_cohorts * width
+
+    revenue = np.bincount(cohort * width + offset, weights=amount, minlength=cells).reshape(n_cohorts, width)
+
+    # одна сортировка упакованного ключа (клиент, день) даёт и уникальные пары
+    # (клиент, месяц жизни) для удержания, и интервалы между арендами
+    packed = np.sort((client << 32) | day)
+    sorted_client = packed >> 32
+    sorted_day = packed & 0xFFFFFFFF
+    sorted_month = _months(sorted_day)
+    same_client = sorted_client[1:] == sorted_client[:-1]
+    first_in_month = np.ones(packed.size, dtype=bool)
+    first_in_month[1:] = ~same_client | (sorted_month[1:] != sorted_month[:-1])
+
+    active_client = sorted_client[first_in_month]
+    active_cohort = first_month[active_client] - first_cohort
+    active_offset = sorted_month[first_in_month] - first_month[active_client]
+    active = np.bincount(active_cohort * width + active_offset, minlength=cells).reshape(n_cohorts, width)
+    gaps = np.diff(sorted_day)[same_client]
+
+    sizes = active[:, 0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        retention = np.where(sizes[:, None] > 0, active / sizes[:, None], 0.0)
+        ltv = np.where(sizes[:, None] > 0, np.cumsum(revenue, axis=1) / sizes[:, None], 0.0)
+
+    clients = int(has_contracts.sum())
+    labels = [f"{(first_cohort + i) % 12 + 1:02d}.{1970 + (first_cohort + i) // 12}" for i in range(n_cohorts)]
+    return {
+        "labels": labels,
+        "sizes": sizes,
+        "retention": retention,
+        "ltv": ltv,
+        "clients": clients,
+        "contracts": int(client.size),
+        "repeat_rate": float((contracts_per_client > 1).sum() / clients),
+        "median_gap_days": float(np.median(gaps)) if gaps.size else None,
+        "lifetime_revenue": float(amount.sum() / clients),
+    }
+
+
+@read_from_replica
+def cohort_analysis(branch_id=None):
+    # результат на процесс и филиал, пока в contracts ничего не изменилось;
+    # выгрузка всех договоров — с реплики
+    return invalidation.cache.get_or_set(
+        ("cohorts", branch_id), (Contracts,),
+        lambda: compute_cohorts(*load_contract_arrays(branch_id)), from_replica=True,
+    )
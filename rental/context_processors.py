@@ -0,0 +1,12 @@
+from .models import Branches
+
+
+def branch_scope(request):
+    # переключатель филиала в шапке — только для администраторов
+    user = getattr(request, "user", None)
+    if user is None or not user.is_staff:
+        return {}
+    return {
+        "branch_choices": Branches.objects.order_by("name"),
+        "current_branch_id": getattr(request, "branch_id", None),
+    }
@@ -0,0 +1,65 @@
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# для секционированной таблицы (contracts) берём сумму по секциям —
+# их статистику обновляет autovacuum, а у родителя она только после ручного ANALYZE
+_RELTUPLES_SQL = """
+    SELECT COALESCE(
+        (SELECT SUM(c.reltuples) FILTER (WHERE c.reltuples >= 0)
+         FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+         WHERE i.inhparent = %s::regclass),
+        (SELECT NULLIF(reltuples, -1) FROM pg_class WHERE oid = %s::regclass),
+        -1
+    )::bigint
+"""
+
+
+def _table_estimate(cursor, table):
+    cursor.execute(_RELTUPLES_SQL, [table, table])
+    row = cursor.fetchone()
+    # reltuples = -1, пока таблицу ни разу не анализировали
+    return row[0] if row and row[0] >= 0 else None
+
+
+def _plan_estimate(cursor, queryset):
+    sql, params = queryset.order_by().query.sql_with_params()
+    cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _is_whole_table(queryset):
+    query = queryset.query
+    return not query.where and not query.distinct and not query.is_sliced and not query.combinator
+
+
+def estimated_count(queryset, threshold=None):
+    # точный COUNT(*) для небольших выборок, оценка планировщика — для больших
+    if threshold is None:
+        threshold = getattr(settings, "APPROX_COUNT_THRESHOLD", 100_000)
+
+    conn = connections[queryset.db]
+    if conn.vendor != "postgresql":
+        return queryset.count()
+
+    with conn.cursor() as cursor:
+        if _is_whole_table(queryset):
+            estimate = _table_estimate(cursor, queryset.model._meta.db_table)
+        else:
+            estimate = _plan_estimate(cursor, queryset)
+
+    if estimate is None or estimate < threshold:
+        return queryset.count()
+    return estimate
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list)
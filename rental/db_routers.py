@@ -0,0 +1,87 @@
+import contextvars
+import functools
+import time
+
+from django.conf import settings
+from django.db import connections
+
+REPLICA_ALIAS = "replica"
+
+_use_replica = contextvars.ContextVar("rental_use_replica", default=False)
+_pinned_to_primary = contextvars.ContextVar("rental_pinned_to_primary", default=False)
+
+_lag_state = {"checked_at": 0.0, "ok": True}
+
+_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def _replica_lag_seconds() -> float:
+    conn = connections[REPLICA_ALIAS]
+    if conn.vendor != "postgresql":
+        return 0.0
+    with conn.cursor() as cursor:
+        cursor.execute(_LAG_SQL)
+        return float(cursor.fetchone()[0] or 0)
+
+
+def replica_available() -> bool:
+    if REPLICA_ALIAS not in settings.DATABASES:
+        return False
+
+    max_lag = getattr(settings, "REPLICA_MAX_LAG_SECONDS", None)
+    if max_lag is None:
+        return True
+
+    interval = getattr(settings, "REPLICA_LAG_CHECK_INTERVAL", 2)
+    moment = time.monotonic()
+    if moment - _lag_state["checked_at"] >= interval:
+        try:
+            _lag_state["ok"] = _replica_lag_seconds() <= max_lag
+        except Exception:
+            # реплика недоступна — читаем с основной базы
+            _lag_state["ok"] = False
+        _lag_state["checked_at"] = moment
+    return _lag_state["ok"]
+
+
+def read_from_replica(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _use_replica.set(True)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapper
+
+
+def pin_to_primary(pinned: bool):
+    return _pinned_to_primary.set(pinned)
+
+
+def unpin(token):
+    _pinned_to_primary.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != "rental":
+            return None
+        if _use_replica.get() and not _pinned_to_primary.get() and replica_available():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
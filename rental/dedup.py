@@ -0,0 +1,227 @@
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations, groupby
+from operator import itemgetter
+
+from django.db import connection, transaction
+from django.db.models import CharField, F, Func, Q, Value
+from django.db.models.functions import Lower, Trim
+
+from . import audit, versions
+from .models import ClientDuplicates, Clients, Contracts
+
+_NON_LETTERS_RE = re.compile(r"[^a-zа-я ]+")
+_SPACES_RE = re.compile(r"\s+")
+
+WEIGHTS = {"name": 0.5, "phone": 0.2, "email": 0.2, "birth_date": 0.1}
+
+
+def normalize_name(full_name: str) -> str:
+    name = (full_name or "").lower().replace("ё", "е")
+    return _SPACES_RE.sub(" ", _NON_LETTERS_RE.sub(" ", name)).strip()
+
+
+def normalize_phone(phone: str) -> str:
+    digits = re.sub(r"\D", "", phone or "")
+    if len(digits) == 11 and digits[0] == "8":
+        digits = "7" + digits[1:]
+    return digits
+
+
+def normalize_email(email: str) -> str:
+    return (email or "").strip().lower()
+
+
+class NameKey(Func):
+    # фамилия фонетически (звонкие → глухие, близкие гласные → одна буква, повторы
+    # схлопнуты: «Филлипов» и «Филипов» совпадают) + первая буква имени; функция и
+    # индекс clients_name_key_idx — в миграции 0013
+    function = "rental_name_key"
+    output_field = CharField()
+
+
+def score_pair(a, b):
+    # a, b — кортежи (ФИО, телефон, email, дата рождения) после нормализации
+    name_a, phone_a, email_a, birth_a = a
+    name_b, phone_b, email_b, birth_b = b
+    reasons = []
+    name_similarity = SequenceMatcher(None, name_a, name_b).ratio()
+    score = WEIGHTS["name"] * name_similarity
+    if name_similarity >= 0.85:
+        reasons.append("ФИО")
+    if phone_a and phone_a == phone_b:
+        score += WEIGHTS["phone"]
+        reasons.append("телефон")
+    if email_a and email_a == email_b:
+        score += WEIGHTS["email"]
+        reasons.append("email")
+    if birth_a == birth_b:
+        score += WEIGHTS["birth_date"]
+        reasons.append("дата рождения")
+    return round(score, 3), reasons
+
+
+# клиенты по блокам: строка на каждый ключ клиента (телефон, email, фонетический ключ ФИО),
+# отсортировано по ключу — блок целиком приходит подряд, и в памяти держится только он.
+# Ключи считаются так же, как normalize_phone / normalize_email и индексы для candidates_for()
+_BLOCKS_SQL = r"""
+    WITH keyed AS (
+        SELECT client_id, full_name, phone, email, birth_date, passport,
+               regexp_replace(phone, '\D', '', 'g') AS digits,
+               lower(btrim(email)) AS email_key,
+               rental_name_key(full_name) AS name_key
+        FROM clients
+    )
+    SELECT block, client_id, full_name, phone, email, birth_date, passport FROM (
+        SELECT 'p:' || CASE WHEN length(digits) = 11 AND left(digits, 1) = '8'
+                            THEN '7' || substr(digits, 2) ELSE digits END AS block, *
+        FROM keyed WHERE digits <> ''
+        UNION ALL
+        SELECT 'e:' || email_key, * FROM keyed WHERE email_key <> ''
+        UNION ALL
+        SELECT 'n:' || name_key, * FROM keyed WHERE name_key <> ''
+    ) blocks
+    ORDER BY block, client_id
+"""
+
+# крупный блок (популярная фамилия, общий email) делим дальше: сначала по дате рождения,
+# затем по серии паспорта; что и после этого крупнее max_block — пропускаем
+_SUB_BLOCKS = (
+    lambda client: client[1][3],
+    lambda client: client[2][:4],
+)
+
+
+def iter_blocks(chunk_size=20_000):
+    # -> (ключ, [(client_id, (ФИО, телефон, email, дата рождения), паспорт)])
+    with transaction.atomic(), connection.chunked_cursor() as cursor:
+        cursor.itersize = chunk_size
+        cursor.execute(_BLOCKS_SQL)
+        for block, rows in groupby(cursor, key=itemgetter(0)):
+            yield block, [
+                (client_id, (normalize_name(full_name), normalize_phone(phone), normalize_email(email), birth_date), passport)
+                for _, client_id, full_name, phone, email, birth_date, passport in rows
+            ]
+
+
+def _split(members, max_block, level=0):
+    # -> (группы не крупнее max_block, пропущенные группы)
+    if len(members) <= max_block:
+        return [members], []
+    if level == len(_SUB_BLOCKS):
+        return [], [members]
+    groups = defaultdict(list)
+    for member in members:
+        groups[_SUB_BLOCKS[level](member)].append(member)
+    kept, skipped = [], []
+    for group in groups.values():
+        group_kept, group_skipped = _split(group, max_block, level + 1)
+        kept += group_kept
+        skipped += group_skipped
+    return kept, skipped
+
+
+def find_candidates(threshold=0.7, max_block=50, stats=None):
+    # блокирование: сравниваем только клиентов с общим ключом (телефон, email,
+    # фонетический ключ ФИО), поэтому число сравнений растёт ~линейно, а не как n².
+    # Ключ ФИО — тот же, что в индексе для candidates_for()
+    seen = set()
+    blocks = compared = split_blocks = 0
+    skipped = []
+    for block, members in iter_blocks():
+        blocks += 1
+        if len(members) < 2:
+            continue
+        groups, too_large = _split(members, max_block)
+        split_blocks += len(members) > max_block
+        if too_large:
+            skipped.append((block, sum(len(group) for group in too_large)))
+        for group in groups:
+            for (a, record_a, _), (b, record_b, _) in combinations(group, 2):
+                if (a, b) in seen:
+                    continue
+                seen.add((a, b))
+                compared += 1
+                score, reasons = score_pair(record_a, record_b)
+                if score >= threshold:
+                    yield a, b, score, reasons
+
+    if stats is not None:
+        stats.update(
+            clients=Clients.objects.count(), blocks=blocks, compared=compared, split_blocks=split_blocks,
+            # (ключ, клиентов в неразделившихся частях) — их пары не сравнивались
+            skipped_blocks=sorted(skipped, key=lambda item: -item[1]),
+        )
+
+
+def rebuild_candidates(threshold=0.7, max_block=50, batch_size=5_000):
+    stats = {}
+    batch = []
+    created = 0
+    with transaction.atomic():
+        ClientDuplicates.objects.filter(status=ClientDuplicates.STATUS_NEW).delete()
+        dismissed = set(
+            ClientDuplicates.objects
+            .filter(status=ClientDuplicates.STATUS_DISMISSED)
+            .values_list("client_a_id", "client_b_id")
+        )
+        for a, b, score, reasons in find_candidates(threshold, max_block, stats):
+            if (a, b) in dismissed:
+                continue
+            batch.append(ClientDuplicates(client_a_id=a, client_b_id=b, score=score, reasons=", ".join(reasons)))
+            if len(batch) >= batch_size:
+                ClientDuplicates.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        ClientDuplicates.objects.bulk_create(batch)
+        created += len(batch)
+    stats["candidates"] = created
+    return stats
+
+
+def candidates_for(client_id: int, threshold=0.7):
+    # проверка одного клиента по индексам clients_email_lower_idx / clients_phone_digits_idx /
+    # clients_name_key_idx
+    client = Clients.objects.annotate(name_key=NameKey("full_name")).get(pk=client_id)
+    phone = normalize_phone(client.phone)
+    phone_variants = {phone, "8" + phone[1:]} if phone.startswith("7") else {phone}
+    same = Q(email_key=normalize_email(client.email)) | Q(phone_key__in=phone_variants)
+    if client.name_key:
+        same |= Q(name_key=client.name_key)
+    matches = (
+        Clients.objects
+        .annotate(
+            email_key=Lower(Trim("email")),
+            phone_key=Func(F("phone"), Value(r"\D"), Value(""), Value("g"), function="regexp_replace"),
+            name_key=NameKey("full_name"),
+        )
+        .filter(same)
+        .exclude(pk=client_id)
+    )
+    me = (normalize_name(client.full_name), phone, normalize_email(client.email), client.birth_date)
+    result = []
+    for other in matches:
+        record = (normalize_name(other.full_name), normalize_phone(other.phone), normalize_email(other.email), other.birth_date)
+        score, reasons = score_pair(me, record)
+        if score >= threshold:
+            result.append((other, score, reasons))
+    return sorted(result, key=lambda item: -item[1])
+
+
+def merge_clients(request, keep_id: int, drop_id: int) -> int:
+    # в журнал: перенос договоров на оставшегося клиента и удаление второго
+    with transaction.atomic():
+        contracts = Contracts.objects.filter(client_id=drop_id)
+        before = audit.snapshot_rows(contracts.select_for_update())
+        moved = Contracts.objects.filter(pk__in=before).update(client_id=keep_id)
+        audit.record_rows(
+            request, Contracts, before, audit.UPDATE, audit.snapshot_rows(Contracts.objects.filter(pk__in=before))
+        )
+        ClientDuplicates.objects.filter(client_a_id=drop_id).delete()
+        ClientDuplicates.objects.filter(client_b_id=drop_id).delete()
+        dropped = Clients.objects.filter(pk=drop_id)
+        audit.record_rows(request, Clients, audit.snapshot_rows(dropped.select_for_update()), audit.DELETE)
+        dropped.delete()
+        versions.bump(Contracts, Clients)
+    return moved
@@ -0,0 +1,266 @@
+import json
+import os
+import shutil
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import connections, router
+from django.utils.timezone import now
+
+from .db_routers import read_from_replica
+from .models import Contracts
+from .partitions import next_period
+
+MANIFEST_NAME = "_manifest.json"
+SCHEMA_VERSION = 1
+
+# (колонка в файле, путь в ORM, тип arrow)
+COLUMNS = [
+    ("contract_id", "contract_id", "int64"),
+    ("issue_date", "issue_date", "date32"),
+    ("return_date", "return_date", "date32"),
+    ("created_at", "created_at", "date32"),
+    ("payment", "payment", "string"),
+    ("contract_status", "cstatus__status", "string"),
+    ("daily_price", "daily_price", "decimal"),
+    ("total_amount", "total_amount", "decimal"),
+    ("client_id", "client_id", "int64"),
+    ("client_birth_date", "client__birth_date", "date32"),
+    ("car_id", "car_id", "int64"),
+    ("car_plate", "car__plate", "string"),
+    ("car_brand", "car__brand", "string"),
+    ("car_model", "car__model", "string"),
+    ("car_year", "car__year_made", "int64"),
+    ("car_category", "car__category__name", "string"),
+    ("issue_branch", "issue_branch__name", "string"),
+    ("return_branch", "return_branch__name", "string"),
+]
+
+# отпечаток месяца по тем же соединённым строкам, что уходят в файл:
+# если он не изменился (ни договоры, ни данные машин/клиентов/справочников), месяц не переэкспортируется.
+# Считается только для месяцев из журнала contract_month_changes (миграция 0017) —
+# {where} ограничивает issue_date, чтобы Postgres читал одну секцию
+_MONTH_SIGNATURES_SQL = """
+    SELECT to_char(c.issue_date, 'YYYY-MM'), COUNT(*),
+           md5(string_agg(md5(ROW(c.*, cs.status, cl.birth_date, car.plate, car.brand, car.model,
+                                  car.year_made, cat.name, ib.name, rb.name)::text),
+                          '' ORDER BY c.contract_id))
+    FROM contracts c
+    JOIN contract_statuses cs ON cs.cstatus_id = c.cstatus_id
+    JOIN clients cl ON cl.client_id = c.client_id
+    JOIN cars car ON car.car_id = c.car_id
+    JOIN car_categories cat ON cat.category_id = car.category_id
+    JOIN branches ib ON ib.branch_id = c.issue_branch_id
+    JOIN branches rb ON rb.branch_id = c.return_branch_id
+    {where}
+    GROUP BY 1
+"""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise RuntimeError("Для экспорта нужен pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def arrow_schema():
+    pa = _pyarrow()
+    types = {
+        "int64": pa.int64(),
+        "date32": pa.date32(),
+        "string": pa.string(),
+        "decimal": pa.decimal128(12, 2),
+    }
+    return pa.schema([(name, types[kind]) for name, _, kind in COLUMNS])
+
+
+@read_from_replica
+def month_signatures(using=None, months=None):
+    # -> {месяц: {"rows", "hash"}}; months=None — все месяцы, иначе только эти
+    # (месяц без договоров в ответ не попадёт).
+    # Подпись и сама выгрузка должны читать одну базу: хеш основной базы при
+    # отстающей реплике записал бы в манифест несвежий месяц как выгруженный
+    using = using or router.db_for_read(Contracts)
+    result = {}
+    with connections[using].cursor() as cursor:
+        if months is None:
+            cursor.execute(_MONTH_SIGNATURES_SQL.format(where=""))
+            rows = cursor.fetchall()
+        else:
+            rows = []
+            for month in sorted(months):
+                start = date.fromisoformat(month + "-01")
+                cursor.execute(
+                    _MONTH_SIGNATURES_SQL.format(where="WHERE c.issue_date >= %s AND c.issue_date < %s"),
+                    [start, next_period(start, "month")],
+                )
+                rows += cursor.fetchall()
+    for month, count, digest in rows:
+        result[month] = {"rows": count, "hash": digest}
+    return result
+
+
+def changes_horizon(using):
+    # горизонт берём до чтения подписей: всё, что закоммичено раньше него, подписи увидят,
+    # а более поздние транзакции найдутся в журнале при следующей выгрузке
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text")
+        return cursor.fetchone()[0]
+
+
+def changed_months(using, horizon):
+    # -> месяцы ('YYYY-MM') из журнала после горизонта или None — пересчитать все (TRUNCATE)
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT DISTINCT month FROM contract_month_changes WHERE xid >= %s::xid8", [horizon])
+        months = [row[0] for row in cursor.fetchall()]
+    if None in months:
+        return None
+    return {month.strftime("%Y-%m") for month in months}
+
+
+def prune_changes():
+    # журнал один на все каталоги выгрузки; чистится на основной базе (реплика — только чтение)
+    with connections["default"].cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM contract_month_changes WHERE changed_at < localtimestamp - make_interval(days => %s)",
+            [settings.EXPORT_CHANGES_KEEP_DAYS],
+        )
+
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"schema_version": SCHEMA_VERSION, "months": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _month_dir(out_dir, month):
+    return os.path.join(out_dir, "contracts", f"month={month}")
+
+
+@read_from_replica
+def export_month(out_dir, month, fmt="parquet", batch_size=50_000, using=None):
+    pa = _pyarrow()
+    using = using or router.db_for_read(Contracts)
+    schema = arrow_schema()
+    start = date.fromisoformat(month + "-01")
+
+    rows = (
+        Contracts.objects.using(using)
+        .filter(issue_date__gte=start, issue_date__lt=next_period(start, "month"))
+        .order_by("contract_id")
+        .values_list(*[path for _, path, _ in COLUMNS])
+        .iterator(chunk_size=batch_size)
+    )
+
+    target_dir = _month_dir(out_dir, month)
+    os.makedirs(target_dir, exist_ok=True)
+    extension = "parquet" if fmt == "parquet" else "arrow"
+    target = os.path.join(target_dir, f"part-0.{extension}")
+    tmp_target = target + ".tmp"
+
+    if fmt == "parquet":
+        writer = pa.parquet.ParquetWriter(tmp_target, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(tmp_target, schema)
+
+    written = 0
+    batch = []
+
+    def flush():
+        columns = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+        writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+
+    try:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush()
+                written += len(batch)
+                batch = []
+        if batch:
+            flush()
+            written += len(batch)
+    finally:
+        writer.close()
+
+    os.replace(tmp_target, target)
+    for name in os.listdir(target_dir):
+        if name != os.path.basename(target):
+            os.remove(os.path.join(target_dir, name))
+    return written
+
+
+@read_from_replica
+def export_contracts(out_dir, fmt="parquet", batch_size=50_000, full=False, log=print):
+    os.makedirs(out_dir, exist_ok=True)
+    # база выбирается один раз: между подписями и выгрузкой маршрутизатор мог бы
+    # переключиться с реплики на основную (и обратно) по отставанию
+    using = router.db_for_read(Contracts)
+    manifest = load_manifest(out_dir)
+    if full or manifest.get("format") != fmt or manifest.get("schema_version") != SCHEMA_VERSION:
+        manifest = {"schema_version": SCHEMA_VERSION, "months": {}}
+
+    # без журнала (первая выгрузка, postgres нет) или если прошлый горизонт старше срока
+    # хранения журнала — подписи всех месяцев, иначе только месяцев с изменениями
+    postgres = connections[using].vendor == "postgresql"
+    started_at = now()
+    horizon = changes_horizon(using) if postgres else None
+    candidates = None
+    previous = manifest.get("changes_horizon")
+    keep = timedelta(days=settings.EXPORT_CHANGES_KEEP_DAYS)
+    if postgres and previous and datetime.fromisoformat(previous["at"]) > now() - keep:
+        candidates = changed_months(using, previous["xid"])
+    current = month_signatures(using, candidates)
+
+    exported = []
+    for month in sorted(current):
+        if manifest["months"].get(month, {}).get("hash") == current[month]["hash"]:
+            continue
+        rows = export_month(out_dir, month, fmt, batch_size, using)
+        manifest["months"][month] = {**current[month], "exported_at": now().isoformat(timespec="seconds")}
+        exported.append((month, rows))
+        log(f"{month}: {rows} строк")
+
+    gone = set(manifest["months"]) - set(current)
+    if candidates is not None:
+        gone &= candidates
+    for month in gone:
+        shutil.rmtree(_month_dir(out_dir, month), ignore_errors=True)
+        del manifest["months"][month]
+        log(f"{month}: удалён (договоров больше нет)")
+
+    manifest.update(format=fmt, schema_version=SCHEMA_VERSION)
+    if horizon is not None:
+        manifest["changes_horizon"] = {"xid": horizon, "at": started_at.isoformat(timespec="seconds")}
+        prune_changes()
+    save_manifest(out_dir, manifest)
+    return exported
+
+
+def open_contracts_dataset(out_dir):
+    # для анализа: ds.to_table(filter=...) читает только нужные месяцы и колонки,
+    # файлы отображаются в память, боевая база не участвует
+    _pyarrow()
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    manifest = load_manifest(out_dir)
+    return ds.dataset(
+        os.path.join(out_dir, "contracts"),
+        format="parquet" if manifest.get("format", "parquet") == "parquet" else "ipc",
+        partitioning="hive",
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
@@ -0,0 +1,217 @@
+import threading
+import time
+from decimal import ROUND_FLOOR, Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+
+from . import invalidation
+from .models import CarStatuses, Cars
+
+# при этих статусах машина свободна (как на главной и в отчётах)
+FREE_STATUSES = ("свободен", "доступен")
+
+# На машину: 4 × int32 + int64 + int32 + bool = 29 байт, т. е. 100 000 машин — 2,8 МБ
+# на воркер (на время обновления — вдвое). Фильтр по четырём условиям на таком парке
+# строит маски по 100 КБ и считает примерно за 0,1 мс, поиск по id — двоичный,
+# около микросекунды (замер: manage.py bench_fleet).
+COLUMNS = (
+    ("car_id", np.int32),
+    ("branch_id", np.int32),
+    ("category_id", np.int32),
+    ("status_id", np.int32),
+    ("price", np.int64),       # цена за сутки в копейках: сравнения без округлений float
+    ("mileage", np.int32),
+    ("free", np.bool_),
+)
+# строки из базы и слияние — записями; запросы — по столбцам (Snapshot)
+DTYPE = np.dtype(list(COLUMNS))
+
+_SELECT_SQL = """
+    SELECT car_id, branch_id, category_id, status_id, (daily_price * 100)::bigint, mileage, false
+    FROM cars
+"""
+
+_MAX_ID = np.iinfo(np.int32).max
+
+# изменилось больше этой доли парка — дешевле перечитать всё, чем сливать
+_FULL_RELOAD_SHARE = 0.25
+
+
+def _cents(price):
+    # «цена ≤ P»: дробные копейки границы отбрасываем
+    return int((Decimal(str(price)) * 100).to_integral_value(ROUND_FLOOR))
+
+
+class Snapshot:
+    # каждый столбец — отдельный непрерывный массив: у поля записи шаг 29 байт,
+    # и сравнения по нему (и searchsorted, который такое поле копирует) в разы медленнее
+    __slots__ = tuple(name for name, _ in COLUMNS)
+
+    def __init__(self, records):
+        for name in self.__slots__:
+            setattr(self, name, np.ascontiguousarray(records[name]))
+
+    def __len__(self):
+        return len(self.car_id)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+    def records(self):
+        records = np.empty(len(self), dtype=DTYPE)
+        for name in self.__slots__:
+            records[name] = getattr(self, name)
+        return records
+
+    def mask(self, branch_id=None, category_id=None, free=None, max_price=None):
+        mask = np.ones(len(self), dtype=np.bool_)
+        if branch_id is not None:
+            mask &= self.branch_id == branch_id
+        if category_id is not None:
+            mask &= self.category_id == category_id
+        if free is not None:
+            mask &= self.free == free
+        if max_price is not None:
+            mask &= self.price <= _cents(max_price)
+        return mask
+
+    def position(self, car_id):
+        # ключ того же типа, что столбец: с питоновским int numpy приводит весь столбец к int64
+        if not 0 < car_id <= _MAX_ID:
+            return None
+        position = int(self.car_id.searchsorted(np.int32(car_id)))
+        if position < len(self) and self.car_id[position] == car_id:
+            return position
+        return None
+
+
+class FleetCar:
+    # строка снимка с полями как у Cars: подходит для pricing.quote()
+    __slots__ = ("car_id", "branch_id", "category_id", "status_id", "daily_price", "mileage", "free")
+
+    def __init__(self, snapshot, position):
+        self.car_id = int(snapshot.car_id[position])
+        self.branch_id = int(snapshot.branch_id[position])
+        self.category_id = int(snapshot.category_id[position])
+        self.status_id = int(snapshot.status_id[position])
+        self.daily_price = Decimal(int(snapshot.price[position])).scaleb(-2)
+        self.mileage = int(snapshot.mileage[position])
+        self.free = bool(snapshot.free[position])
+
+    @property
+    def pk(self):
+        return self.car_id
+
+
+class Fleet:
+    # Снимок таблицы cars в памяти воркера, отсортированный по car_id. О том, что парк
+    # изменился, узнаём по шине сброса кеша (rental/invalidation.py); перечитываем только
+    # машины из журнала cars_changes (миграция 0011) после горизонта прошлого чтения.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = Snapshot(np.empty(0, dtype=DTYPE))
+        self.token = None
+        self.horizon = None      # pg_snapshot_xmin перед прошлым чтением
+        self.refreshed_at = 0.0
+        self.pruned_at = 0.0
+
+    def _current(self):
+        # маркер в кеше воркера живёт до изменения cars/car_statuses; новый маркер — пора
+        # свериться с журналом. Готовый снимок не меняется на месте, поэтому читатели без блокировки
+        token = invalidation.cache.get_or_set("fleet", (Cars, CarStatuses), object)
+        if token is not self.token:
+            with self.lock:
+                if token is not self.token:
+                    self._refresh()
+                    self.token = token
+        return self.snapshot
+
+    def clear(self):
+        # следующее обращение перечитает парк целиком, а не по журналу (проверка планов)
+        with self.lock:
+            self.token = None
+            self.horizon = None
+
+    def refresh(self):
+        # принудительно, не дожидаясь шины: для тех, кого будит свой NOTIFY (rental/live.py)
+        with self.lock:
+            self._refresh()
+
+    def _refresh(self):
+        connection = connections["default"]
+        with connection.cursor() as cursor:
+            free = [
+                pk for pk, status in CarStatuses.objects.using("default").values_list("pk", "status")
+                if status.lower() in FREE_STATUSES
+            ]
+            if connection.vendor != "postgresql":
+                records, horizon = self._load(cursor), None
+            else:
+                records, horizon = self._sync(cursor)
+        # статус могли переименовать — признак пересчитываем по всему парку
+        records["free"] = np.isin(records["status_id"], free)
+        self.snapshot = Snapshot(records)
+        self.horizon = horizon
+        self.refreshed_at = time.time()
+
+    def _sync(self, cursor):
+        # горизонт берём до чтения: всё, что закоммичено раньше него, чтение увидит,
+        # а транзакции после него попадут в выборку из журнала в следующий раз
+        cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+        horizon = cursor.fetchone()[0]
+        keep = settings.FLEET_CHANGES_KEEP_HOURS * 3600
+        if time.time() - self.pruned_at > keep / 24:
+            cursor.execute(
+                "DELETE FROM cars_changes WHERE changed_at < localtimestamp - make_interval(hours => %s)",
+                [settings.FLEET_CHANGES_KEEP_HOURS],
+            )
+            self.pruned_at = time.time()
+
+        # журнал старше срока хранения уже мог быть почищен
+        if self.horizon is None or time.time() - self.refreshed_at > keep / 2:
+            return self._load(cursor), horizon
+        cursor.execute("SELECT DISTINCT car_id FROM cars_changes WHERE xid >= %s::text::xid8", [str(self.horizon)])
+        changed = [row[0] for row in cursor.fetchall()]
+        if None in changed or len(changed) > len(self.snapshot) * _FULL_RELOAD_SHARE:
+            return self._load(cursor), horizon
+        records = self.snapshot.records()
+        if not changed:
+            return records, horizon
+
+        # удалённые машины в перечитанное не попадут — из снимка просто исчезнут
+        kept = records[~np.isin(records["car_id"], changed)]
+        records = np.concatenate([kept, self._load(cursor, changed)])
+        return records[np.argsort(records["car_id"], kind="stable")], horizon
+
+    @staticmethod
+    def _load(cursor, ids=None):
+        if ids is None:
+            cursor.execute(_SELECT_SQL + " ORDER BY car_id")
+        else:
+            cursor.execute(_SELECT_SQL + " WHERE car_id = ANY(%s) ORDER BY car_id", [list(ids)])
+        return np.array(cursor.fetchall(), dtype=DTYPE)
+
+    def count(self, **filters):
+        # фильтры: branch_id, category_id, free, max_price; None — без условия
+        snapshot = self._current()
+        if all(value is None for value in filters.values()):
+            return len(snapshot)
+        return int(np.count_nonzero(snapshot.mask(**filters)))
+
+    def ids(self, **filters):
+        snapshot = self._current()
+        return snapshot.car_id[snapshot.mask(**filters)].tolist()
+
+    def get(self, car_id, branch_id=None):
+        # -> FleetCar или None (нет такой машины или она другого филиала)
+        snapshot = self._current()
+        position = snapshot.position(car_id)
+        if position is None or (branch_id is not None and snapshot.branch_id[position] != branch_id):
+            return None
+        return FleetCar(snapshot, position)
+
+
+fleet = Fleet()
@@ -1,9 +1,10 @@
 from django import forms
+from django.conf import settings
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 
-from .models import Cars, Clients, Employees, Contracts
+from .models import Branches, CarCategories, CarStatuses, Cars, Clients, ContractStatuses, Employees, Contracts
 
 
 fio_validator = RegexValidator(
@@ -59,6 +60,12 @@ class CarForm(forms.ModelForm):
             'daily_price': forms.NumberInput(attrs={'class': 'form-control'}),
         }
 
+    def __init__(self, *args, branch_id=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if branch_id is not None:
+            self.fields["branch"].queryset = Branches.objects.filter(pk=branch_id)
+            self.fields["branch"].initial = branch_id
+
 
 class ClientForm(forms.ModelForm):
     full_name = forms.CharField(validators=[fio_validator], widget=forms.TextInput(attrs={'class': 'form-control'}))
@@ -183,6 +190,14 @@ class ContractForm(forms.ModelForm):
             'return_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
         }
 
+    def __init__(self, *args, branch_id=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if branch_id is not None:
+            # выдача — только машин своего филиала; вернуть можно в любой
+            self.fields["car"].queryset = Cars.objects.for_branch(branch_id)
+            self.fields["issue_branch"].queryset = Branches.objects.filter(pk=branch_id)
+            self.fields["issue_branch"].initial = branch_id
+
     def clean(self):
         cleaned = super().clean()
 
@@ -192,10 +207,108 @@ class ContractForm(forms.ModelForm):
 
         if issue and ret and ret < issue:
             raise ValidationError("Дата возврата не может быть раньше даты выдачи")
+        # длиннее договоров быть не может (CHECK в базе, миграция 0016): на этом сроке
+        # держится окно по issue_date в проверке доступности машины (Contracts.overlapping)
+        if issue and ret and (ret - issue).days > settings.CONTRACTS_MAX_RENTAL_DAYS:
+            raise ValidationError(f"Срок аренды не может превышать {settings.CONTRACTS_MAX_RENTAL_DAYS} дн.")
 
         if car and issue and ret:
-            days = (ret - issue).days + 1
+            # numpy нужен только при расчёте цены, не при старте воркера
+            from .pricing import quote
             cleaned["daily_price"] = car.daily_price
-            cleaned["total_amount"] = car.daily_price * days
+            cleaned["total_amount"] = quote(car, issue, ret)
+
+        return cleaned
 
+
+class ReportParamsForm(forms.Form):
+    # Параметры отчёта: каждое заполненное поле превращается в фильтр queryset
+    # по lookups (поле формы -> lookup ORM); пустые поля не ограничивают выборку.
+    lookups = {}
+
+    def __init__(self, *args, branch_id=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if branch_id is not None and "branch" in self.fields:
+            # сотрудник филиала видит только свой филиал (for_branch), выбирать нечего
+            del self.fields["branch"]
+
+    def clean(self):
+        cleaned = super().clean()
+        start, end = cleaned.get("date_from"), cleaned.get("date_to")
+        if start and end and end < start:
+            raise ValidationError("Конец периода раньше начала")
         return cleaned
+
+    def filter(self, queryset):
+        conditions = {
+            self.lookups[name]: value
+            for name, value in self.cleaned_data.items()
+            if name in self.lookups and value not in (None, "")
+        }
+        return queryset.filter(**conditions)
+
+    def params(self):
+        # заполненные параметры строками — для ключа кеша и ссылки на скачивание
+        result = {}
+        for name, value in self.cleaned_data.items():
+            if value in (None, ""):
+                continue
+            result[name] = value.isoformat() if hasattr(value, "isoformat") else str(getattr(value, "pk", value))
+        return result
+
+    def summary(self):
+        parts = []
+        for name, value in self.cleaned_data.items():
+            if value in (None, ""):
+                continue
+            if hasattr(value, "strftime"):
+                value = value.strftime("%d.%m.%Y")
+            parts.append(f"{self.fields[name].label}: {value}")
+        return "; ".join(parts)
+
+
+def _report_select(queryset, label, empty_label):
+    return forms.ModelChoiceField(
+        queryset=queryset,
+        label=label,
+        required=False,
+        empty_label=empty_label,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+
+
+def _report_date(label):
+    return forms.DateField(
+        label=label,
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+    )
+
+
+class ContractReportForm(ReportParamsForm):
+    # период по issue_date: секции contracts и индекс (issue_branch_id, issue_date)
+    date_from = _report_date("Выданы с")
+    date_to = _report_date("по")
+    branch = _report_select(Branches.objects.order_by("name"), "Филиал", "Все филиалы")
+    cstatus = _report_select(ContractStatuses.objects.order_by("status"), "Статус договора", "Любой статус")
+    category = _report_select(CarCategories.objects.order_by("name"), "Категория авто", "Любая категория")
+
+    lookups = {
+        "date_from": "issue_date__gte",
+        "date_to": "issue_date__lte",
+        "branch": "issue_branch",
+        "cstatus": "cstatus",
+        "category": "car__category",
+    }
+
+
+class CarReportForm(ReportParamsForm):
+    branch = _report_select(Branches.objects.order_by("name"), "Филиал", "Все филиалы")
+    status = _report_select(CarStatuses.objects.order_by("status"), "Статус авто", "Любой статус")
+    category = _report_select(CarCategories.objects.order_by("name"), "Категория", "Любая категория")
+
+    lookups = {
+        "branch": "branch",
+        "status": "status",
+        "category": "category",
+    }
@@ -0,0 +1,123 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, connections, router, transaction
+from django.utils.timezone import now
+
+from .models import CarHolds, Cars, Contracts
+
+# lock_not_available: NOWAIT не дождался блокировки или истёк lock_timeout
+_LOCK_NOT_AVAILABLE = "55P03"
+
+_EXPIRE_SQL = """
+    DELETE FROM car_holds
+    WHERE hold_id IN (
+        SELECT hold_id FROM car_holds
+        WHERE expires_at <= %s
+        ORDER BY expires_at
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+"""
+
+
+class HoldError(Exception):
+    pass
+
+
+def _lock_busy(exc):
+    cause = exc.__cause__
+    return (getattr(cause, "pgcode", None) or getattr(cause, "sqlstate", None)) == _LOCK_NOT_AVAILABLE
+
+
+def _lock_car(db, car_id, nowait):
+    # строка машины — точка сериализации: все брони и договоры по ней идут по очереди
+    return Cars.objects.using(db).select_for_update(nowait=nowait).filter(pk=car_id).values_list("pk", flat=True).first()
+
+
+def _check_free(db, car_id, start, end, user, exclude_contract=None):
+    contracts = Contracts.objects.using(db).overlapping(car_id, start, end)
+    if exclude_contract is not None:
+        contracts = contracts.exclude(pk=exclude_contract)
+    if contracts.exists():
+        raise HoldError("Машина уже сдана на эти даты")
+    if CarHolds.objects.using(db).live().overlapping(car_id, start, end).exclude(user=user).exists():
+        raise HoldError("Машину на эти даты уже оформляет другой сотрудник")
+
+
+def place_hold(user, car_id, start, end, exclude_contract=None):
+    # Бронь на время оформления договора. Строку машины берём с NOWAIT: если её прямо сейчас
+    # держит другой сотрудник, сразу отвечаем отказом, а не выстраиваем очередь из запросов.
+    if end < start:
+        raise HoldError("Дата возврата не может быть раньше даты выдачи")
+    if (end - start).days > settings.CONTRACTS_MAX_RENTAL_DAYS:
+        raise HoldError(f"Срок аренды не может превышать {settings.CONTRACTS_MAX_RENTAL_DAYS} дн.")
+
+    db = router.db_for_write(CarHolds)
+    try:
+        with transaction.atomic(using=db):
+            if _lock_car(db, car_id, nowait=True) is None:
+                raise HoldError("Машина не найдена")
+            _check_free(db, car_id, start, end, user, exclude_contract)
+            # у сотрудника одна бронь: выбрал другую машину или даты — старая снимается
+            CarHolds.objects.using(db).filter(user=user).delete()
+            return CarHolds.objects.using(db).create(
+                car_id=car_id,
+                user=user,
+                start_date=start,
+                end_date=end,
+                expires_at=now() + timedelta(seconds=settings.CAR_HOLD_TTL_SECONDS),
+            )
+    except OperationalError as exc:
+        if _lock_busy(exc):
+            raise HoldError("Машину сейчас бронирует другой сотрудник, попробуйте ещё раз") from exc
+        raise
+
+
+def release_holds(user):
+    return CarHolds.objects.filter(user=user).delete()[0]
+
+
+def book_contract(form, user):
+    # Сохраняет валидную ContractForm, превращая бронь сотрудника в договор.
+    # Под блокировкой машины повторно проверяем пересечения: бронь могла истечь,
+    # а чужой договор — появиться после того, как форма прошла clean().
+    contract = form.instance
+    car = form.cleaned_data["car"]
+    start, end = form.cleaned_data["issue_date"], form.cleaned_data["return_date"]
+    if contract.pk is not None and not {"car", "issue_date", "return_date"} & set(form.changed_data):
+        return form.save()
+
+    db = router.db_for_write(Contracts)
+    try:
+        with transaction.atomic(using=db):
+            if connections[db].vendor == "postgresql":
+                with connections[db].cursor() as cursor:
+                    cursor.execute(f"SET LOCAL lock_timeout = {int(settings.CAR_HOLD_LOCK_TIMEOUT_MS)}")
+            _lock_car(db, car.pk, nowait=False)
+            _check_free(db, car.pk, start, end, user, exclude_contract=contract.pk)
+            contract = form.save()
+            CarHolds.objects.using(db).filter(user=user, car_id=car.pk).delete()
+            return contract
+    except OperationalError as exc:
+        if _lock_busy(exc):
+            raise HoldError("Машину сейчас оформляет другой сотрудник, попробуйте сохранить ещё раз") from exc
+        raise
+
+
+def expire_holds(batch_size=5000):
+    # Удаляет просроченные брони пачками. SKIP LOCKED: строки, которые прямо сейчас
+    # превращаются в договор, пропускаем — их удалит book_contract или следующий проход.
+    db = router.db_for_write(CarHolds)
+    moment = now()
+    if connections[db].vendor != "postgresql":
+        return CarHolds.objects.using(db).filter(expires_at__lte=moment).delete()[0]
+
+    removed = 0
+    while True:
+        with transaction.atomic(using=db), connections[db].cursor() as cursor:
+            cursor.execute(_EXPIRE_SQL, [moment, batch_size])
+            deleted = cursor.rowcount
+        removed += deleted
+        if deleted < batch_size:
+            return removed
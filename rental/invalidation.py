@@ -0,0 +1,198 @@
+import logging
+import os
+import select
+import threading
+import time
+from collections import defaultdict
+
+import psycopg2
+import psycopg2.extensions
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils.timezone import now
+
+from . import versions
+from .db_routers import pin_to_primary, unpin
+from .models import TableVersions
+
+logger = logging.getLogger(__name__)
+
+# versions.bump() шлёт сюда имя изменённой таблицы; NOTIFY уходит вместе с COMMIT
+CHANNEL = "rental_invalidate"
+
+_RECONNECT_SECONDS = 5
+
+
+def publish(tables, using="default"):
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, table])
+    # свой процесс сбрасываем сразу после COMMIT, не дожидаясь уведомления
+    transaction.on_commit(lambda: cache.invalidate(tables), using=using)
+
+
+class LocalCache:
+    # Кеш внутри воркера: значение живёт, пока не придёт NOTIFY по одной из его таблиц.
+    # Если уведомление потерялось (обрыв LISTEN), записи сверяются со счётчиками
+    # table_versions: раз в CACHE_BUS_RECHECK_SECONDS, а без слушателя — при каждом обращении
+    # не чаще CACHE_BUS_FALLBACK_SECONDS.
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.entries = {}                 # key -> (value, tables, versions, день или None)
+        self.by_table = defaultdict(set)  # table -> {key}
+        self.epochs = defaultdict(int)    # table -> сколько раз сбрасывалась
+        self.generation = 0               # сколько раз сбрасывался весь кеш
+        self.checked_at = time.monotonic()
+        self.listening = False
+        self.pid = os.getpid()
+        self.thread = None
+        self.stopping = threading.Event()
+        self.wake = None                  # pipe: будит select() слушателя при stop()
+
+    def get_or_set(self, key, models, compute, per_day=False, from_replica=False):
+        self._ensure_listener()
+        self._recheck()
+        tables = tuple(sorted({versions._table(m) for m in models}))
+        day = now().date() if per_day else None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[3] == day:
+                return entry[0]
+            epochs = [self.generation] + [self.epochs[t] for t in tables]
+
+        if from_replica:
+            # тяжёлые выборки (когорты) читают реплику; значение запоминается с её же
+            # счётчиками, так что отставшая копия сбросится при первой сверке
+            # с основной базой (_recheck)
+            current = versions.get_versions(*tables, using=router.db_for_read(TableVersions))
+            value = compute()
+        else:
+            current = versions.get_versions(*tables)
+            # кеш наполняется только с основной базы: отстающая реплика запомнилась бы надолго
+            token = pin_to_primary(True)
+            try:
+                value = compute()
+            finally:
+                unpin(token)
+
+        with self.lock:
+            # пока считали, таблицу успели изменить — значение уже несвежее, не сохраняем
+            if [self.generation] + [self.epochs[t] for t in tables] == epochs:
+                self.entries[key] = (value, tables, {t: current[t][0] for t in tables}, day)
+                for table in tables:
+                    self.by_table[table].add(key)
+        return value
+
+    def invalidate(self, tables):
+        with self.lock:
+            for table in tables:
+                self.epochs[table] += 1
+                for key in self.by_table.pop(table, ()):
+                    self._drop(key)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.by_table.clear()
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for table in entry[1]:
+            keys = self.by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+
+    def _recheck(self):
+        interval = settings.CACHE_BUS_RECHECK_SECONDS if self.listening else settings.CACHE_BUS_FALLBACK_SECONDS
+        moment = time.monotonic()
+        if moment - self.checked_at < interval:
+            return
+        self.checked_at = moment
+        with self.lock:
+            tables = list(self.by_table)
+        if not tables:
+            return
+        current = versions.get_versions(*tables)
+        with self.lock:
+            stale = [
+                key for key, (_, entry_tables, seen, _) in self.entries.items()
+                if any(current[t][0] != seen[t] for t in entry_tables)
+            ]
+            for key in stale:
+                self._drop(key)
+        if stale:
+            logger.info("Сброшено записей кеша по счётчикам таблиц: %d", len(stale))
+
+    def _ensure_listener(self):
+        if self.pid != os.getpid():
+            # воркер gunicorn после fork: ни записей, ни потока родителя у него нет
+            with self.lock:
+                if self.pid != os.getpid():
+                    self._reset()
+        if self.thread is None and connections["default"].vendor == "postgresql":
+            with self.lock:
+                if self.thread is None:
+                    self.stopping = threading.Event()
+                    self.wake = os.pipe()
+                    self.thread = threading.Thread(
+                        target=self._listen, args=(self.stopping, self.wake[0]), name="cache-bus", daemon=True
+                    )
+                    self.thread.start()
+
+    def stop(self, timeout=5):
+        # останавливает поток LISTEN и закрывает его соединение — нужно тестовому прогону:
+        # базу, к которой кто-то подключён, Postgres удалить не даст
+        with self.lock:
+            thread, wake, self.thread = self.thread, self.wake, None
+            self.stopping.set()
+        if thread is None:
+            return
+        os.write(wake[1], b"x")
+        thread.join(timeout)
+        os.close(wake[0])
+        os.close(wake[1])
+
+    def _listen(self, stopping, wake):
+        while not stopping.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(**connections["default"].get_connection_params())
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                # что пришло до подписки, могло пройти мимо
+                self.clear()
+                self.listening = True
+                while True:
+                    readable, _, _ = select.select([conn, wake], [], [], settings.CACHE_BUS_RECHECK_SECONDS)
+                    if stopping.is_set():
+                        return
+                    if not readable:
+                        # тишина — проверяем, что соединение живо
+                        with conn.cursor() as cursor:
+                            cursor.execute("SELECT 1")
+                        continue
+                    conn.poll()
+                    tables = {notify.payload for notify in conn.notifies}
+                    conn.notifies.clear()
+                    if tables:
+                        self.invalidate(tables)
+            except psycopg2.Error:
+                logger.warning("Шина сброса кеша: соединение LISTEN %s потеряно", CHANNEL, exc_info=True)
+            finally:
+                self.listening = False
+                if conn is not None:
+                    conn.close()
+            stopping.wait(_RECONNECT_SECONDS)
+
+
+cache = LocalCache()
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.utils import formats
+from django.utils.timezone import now
+
+from . import invalidation
+from .counts import estimated_count
+from .models import CarStatuses, Cars, Clients, Contracts
+
+LAST_CONTRACTS = 5
+
+
+def home_kpis(branch_id, today=None):
+    # показатели главной страницы; их же rental/live.py рассылает открытым вкладкам
+    from .fleet import fleet  # numpy — только когда главная действительно нужна
+
+    today = today or now().date()
+    contracts = Contracts.objects.for_branch(branch_id)
+    return {
+        # клиенты общие для всех филиалов
+        "total_clients": estimated_count(Clients.objects.all()),
+        # машины — из снимка парка в памяти: точный счёт без запроса
+        "total_cars": fleet.count(branch_id=branch_id),
+        "active_contracts": estimated_count(contracts.active(today)),
+        "free_cars": fleet.count(branch_id=branch_id, free=True),
+        "busy_cars": fleet.count(branch_id=branch_id, free=False),
+        "contracts_today": estimated_count(contracts.filter(issue_date=today)),
+        "contracts_week": estimated_count(contracts.issued_since(today - timedelta(days=7))),
+    }
+
+
+def last_contracts(branch_id, limit=LAST_CONTRACTS):
+    # строки таблицы «Последние договоры» уже в виде для шаблона и JSON
+    rows = (
+        Contracts.objects.for_branch(branch_id)
+        .select_related("client", "car")
+        .order_by("-issue_date", "-contract_id")[:limit]
+    )
+    return [
+        {
+            "contract_id": c.contract_id,
+            "client": c.client.full_name,
+            "car": f"{c.car.brand} {c.car.model}",
+            "issue_date": formats.date_format(c.issue_date),
+            "total_amount": formats.localize(c.total_amount),
+        }
+        for c in rows
+    ]
+
+
+def snapshot(branch_id):
+    return {**home_kpis(branch_id), "last_contracts": last_contracts(branch_id)}
+
+
+def cached_snapshot(branch_id):
+    # главная одинакова у всех сотрудников филиала: считаем раз на воркер,
+    # до изменения таблиц (NOTIFY, rental/invalidation.py) или до полуночи
+    return invalidation.cache.get_or_set(
+        ("home_kpis", branch_id), (Cars, Clients, Contracts, CarStatuses),
+        lambda: snapshot(branch_id), per_day=True,
+    )
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+from collections import defaultdict
+
+import psycopg2
+import psycopg2.extensions
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.utils.timezone import now
+
+from . import kpis
+
+logger = logging.getLogger(__name__)
+
+# канал, в который триггеры cars/contracts шлют NOTIFY (миграция 0009)
+CHANNEL = "rental_changes"
+
+_RECONNECT_SECONDS = 5
+
+
+def _snapshot(branch_id):
+    from .fleet import fleet  # снимок парка тянет numpy — не при импорте модуля
+
+    close_old_connections()
+    # NOTIFY этого канала может опередить сброс кеша по шине — парк сверяем сами
+    fleet.refresh()
+    return kpis.snapshot(branch_id)
+
+
+def _delta(old, new):
+    # изменившиеся показатели; для таблицы — весь список и id новых строк
+    changed = {key: value for key, value in new.items() if key != "last_contracts" and old.get(key) != value}
+    if old.get("last_contracts") != new["last_contracts"]:
+        seen = {row["contract_id"] for row in old.get("last_contracts", [])}
+        changed["last_contracts"] = new["last_contracts"]
+        changed["new_contracts"] = [row["contract_id"] for row in new["last_contracts"] if row["contract_id"] not in seen]
+    return changed
+
+
+class KpiHub:
+    # Один на процесс ASGI-сервера: слушает NOTIFY одним соединением и пересчитывает
+    # показатели один раз на филиал, сколько бы вкладок этого филиала ни было открыто.
+    def __init__(self):
+        self.subscribers = defaultdict(set)   # branch_id -> {asyncio.Queue}
+        self.snapshots = {}                   # branch_id -> последние разосланные показатели
+        self.changed = None
+        self.listener = None
+        self.loop = None
+        self.task = None
+        self.day = None
+
+    async def subscribe(self, branch_id):
+        # -> (очередь дельт, полный снимок для первого события)
+        self._start()
+        queue = asyncio.Queue(maxsize=settings.LIVE_QUEUE_SIZE)
+        self.subscribers[branch_id].add(queue)
+        if branch_id not in self.snapshots:
+            self.snapshots[branch_id] = await sync_to_async(_snapshot, thread_sensitive=False)(branch_id)
+        return queue, self.snapshots[branch_id]
+
+    def unsubscribe(self, branch_id, queue):
+        queues = self.subscribers.get(branch_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self.subscribers[branch_id]
+            self.snapshots.pop(branch_id, None)
+
+    def _start(self):
+        loop = asyncio.get_running_loop()
+        if self.task is not None and self.loop is loop and not self.task.done():
+            return
+        self.loop = loop
+        self.changed = asyncio.Event()
+        self.day = now().date()
+        self.task = loop.create_task(self._pump())
+
+    async def _listen(self):
+        # отдельное соединение вне пула Django: оно живёт, пока жив процесс
+        def connect():
+            params = connections["default"].get_connection_params()
+            conn = psycopg2.connect(**params)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            return conn
+
+        conn = await self.loop.run_in_executor(None, connect)
+        self.listener = conn
+        self.loop.add_reader(conn.fileno(), self._on_notify)
+        logger.info("Слушаем канал %s", CHANNEL)
+
+    def _drop_listener(self):
+        if self.listener is None:
+            return
+        try:
+            self.loop.remove_reader(self.listener.fileno())
+        except (ValueError, OSError):
+            pass
+        try:
+            self.listener.close()
+        except psycopg2.Error:
+            pass
+        self.listener = None
+
+    def _on_notify(self):
+        try:
+            self.listener.poll()
+        except psycopg2.Error:
+            logger.exception("Соединение LISTEN %s оборвалось", CHANNEL)
+            self._drop_listener()
+            self.changed.set()
+            return
+        if self.listener.notifies:
+            self.listener.notifies.clear()
+            self.changed.set()
+
+    async def _pump(self):
+        while True:
+            if self.listener is None:
+                try:
+                    await self._listen()
+                except psycopg2.Error:
+                    logger.exception("Не удалось подписаться на %s", CHANNEL)
+                    await asyncio.sleep(_RECONNECT_SECONDS)
+                    continue
+                # пока соединения не было, изменения могли пройти мимо
+                self.changed.set()
+
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout=settings.LIVE_DAY_CHECK_SECONDS)
+            except asyncio.TimeoutError:
+                # без изменений в базе показатели «сегодня» всё равно сдвигаются в полночь
+                if now().date() == self.day:
+                    continue
+            # пачка договоров — много NOTIFY подряд; собираем их в один пересчёт
+            await asyncio.sleep(settings.LIVE_DEBOUNCE_SECONDS)
+            self.changed.clear()
+            self.day = now().date()
+            await self._broadcast()
+
+    async def _broadcast(self):
+        for branch_id in list(self.subscribers):
+            try:
+                fresh = await sync_to_async(_snapshot, thread_sensitive=False)(branch_id)
+            except Exception:
+                logger.exception("Не удалось пересчитать показатели филиала %s", branch_id)
+                continue
+            queues = self.subscribers.get(branch_id)
+            if not queues:
+                continue
+            delta = _delta(self.snapshots.get(branch_id, {}), fresh)
+            self.snapshots[branch_id] = fresh
+            if not delta:
+                continue
+            for queue in list(queues):
+                try:
+                    queue.put_nowait(delta)
+                except asyncio.QueueFull:
+                    # вкладка не успевает читать — закрываем поток, браузер переподключится
+                    # и получит полный снимок
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(None)
+                    self.unsubscribe(branch_id, queue)
+
+
+hub = KpiHub()
@@ -0,0 +1,46 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from rental import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Отсоединяет секции contracts, целиком лежащие раньше --before, "
+        "и переносит их в схему архива (или удаляет с --drop)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--before", required=True, type=date.fromisoformat,
+                            help="Граница архива, YYYY-MM-DD (секции с верхней границей <= даты)")
+        parser.add_argument("--schema", default="archive", help="Схема для архивных секций")
+        parser.add_argument("--drop", action="store_true", help="Удалить секции вместо переноса в архив")
+        parser.add_argument("--dry-run", action="store_true", help="Только показать, что будет сделано")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Архивирование поддерживается только для PostgreSQL")
+
+        before = options["before"]
+        with connection.cursor() as cursor:
+            if not partitions.is_partitioned(cursor):
+                raise CommandError("contracts не секционирована — сначала manage.py partition_contracts")
+
+            if options["dry_run"]:
+                for name, start, end in partitions.list_partitions(cursor):
+                    if end <= before:
+                        self.stdout.write(f"{name}: {start} — {end}")
+                return
+
+            with transaction.atomic():
+                archived = partitions.archive_partitions(
+                    cursor, before, schema=options["schema"], drop=options["drop"]
+                )
+
+        if not archived:
+            self.stdout.write("Нет секций старше " + before.isoformat())
+            return
+        action = "удалены" if options["drop"] else f"перенесены в схему {options['schema']}"
+        self.stdout.write(self.style.SUCCESS(f"Секции {action}: " + ", ".join(archived)))
@@ -0,0 +1,94 @@
+import random
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from rental.fleet import DTYPE, FREE_STATUSES, Snapshot, fleet
+from rental.models import Cars
+
+
+def _per_call_us(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) * 1e6 / repeat
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет снимок парка в памяти (rental/fleet.py): память и время фильтров на синтетическом "
+        "парке заданного размера; на настоящем — сверяет счётчики с базой."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cars", type=int, default=100_000, help="Размер синтетического парка")
+        parser.add_argument("--repeat", type=int, default=2000)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        size, repeat = options["cars"], options["repeat"]
+
+        records = np.zeros(size, dtype=DTYPE)
+        records["car_id"] = np.arange(1, size + 1)
+        records["branch_id"] = rng.integers(1, 21, size)
+        records["category_id"] = rng.integers(1, 9, size)
+        records["status_id"] = rng.integers(1, 4, size)
+        records["price"] = rng.integers(1500, 15000, size) * 100
+        records["mileage"] = rng.integers(0, 300_000, size)
+        records["free"] = records["status_id"] == 1
+        synthetic = Snapshot(records)
+
+        filtered_us = _per_call_us(
+            lambda: np.count_nonzero(synthetic.mask(branch_id=7, category_id=3, free=True, max_price=5000)), repeat
+        )
+        ids = rng.integers(1, size + 1, repeat).tolist()
+        started = time.perf_counter()
+        for car_id in ids:
+            synthetic.position(car_id)
+        lookup_us = (time.perf_counter() - started) * 1e6 / repeat
+
+        self.stdout.write(f"Синтетический парк: {size} машин, {synthetic.nbytes / 2**20:.2f} МБ "
+                          f"({DTYPE.itemsize} байт на машину)")
+        self.stdout.write(f"  филиал + категория + свободна + цена ≤ P: {filtered_us:.0f} мкс")
+        self.stdout.write(f"  поиск по id: {lookup_us:.1f} мкс")
+
+        if not Cars.objects.exists():
+            raise CommandError("В базе нет машин — настоящий парк не проверен")
+        started = time.perf_counter()
+        fleet.refresh()
+        load_ms = (time.perf_counter() - started) * 1000
+        real = fleet.snapshot
+
+        # фильтр по первой свободной машине, чтобы сверка не сводилась к нулю
+        first = int(np.argmax(real.free))
+        branch_id, category_id = int(real.branch_id[first]), int(real.category_id[first])
+        price = Decimal(int(np.median(real.price))).scaleb(-2)
+        filters = {"branch_id": branch_id, "category_id": category_id, "free": True, "max_price": price}
+        free_q = Q()
+        for status in FREE_STATUSES:
+            free_q |= Q(status__status__iexact=status)
+        queryset = Cars.objects.filter(
+            free_q, branch_id=branch_id, category_id=category_id, daily_price__lte=price
+        )
+
+        snapshot_us = _per_call_us(lambda: fleet.count(**filters), repeat)
+        orm_us = _per_call_us(queryset.count, max(repeat // 20, 1))
+        car_ids = real.car_id.tolist()
+        sample = [random.Random(options["seed"]).choice(car_ids) for _ in range(repeat)]
+        started = time.perf_counter()
+        for car_id in sample:
+            fleet.get(car_id)
+        get_us = (time.perf_counter() - started) * 1e6 / repeat
+
+        self.stdout.write(f"Парк в базе: {len(real)} машин, {real.nbytes / 1024:.0f} КБ, полная загрузка {load_ms:.1f} мс")
+        self.stdout.write(f"  count() снимка: {snapshot_us:.0f} мкс, тот же COUNT(*) в базе: {orm_us:.0f} мкс")
+        self.stdout.write(f"  get(): {get_us:.1f} мкс")
+
+        expected, got = queryset.count(), fleet.count(**filters)
+        if expected != got:
+            raise CommandError(f"Снимок расходится с базой: {got} против {expected}")
+        self.stdout.write(self.style.SUCCESS(f"Сверено с базой: {got} машин по фильтру"))
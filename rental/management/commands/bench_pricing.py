@@ -0,0 +1,96 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+
+from rental import pricing
+from rental.models import Cars, PricingRules
+
+
+def _reference_quote(rules, car, start, end):
+    # прямой перебор правил по дням — эталон для проверки собранной таблицы
+    def matches(rule):
+        return rule.category_id in (None, car.category_id) and rule.branch_id in (None, car.branch_id)
+
+    days = (end - start).days + 1
+    total = 0.0
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        factor = 1.0
+        for rule in rules:
+            if rule.min_days or not matches(rule):
+                continue
+            if rule.date_from is None or rule.date_from <= day <= rule.date_to:
+                factor *= float(rule.multiplier)
+        total += factor
+    durations = [r for r in rules if r.min_days and r.min_days <= days and matches(r)]
+    if durations:
+        total *= float(max(durations, key=lambda r: (r.min_days, r.rule_id)).multiplier)
+    return round(float(car.daily_price) * total, 2)
+
+
+class Command(BaseCommand):
+    help = "Замеряет сборку правил ценообразования и пакетный расчёт цен; сверяет с прямым перебором правил."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--quotes", type=int, default=10_000)
+        parser.add_argument("--check", type=int, default=500, help="Сколько расчётов сверить с эталоном")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        cars = list(Cars.objects.only("car_id", "daily_price", "category_id", "branch_id"))
+        if not cars:
+            raise CommandError("В базе нет машин")
+        rules = list(PricingRules.objects.filter(is_active=True).order_by("rule_id"))
+
+        started = time.perf_counter()
+        engine = pricing.build_engine()
+        build_ms = (time.perf_counter() - started) * 1000
+
+        today = now().date()
+        sample = [rng.choice(cars) for _ in range(options["quotes"])]
+        starts = [today + timedelta(days=rng.randint(-30, 400)) for _ in sample]
+        ends = [start + timedelta(days=rng.randint(0, 40)) for start in starts]
+
+        started = time.perf_counter()
+        totals = engine.quote_batch(
+            [float(car.daily_price) for car in sample],
+            [car.category_id for car in sample],
+            [car.branch_id for car in sample],
+            starts,
+            ends,
+        )
+        batch_ms = (time.perf_counter() - started) * 1000
+
+        grid_cars = [(float(car.daily_price), car.category_id, car.branch_id) for car in cars[:100]]
+        grid_ranges = list(zip(starts[:100], ends[:100]))
+        started = time.perf_counter()
+        engine.quote_grid(grid_cars, grid_ranges)
+        grid_ms = (time.perf_counter() - started) * 1000
+
+        checked = min(options["check"], len(sample))
+        started = time.perf_counter()
+        for i in range(checked):
+            engine.quote(sample[i], starts[i], ends[i])
+        single_us = (time.perf_counter() - started) * 1e6 / max(checked, 1)
+
+        mismatches = [
+            i for i in range(checked)
+            if abs(_reference_quote(rules, sample[i], starts[i], ends[i]) - totals[i]) > 0.011
+        ]
+
+        self.stdout.write(f"Правил: {len(rules)}, сборка: {build_ms:.1f} мс")
+        self.stdout.write(f"Пакет {len(sample)} расчётов: {batch_ms:.1f} мс "
+                          f"({batch_ms * 1000 / len(sample):.2f} мкс на расчёт)")
+        self.stdout.write(f"Сетка {len(grid_cars)} машин × {len(grid_ranges)} периодов: {grid_ms:.1f} мс")
+        self.stdout.write(f"Одиночный quote(): {single_us:.0f} мкс")
+        if mismatches:
+            i = mismatches[0]
+            raise CommandError(
+                f"Расхождений с эталоном: {len(mismatches)} из {checked}; например машина {sample[i].pk} "
+                f"{starts[i]}–{ends[i]}: {totals[i]} против {_reference_quote(rules, sample[i], starts[i], ends[i])}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Сверено с эталоном: {checked} расчётов"))
@@ -0,0 +1,93 @@
+import json
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.timezone import now
+
+from rental import partitions
+
+QUERIES = {
+    "active_count": (
+        "SELECT COUNT(*) FROM {table} WHERE return_date >= %(today)s AND issue_date >= %(window_start)s"
+    ),
+    "week_count": "SELECT COUNT(*) FROM {table} WHERE issue_date >= %(week_ago)s",
+    "recent_page": (
+        "SELECT * FROM {table} WHERE issue_date >= %(month_ago)s ORDER BY issue_date DESC LIMIT 50"
+    ),
+    "revenue_12m": (
+        "SELECT date_trunc('month', issue_date), SUM(total_amount) FROM {table} "
+        "WHERE issue_date >= %(year_ago)s GROUP BY 1 ORDER BY 1"
+    ),
+}
+
+
+def _scanned_relations(plan):
+    found = set()
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if "Relation Name" in node:
+            found.add(node["Relation Name"])
+        stack.extend(node.get("Plans", []))
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет запросы «свежих договоров» на contracts и, для сравнения, "
+        "на несекционированной копии (contracts_unpartitioned), если она есть."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=20)
+        parser.add_argument("--compare", default=partitions.LEGACY_TABLE,
+                            help="Таблица для сравнения («до»); пропускается, если её нет")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Бенчмарк рассчитан на PostgreSQL")
+
+        today = now().date()
+        params = {
+            "today": today,
+            "window_start": today - timedelta(days=settings.CONTRACTS_MAX_RENTAL_DAYS),
+            "week_ago": today - timedelta(days=7),
+            "month_ago": today - timedelta(days=30),
+            "year_ago": today - timedelta(days=365),
+        }
+
+        tables = ["contracts"]
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [options["compare"]])
+            if cursor.fetchone()[0]:
+                tables.insert(0, options["compare"])
+
+            self.stdout.write(f"{'запрос':<14} {'таблица':<26} {'median, мс':>11} {'p95, мс':>9} {'таблиц в плане':>15}")
+            for name, template in QUERIES.items():
+                for table in tables:
+                    sql = template.format(table=f'"{table}"')
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+
+                    timings = []
+                    for _ in range(options["runs"]):
+                        started = time.perf_counter()
+                        cursor.execute(sql, params)
+                        cursor.fetchall()
+                        timings.append((time.perf_counter() - started) * 1000)
+                    timings.sort()
+
+                    cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+                    plan = cursor.fetchone()[0]
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+                    scanned = len(_scanned_relations(plan[0]["Plan"]))
+
+                    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                    self.stdout.write(
+                        f"{name:<14} {table:<26} {statistics.median(timings):>11.2f} {p95:>9.2f} {scanned:>15}"
+                    )
@@ -0,0 +1,107 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+
+# что делает воркер при старте: настройка Django, WSGI-приложение с middleware, разбор URLconf
+_WORKER_SCRIPT = """
+import importlib, json, resource, sys
+import django
+django.setup()
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+importlib.import_module(settings.ROOT_URLCONF)
+print(json.dumps({
+    "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": sorted(sys.modules),
+}))
+"""
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+# зависимости, которые не должны грузиться при старте воркера
+HEAVY_MODULES = ("reportlab", "numpy", "pyarrow", "httpx")
+
+
+def _parse_importtime(stderr):
+    # -> {модуль: (self мкс, cumulative мкс)}, суммарное время импортов верхнего уровня, мкс
+    modules = {}
+    total = 0
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = int(match.group(1)), int(match.group(2)), match.group(3), match.group(4)
+        modules[name] = (self_us, cumulative_us)
+        if len(indent) == 1:
+            total += cumulative_us
+    return modules, total
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет холодный старт воркера (django.setup + WSGI + URLconf) в отдельных процессах "
+        "через python -X importtime: время, RSS и самые дорогие импорты."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--top", type=int, default=15, help="Сколько самых дорогих импортов показать")
+        parser.add_argument("--history", help="Дописать результат строкой JSON в этот файл")
+
+    def handle(self, *args, **options):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", settings.SETTINGS_MODULE)}
+        walls, imports, rss = [], [], []
+        last_modules = {}
+        loaded = []
+
+        for _ in range(options["runs"]):
+            started = time.perf_counter()
+            proc = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", _WORKER_SCRIPT],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            walls.append((time.perf_counter() - started) * 1000)
+            if proc.returncode != 0:
+                raise CommandError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "воркер не стартовал")
+
+            last_modules, total_us = _parse_importtime(proc.stderr)
+            imports.append(total_us / 1000)
+            report = json.loads(proc.stdout.strip().splitlines()[-1])
+            rss.append(report["rss_kb"] / 1024)
+            loaded = report["modules"]
+
+        heavy = sorted({m.split(".")[0] for m in loaded if m.split(".")[0] in HEAVY_MODULES})
+        result = {
+            "at": now().isoformat(timespec="seconds"),
+            "runs": options["runs"],
+            "wall_ms": round(statistics.median(walls), 1),
+            "imports_ms": round(statistics.median(imports), 1),
+            "rss_mb": round(max(rss), 1),
+            "modules": len(loaded),
+            "heavy": heavy,
+        }
+
+        self.stdout.write(f"Старт воркера (медиана из {options['runs']}): {result['wall_ms']} мс, "
+                          f"из них импорты {result['imports_ms']} мс")
+        self.stdout.write(f"RSS: {result['rss_mb']} МБ, модулей загружено: {result['modules']}")
+        if heavy:
+            self.stdout.write(self.style.WARNING(f"При старте загружены тяжёлые зависимости: {', '.join(heavy)}"))
+
+        top = sorted(last_modules.items(), key=lambda item: -item[1][1])[:options["top"]]
+        if top:
+            self.stdout.write(f"\n{'модуль':<50} {'self, мс':>9} {'cumul, мс':>10}")
+        for name, (self_us, cumulative_us) in top:
+            self.stdout.write(f"{name:<50} {self_us / 1000:>9.1f} {cumulative_us / 1000:>10.1f}")
+
+        if options["history"]:
+            with open(options["history"], "a", encoding="utf-8") as f:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
@@ -0,0 +1,68 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from rental import query_plans
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(query_plans.__file__), "query_plan_baseline.json")
+
+
+class Command(BaseCommand):
+    help = (
+        "Открывает горячие страницы тестовым клиентом, выполняет EXPLAIN (FORMAT JSON) для их "
+        "SQL и падает, если в плане появился "
+        "Seq Scan по contracts/clients/cars больше порога или стоимость выросла относительно базовой."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threshold", type=int, default=10_000,
+                            help="Сколько строк таблицы допустимо читать полным просмотром")
+        parser.add_argument("--tolerance", type=float, default=0.25,
+                            help="Допустимый рост стоимости относительно базовой (0.25 = +25%%)")
+        parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+        parser.add_argument("--update-baseline", action="store_true",
+                            help="Записать текущие стоимости как базовые")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Проверка планов рассчитана на PostgreSQL")
+
+        baseline = None
+        if not options["update_baseline"]:
+            if not os.path.exists(options["baseline"]):
+                raise CommandError(f"Нет файла базовых стоимостей {options['baseline']}: запустите с --update-baseline")
+            with open(options["baseline"], encoding="utf-8") as f:
+                baseline = json.load(f)
+
+        results = query_plans.check_plans(baseline, options["threshold"], options["tolerance"])
+
+        self.stdout.write(f"{'запрос':<45} {'стоимость':>12} {'базовая':>12}  seq scan")
+        failed = 0
+        for name, cost, scanned, problems, sql in results:
+            expected = (baseline or {}).get(name)
+            scans = ", ".join(f"{t}~{rows}" for t, rows in sorted(scanned.items())) or "—"
+            cost_text = f"{cost:.0f}" if cost is not None else "—"
+            line = f"{name:<45} {cost_text:>12} {expected if expected is not None else '—':>12}  {scans}"
+            if problems:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"{line}  ✗ {'; '.join(problems)}"))
+                if sql:
+                    self.stdout.write(f"    {sql}")
+            else:
+                self.stdout.write(line)
+
+        if options["update_baseline"]:
+            with open(options["baseline"], "w", encoding="utf-8") as f:
+                json.dump({name: round(cost, 2) for name, cost, *_ in results}, f, indent=2, sort_keys=True)
+                f.write("\n")
+            self.stdout.write(self.style.SUCCESS(f"Базовые стоимости записаны в {options['baseline']}"))
+            return
+
+        if failed:
+            raise CommandError(
+                f"Регрессий в планах: {failed}. Если запросы на страницах изменились намеренно — "
+                f"перезапишите базовые: --update-baseline"
+            )
+        self.stdout.write(self.style.SUCCESS("Планы в норме"))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from rental.holds import expire_holds
+
+
+class Command(BaseCommand):
+    help = "Удаляет просроченные брони машин пачками (SKIP LOCKED). С --every работает как фоновый процесс."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=5000, help="Сколько броней удалять за одну транзакцию")
+        parser.add_argument("--every", type=float, default=0,
+                            help="Повторять раз в столько секунд (0 — один проход)")
+
+    def handle(self, *args, **options):
+        while True:
+            removed = expire_holds(options["batch"])
+            if removed or not options["every"]:
+                self.stdout.write(f"Просроченных броней удалено: {removed}")
+            if not options["every"]:
+                return
+            time.sleep(options["every"])
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from rental import dedup
+
+
+class Command(BaseCommand):
+    help = (
+        "Ищет вероятные дубли клиентов (опечатки в ФИО, другой формат телефона, общий email) "
+        "и складывает пары на проверку в client_duplicates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threshold", type=float, default=0.7, help="Минимальная оценка пары (0..1)")
+        parser.add_argument("--max-block", type=int, default=50,
+                            help="Блоки крупнее этого размера делятся по дате рождения и серии паспорта; "
+                                 "что не разделилось — пропускается")
+        parser.add_argument("--client", type=int, help="Проверить только одного клиента, ничего не сохраняя")
+
+    def handle(self, *args, **options):
+        if options["client"]:
+            for other, score, reasons in dedup.candidates_for(options["client"], options["threshold"]):
+                self.stdout.write(f"{other.client_id}\t{score:.3f}\t{other.full_name}\t{', '.join(reasons)}")
+            return
+
+        started = time.monotonic()
+        stats = dedup.rebuild_candidates(options["threshold"], options["max_block"])
+        elapsed = time.monotonic() - started
+        skipped = stats["skipped_blocks"]
+        self.stdout.write(self.style.SUCCESS(
+            f"Клиентов: {stats['clients']}, блоков: {stats['blocks']}, сравнений: {stats['compared']}, "
+            f"разделено крупных блоков: {stats['split_blocks']}, пропущено: {len(skipped)}, "
+            f"пар на проверку: {stats['candidates']} ({elapsed:.1f} с)"
+        ))
+        for block, size in skipped[:20]:
+            self.stdout.write(self.style.WARNING(f"  пропущен блок {block}: {size} клиентов"))
+        if len(skipped) > 20:
+            self.stdout.write(self.style.WARNING(f"  ... и ещё {len(skipped) - 20}"))
@@ -0,0 +1,195 @@
+import asyncio
+import random
+import re
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils.timezone import now
+
+from rental.models import Cars, Clients, ContractStatuses, Contracts, Employees
+
+_CSRF_INPUT_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+SEARCH_TERMS = ("ива", "пет", "сми", "кузн", "+7", "@mail", "алекс", "ольг")
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест работающего сервера: параллельные сессии сотрудников стойки "
+        "(вход, главная, поиск клиента, цена машины, новый договор, отчёт). "
+        "Печатает пропускную способность и p50/p95/p99 по именам URL из rental/urls.py. "
+        "Нужен httpx."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--email", required=True, help="Учётная запись сотрудника для входа")
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--concurrency", type=int, default=10, help="Сколько сотрудников работают одновременно")
+        parser.add_argument("--duration", type=float, default=30, help="Длительность теста, с")
+        parser.add_argument("--think-ms", type=int, default=200, help="Максимальная пауза между действиями")
+        parser.add_argument("--report-ratio", type=float, default=0.1,
+                            help="Доля сессий, которые скачивают отчёт по договорам")
+        parser.add_argument("--no-writes", action="store_true", help="Не оформлять договоры")
+        parser.add_argument("--keep", action="store_true", help="Не удалять договоры, созданные тестом")
+        parser.add_argument("--timeout", type=float, default=60)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            import httpx
+        except ImportError:
+            raise CommandError("Для нагрузочного теста нужен httpx: pip install httpx")
+
+        today = now().date()
+        # форма договора принимает только машины филиала сотрудника
+        employee = Employees.objects.filter(email__iexact=options["email"]).values_list("branch_id", flat=True).first()
+        cars = list(Cars.objects.for_branch(employee).order_by("?").values_list("car_id", "branch_id")[:200])
+        client_ids = list(Clients.objects.order_by("?").values_list("pk", flat=True)[:1000])
+        cstatus = ContractStatuses.objects.filter(status__istartswith="актив").first() or ContractStatuses.objects.first()
+        if not cars or not client_ids or cstatus is None:
+            raise CommandError("В базе нет машин, клиентов или статусов договоров")
+        last_contract = Contracts.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+
+        self.fixtures = {
+            "today": today,
+            "cars": cars,
+            "clients": client_ids,
+            "cstatus": cstatus.pk,
+        }
+        self.urls = {
+            "login": reverse("login"),
+            "logout": reverse("logout"),
+            "dashboard": reverse("dashboard"),
+            "client_list": reverse("client_list"),
+            "contract_add": reverse("contract_add"),
+            "report_contracts": reverse("report_contracts"),
+        }
+
+        samples = defaultdict(list)   # имя URL -> [(мс, статус)]
+        errors = defaultdict(int)
+        self.stdout.write(
+            f"{options['concurrency']} сотрудников, {options['duration']:.0f} с против {options['base_url']}"
+        )
+        started = time.perf_counter()
+        sessions = asyncio.run(self._run(httpx, options, samples, errors))
+        elapsed = time.perf_counter() - started
+
+        created = 0
+        if not options["no_writes"] and not options["keep"]:
+            # договоры, оформленные тестом: новые id по тем же клиентам и машинам
+            created, _ = Contracts.objects.filter(
+                pk__gt=last_contract,
+                client_id__in=client_ids,
+                car_id__in=[car_id for car_id, _ in cars],
+            ).delete()
+
+        total = sum(len(values) for values in samples.values())
+        self.stdout.write(f"\nСессий: {sessions}, запросов: {total}, за {elapsed:.1f} с — "
+                          f"{total / elapsed:.1f} запр/с")
+        self.stdout.write(
+            f"\n{'URL':<20} {'n':>6} {'запр/с':>8} {'ошибки':>7} "
+            f"{'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} {'max, мс':>9}"
+        )
+        for name in sorted(samples):
+            timings = [ms for ms, _ in samples[name]]
+            line = (
+                f"{name:<20} {len(timings):>6} {len(timings) / elapsed:>8.1f} {errors[name]:>7} "
+                f"{_percentile(timings, 50):>9.1f} {_percentile(timings, 95):>9.1f} "
+                f"{_percentile(timings, 99):>9.1f} {max(timings):>9.1f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if errors[name] else line)
+        if created:
+            self.stdout.write(f"\nУдалено договоров, созданных тестом: {created}")
+
+    async def _run(self, httpx, options, samples, errors):
+        deadline = time.perf_counter() + options["duration"]
+        limits = httpx.Limits(max_connections=options["concurrency"] * 2)
+        counter = {"sessions": 0}
+
+        async def clerk(index):
+            rng = random.Random(options["seed"] + index)
+            while time.perf_counter() < deadline:
+                async with httpx.AsyncClient(base_url=options["base_url"], timeout=options["timeout"],
+                                             limits=limits) as client:
+                    await self._session(client, rng, options, samples, errors)
+                counter["sessions"] += 1
+
+        await asyncio.gather(*(clerk(i) for i in range(options["concurrency"])))
+        return counter["sessions"]
+
+    async def _session(self, client, rng, options, samples, errors):
+        fixtures, urls = self.fixtures, self.urls
+
+        async def hit(name, method, url, expect=(200,), **kwargs):
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                status = response.status_code
+            except Exception:
+                response, status = None, 0
+            samples[name].append(((time.perf_counter() - started) * 1000, status))
+            if status not in expect:
+                errors[name] += 1
+            return response
+
+        async def think():
+            await asyncio.sleep(rng.uniform(0, options["think_ms"]) / 1000)
+
+        page = await hit("login", "GET", urls["login"])
+        if page is None:
+            return
+        login = await hit("login", "POST", urls["login"], expect=(302,), data={
+            "email": options["email"],
+            "password": options["password"],
+            "csrfmiddlewaretoken": client.cookies.get("csrftoken", ""),
+        }, headers={"Referer": options["base_url"] + urls["login"]})
+        if login is None or login.status_code != 302:
+            return
+        await think()
+
+        await hit("dashboard", "GET", urls["dashboard"])
+        await think()
+
+        await hit("client_list", "GET", urls["client_list"], params={"search": rng.choice(SEARCH_TERMS)})
+        await think()
+
+        car_id, branch_id = rng.choice(fixtures["cars"])
+        await hit("get_car_price", "GET", reverse("get_car_price", args=[car_id]))
+        await think()
+
+        if not options["no_writes"]:
+            form = await hit("contract_add", "GET", urls["contract_add"])
+            match = _CSRF_INPUT_RE.search(form.text) if form is not None else None
+            if match:
+                # ближайшие недели: секции contracts заведены на несколько месяцев вперёд
+                issue = fixtures["today"] + timedelta(days=rng.randint(1, 60))
+                ret = issue + timedelta(days=rng.randint(0, 6))
+                # 302 — договор оформлен, 200 — форма вернулась с ошибкой (машина занята и т.п.)
+                await hit("contract_add", "POST", urls["contract_add"], expect=(200, 302), data={
+                    "csrfmiddlewaretoken": match.group(1),
+                    "cstatus": fixtures["cstatus"],
+                    "client": rng.choice(fixtures["clients"]),
+                    "car": car_id,
+                    "created_at": fixtures["today"].isoformat(),
+                    "issue_date": issue.isoformat(),
+                    "return_date": ret.isoformat(),
+                    "payment": "наличный",
+                    "issue_branch": branch_id,
+                    "return_branch": branch_id,
+                }, headers={"Referer": options["base_url"] + urls["contract_add"]})
+            await think()
+
+        if rng.random() < options["report_ratio"]:
+            await hit("report_contracts", "GET", urls["report_contracts"])
+            await think()
+
+        await hit("logout", "GET", urls["logout"], expect=(302,))
@@ -0,0 +1,59 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from rental import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Секционирует таблицу contracts по issue_date (RANGE) и создаёт секции наперёд. "
+        "Повторный запуск на уже секционированной таблице только досоздаёт будущие секции."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", choices=["year", "month"], default=None,
+                            help="Размер секции (по умолчанию — как у существующих, иначе month)")
+        parser.add_argument("--ahead", type=int, default=3, help="Сколько будущих секций держать готовыми")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Секционирование поддерживается только для PostgreSQL")
+
+        ahead = max(options["ahead"], 1)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not partitions.is_partitioned(cursor):
+                referencing = partitions.referencing_tables(cursor)
+                if referencing:
+                    raise CommandError(
+                        "На contracts ссылаются внешние ключи из: " + ", ".join(referencing)
+                        + ". Секционированная таблица не может быть целью такого FK."
+                    )
+
+                interval = options["interval"] or "month"
+                try:
+                    copied = partitions.convert_to_partitioned(cursor, interval, ahead)
+                except ValueError as exc:
+                    raise CommandError(str(exc))
+                self.stdout.write(self.style.SUCCESS(
+                    f"contracts секционирована по {interval}: перенесено строк {copied}. "
+                    f"Старая таблица сохранена как {partitions.LEGACY_TABLE}."
+                ))
+                return
+
+            existing = partitions.list_partitions(cursor)
+            interval = options["interval"] or partitions.detect_interval(existing)
+            until = partitions.period_start(date.today(), interval)
+            for _ in range(ahead):
+                until = partitions.next_period(until, interval)
+            created = partitions.ensure_partitions(cursor, until, interval)
+            created += partitions.drain_default(cursor, interval)
+            if partitions.ensure_default_partition(cursor):
+                created.append(f"{partitions.PARENT_TABLE}_default")
+
+        if created:
+            self.stdout.write(self.style.SUCCESS("Созданы секции: " + ", ".join(created)))
+        else:
+            self.stdout.write("Все секции уже на месте")
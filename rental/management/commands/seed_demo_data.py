@@ -0,0 +1,149 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from rental import partitions, versions
+
+LOOKUPS = [
+    ("branches", ("name", "address", "contacts"), [
+        ("Центральный", "ул. Ленина 1", "+70000000001"),
+        ("Северный", "ул. Мира 5", "+70000000002"),
+        ("Южный", "пр. Победы 9", "+70000000003"),
+    ]),
+    ("car_categories", ("name",), [("Эконом",), ("Комфорт",), ("Бизнес",), ("Внедорожник",)]),
+    ("car_statuses", ("status",), [("свободен",), ("в аренде",), ("на ТО",)]),
+    ("contract_statuses", ("status",), [("активен",), ("закрыт",)]),
+    ("roles", ("name",), [("Администратор",), ("Менеджер",)]),
+]
+
+_CARS_SQL = """
+    INSERT INTO cars (plate, vin, brand, model, year_made, mileage, category_id, status_id, branch_id, daily_price)
+    SELECT 'D' || lpad(g::text, 8, '0'),
+           'DEMO' || lpad(g::text, 13, '0'),
+           (ARRAY['Toyota', 'Kia', 'Hyundai', 'Skoda', 'Lada', 'BMW'])[1 + g %% 6],
+           (ARRAY['Camry', 'Rio', 'Solaris', 'Octavia', 'Vesta', 'X5'])[1 + g %% 6],
+           2012 + g %% 12,
+           (random() * 200000)::int,
+           (SELECT array_agg(category_id ORDER BY category_id) FROM car_categories)[1 + g %% 4],
+           (SELECT array_agg(status_id ORDER BY status_id) FROM car_statuses)[1 + (g %% 10 = 0)::int],
+           (SELECT array_agg(branch_id ORDER BY branch_id) FROM branches)[1 + g %% 3],
+           (1500 + (random() * 8500)::int)::numeric(10, 2)
+    FROM generate_series(1, %(cars)s) g
+    ON CONFLICT DO NOTHING
+"""
+
+_CLIENTS_SQL = """
+    INSERT INTO clients (full_name, birth_date, passport, dl_number, phone, email, address)
+    SELECT (ARRAY['Иванов', 'Петров', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Соколов', 'Михайлов'])[1 + g %% 8]
+               || ' ' || (ARRAY['Иван', 'Пётр', 'Алексей', 'Сергей', 'Дмитрий', 'Андрей'])[1 + (g / 8) %% 6]
+               || ' ' || (ARRAY['Иванович', 'Петрович', 'Сергеевич', 'Андреевич'])[1 + (g / 48) %% 4],
+           DATE '1960-01-01' + (random() * 15000)::int,
+           'D' || lpad(g::text, 10, '0'),
+           'DL' || lpad(g::text, 10, '0'),
+           '+7' || (9000000000::bigint + g),
+           'client' || g || '@example.com',
+           'г. Москва, ул. Тестовая, д. ' || (1 + g %% 200)
+    FROM generate_series(1, %(clients)s) g
+    ON CONFLICT DO NOTHING
+"""
+
+_EMPLOYEES_SQL = """
+    INSERT INTO employees (full_name, passport, role_id, branch_id, phone, email)
+    SELECT 'Сотрудник ' || g,
+           'E' || lpad(g::text, 10, '0'),
+           (SELECT array_agg(role_id ORDER BY role_id) FROM roles)[1 + (g %% 5 > 0)::int],
+           (SELECT array_agg(branch_id ORDER BY branch_id) FROM branches)[1 + g %% 3],
+           '+7' || (9500000000::bigint + g),
+           'employee' || g || '@example.com'
+    FROM generate_series(1, %(employees)s) g
+    ON CONFLICT DO NOTHING
+"""
+
+_CONTRACTS_SQL = """
+    WITH ids AS (
+        SELECT (SELECT array_agg(car_id) FROM cars) AS cars,
+               (SELECT array_agg(client_id) FROM clients) AS clients,
+               (SELECT array_agg(branch_id ORDER BY branch_id) FROM branches) AS branches
+    ),
+    picked AS (
+        SELECT ids.cars[1 + (random() * (cardinality(ids.cars) - 1))::int] AS car_id,
+               ids.clients[1 + (random() * (cardinality(ids.clients) - 1))::int] AS client_id,
+               ids.branches[1 + g %% cardinality(ids.branches)] AS issue_branch_id,
+               ids.branches[1 + (g / 7) %% cardinality(ids.branches)] AS return_branch_id,
+               %(today)s::date - (random() * %(days)s)::int AS issue_date,
+               1 + (random() * 14)::int AS length,
+               g
+        FROM generate_series(1, %(contracts)s) g, ids
+    )
+    INSERT INTO contracts (cstatus_id, client_id, car_id, created_at, issue_date, return_date, payment,
+                           issue_branch_id, return_branch_id, rent_period, daily_price, total_amount)
+    SELECT (SELECT cstatus_id FROM contract_statuses
+            WHERE status = CASE WHEN p.issue_date + p.length < %(today)s THEN 'закрыт' ELSE 'активен' END),
+           p.client_id, p.car_id, p.issue_date, p.issue_date, p.issue_date + p.length,
+           CASE WHEN p.g %% 3 = 0 THEN 'наличный' ELSE 'безналичный' END,
+           p.issue_branch_id, p.return_branch_id,
+           daterange(p.issue_date, p.issue_date + p.length, '[]'),
+           c.daily_price, c.daily_price * (p.length + 1)
+    FROM picked p
+    JOIN cars c ON c.car_id = p.car_id
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет локальную базу PostgreSQL демонстрационными данными (машины, клиенты, договоры) — "
+        "для бенчмарков и check_query_plans. Схема таблиц должна уже существовать."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cars", type=int, default=3_000)
+        parser.add_argument("--clients", type=int, default=50_000)
+        parser.add_argument("--contracts", type=int, default=300_000)
+        parser.add_argument("--employees", type=int, default=30)
+        parser.add_argument("--years", type=int, default=5, help="Глубина истории договоров")
+        parser.add_argument("--seed", type=float, default=0.42, help="setseed() для повторяемых данных")
+        parser.add_argument("--append", action="store_true",
+                            help="Добавить к существующим данным (по умолчанию только в пустую базу)")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Генератор рассчитан на PostgreSQL")
+
+        today = now().date()
+        days = 365 * options["years"]
+        params = {**options, "today": today, "days": days}
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM contracts)")
+            if cursor.fetchone()[0] and not options["append"]:
+                raise CommandError("В contracts уже есть данные; используйте --append")
+
+            cursor.execute("SELECT setseed(%s)", [options["seed"]])
+            for table, columns, rows in LOOKUPS:
+                placeholders = ", ".join(["%s"] * len(columns))
+                cursor.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) ON CONFLICT DO NOTHING",
+                    rows,
+                )
+
+            if partitions.is_partitioned(cursor):
+                # секции под всю историю и на месяц вперёд
+                interval = partitions.detect_interval(partitions.list_partitions(cursor))
+                start = partitions.period_start(today - timedelta(days=days), interval)
+                while start <= today + timedelta(days=31):
+                    partitions.create_partition(cursor, start, interval)
+                    start = partitions.next_period(start, interval)
+
+            for label, sql in (("машин", _CARS_SQL), ("клиентов", _CLIENTS_SQL),
+                               ("сотрудников", _EMPLOYEES_SQL), ("договоров", _CONTRACTS_SQL)):
+                cursor.execute(sql, params)
+                self.stdout.write(f"Добавлено {label}: {cursor.rowcount}")
+
+            versions.bump(*versions.TRACKED_MODELS)
+
+        with connection.cursor() as cursor:
+            for table in ("cars", "clients", "employees", "contracts"):
+                cursor.execute(f'ANALYZE "{table}"')
+        self.stdout.write(self.style.SUCCESS("Готово"))
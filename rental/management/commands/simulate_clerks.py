@@ -0,0 +1,195 @@
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils.timezone import now
+
+from rental import holds
+from rental.forms import ContractForm
+from rental.models import Cars, Clients, ContractStatuses, Contracts
+
+_LOCK_WAITERS_SQL = """
+    SELECT count(*) FROM pg_stat_activity
+    WHERE wait_event_type = 'Lock' AND datname = current_database()
+"""
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочная проверка броней: много сотрудников одновременно бронируют и оформляют "
+        "несколько машин на одни и те же даты. Проверяет, что двойных броней нет и запросы "
+        "не выстраиваются в очередь на блокировках. Созданные договоры и пользователи удаляются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clerks", type=int, default=30, help="Сколько сотрудников работают одновременно")
+        parser.add_argument("--cars", type=int, default=5, help="Сколько машин делят между собой")
+        parser.add_argument("--attempts", type=int, default=40, help="Попыток оформления на сотрудника")
+        parser.add_argument("--days", type=int, default=30, help="Длина окна дат, начиная с завтра")
+        parser.add_argument("--think-ms", type=int, default=20,
+                            help="Пауза между бронью и сохранением договора (заполнение формы)")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--keep", action="store_true", help="Не удалять созданные договоры")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Симуляция рассчитана на PostgreSQL (NOWAIT / SKIP LOCKED)")
+
+        start = now().date() + timedelta(days=1)
+        end = start + timedelta(days=options["days"] - 1)
+        # машины, свободные на всё окно: любые пересечения — только между участниками симуляции
+        busy = Contracts.objects.in_period(start, end).values("car_id")
+        pool = list(Cars.objects.exclude(car_id__in=busy).order_by("?")[:options["cars"]])
+        client_ids = list(Clients.objects.order_by("?").values_list("pk", flat=True)[:1000])
+        cstatus = ContractStatuses.objects.filter(status__istartswith="актив").first() or ContractStatuses.objects.first()
+        if not pool or not client_ids or cstatus is None:
+            raise CommandError("Нет свободных машин, клиентов или статусов договоров")
+
+        token = uuid.uuid4().hex[:8]
+        clerks = [
+            User.objects.create_user(f"sim-clerk-{token}-{i}", password=None)
+            for i in range(options["clerks"])
+        ]
+        self.stdout.write(
+            f"{len(clerks)} сотрудников × {options['attempts']} попыток, машин: {len(pool)}, "
+            f"окно {start:%d.%m}–{end:%d.%m}"
+        )
+
+        created = []
+        outcomes = Counter()
+        timings = defaultdict(list)
+        merge_lock = threading.Lock()
+        barrier = threading.Barrier(len(clerks))
+        done = threading.Event()
+        waiters = []
+
+        def clerk(index, user):
+            rng = random.Random(options["seed"] + index)
+            local_outcomes, local_timings, local_created = Counter(), defaultdict(list), []
+            try:
+                barrier.wait()
+                for _ in range(options["attempts"]):
+                    car = rng.choice(pool)
+                    issue = start + timedelta(days=rng.randrange(options["days"]))
+                    ret = min(end, issue + timedelta(days=rng.randint(0, 4)))
+
+                    started = time.perf_counter()
+                    try:
+                        holds.place_hold(user, car.pk, issue, ret)
+                    except holds.HoldError as exc:
+                        local_outcomes["hold: машина занята блокировкой" if exc.__cause__ else "hold: даты заняты"] += 1
+                        continue
+                    finally:
+                        local_timings["place_hold"].append((time.perf_counter() - started) * 1000)
+                    local_outcomes["hold: ok"] += 1
+
+                    time.sleep(options["think_ms"] / 1000)
+                    form = ContractForm(data={
+                        "cstatus": cstatus.pk,
+                        "client": rng.choice(client_ids),
+                        "car": car.pk,
+                        "created_at": issue.isoformat(),
+                        "issue_date": issue.isoformat(),
+                        "return_date": ret.isoformat(),
+                        "payment": "наличный",
+                        "issue_branch": car.branch_id,
+                        "return_branch": car.branch_id,
+                    })
+                    if not form.is_valid():
+                        local_outcomes["договор: ошибка формы"] += 1
+                        continue
+
+                    started = time.perf_counter()
+                    try:
+                        contract = holds.book_contract(form, user)
+                    except holds.HoldError as exc:
+                        local_outcomes["договор: блокировка" if exc.__cause__ else "договор: даты заняты"] += 1
+                        continue
+                    finally:
+                        local_timings["book_contract"].append((time.perf_counter() - started) * 1000)
+                    local_outcomes["договор: оформлен"] += 1
+                    local_created.append(contract.pk)
+            finally:
+                connections.close_all()
+                with merge_lock:
+                    outcomes.update(local_outcomes)
+                    for name, values in local_timings.items():
+                        timings[name].extend(values)
+                    created.extend(local_created)
+
+        def monitor():
+            # сколько соединений одновременно ждут блокировку — признак очереди
+            try:
+                with connections["default"].cursor() as cursor:
+                    while not done.is_set():
+                        cursor.execute(_LOCK_WAITERS_SQL)
+                        waiters.append(cursor.fetchone()[0])
+                        time.sleep(0.01)
+            finally:
+                connections.close_all()
+
+        watcher = threading.Thread(target=monitor)
+        threads = [threading.Thread(target=clerk, args=(i, user)) for i, user in enumerate(clerks)]
+        started = time.perf_counter()
+        watcher.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        watcher.join()
+
+        try:
+            double = self._double_bookings(created)
+        finally:
+            if not options["keep"]:
+                Contracts.objects.filter(pk__in=created).delete()
+            User.objects.filter(pk__in=[u.pk for u in clerks]).delete()
+
+        self.stdout.write(f"\nЗа {elapsed:.1f} с:")
+        for name, count in sorted(outcomes.items()):
+            self.stdout.write(f"  {name:<36} {count:>6}")
+        self.stdout.write(f"\n{'операция':<16} {'n':>6} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} {'max, мс':>9}")
+        for name, values in sorted(timings.items()):
+            self.stdout.write(
+                f"{name:<16} {len(values):>6} {_percentile(values, 50):>9.1f} {_percentile(values, 95):>9.1f} "
+                f"{_percentile(values, 99):>9.1f} {max(values):>9.1f}"
+            )
+        self.stdout.write(f"\nЖдущих блокировку соединений: максимум {max(waiters, default=0)}, "
+                          f"в среднем {sum(waiters) / max(len(waiters), 1):.2f}")
+
+        if double:
+            for first, second in double[:10]:
+                self.stdout.write(self.style.ERROR(f"  пересечение: договоры №{first} и №{second}"))
+            raise CommandError(f"Двойных броней: {len(double)}")
+        self.stdout.write(self.style.SUCCESS(f"Двойных броней нет ({len(created)} договоров)"))
+
+    def _double_bookings(self, contract_ids):
+        rows = (
+            Contracts.objects.filter(pk__in=contract_ids)
+            .order_by("car_id", "issue_date")
+            .values_list("car_id", "issue_date", "return_date", "contract_id")
+        )
+        double = []
+        last = {}
+        for car_id, issue, ret, contract_id in rows:
+            previous = last.get(car_id)
+            if previous and issue <= previous[0]:
+                double.append((previous[1], contract_id))
+            if not previous or ret > previous[0]:
+                last[car_id] = (ret, contract_id)
+        return double
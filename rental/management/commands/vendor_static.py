@@ -0,0 +1,55 @@
+import hashlib
+import os
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from rental.staticfiles import VENDOR_ASSETS, VENDOR_CHECKSUMS, file_sha256
+
+
+class Command(BaseCommand):
+    help = (
+        "Скачивает сторонние CSS/JS (Bootstrap, Chart.js) в rental/static/vendor/ "
+        "и записывает их sha256 в vendor/SHA256SUMS"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Перекачать уже скачанные файлы")
+
+    def handle(self, *args, **options):
+        static_dir = os.path.join(settings.BASE_DIR, "rental", "static")
+        manifest = os.path.join(static_dir, VENDOR_CHECKSUMS)
+        checksums = {}
+        if os.path.exists(manifest):
+            with open(manifest, encoding="utf-8") as f:
+                checksums = {path: digest for digest, path in (line.split(None, 1) for line in f.read().splitlines() if line)}
+
+        for name, (path, url) in VENDOR_ASSETS.items():
+            target = os.path.join(static_dir, path)
+            if os.path.exists(target) and not options["force"]:
+                # уже закоммиченный файл сверяем с записанной контрольной суммой
+                if path in checksums and file_sha256(target) != checksums[path]:
+                    raise CommandError(f"{name}: {path} не совпадает с {VENDOR_CHECKSUMS}; перекачайте с --force")
+                checksums[path] = file_sha256(target)
+                self.stdout.write(f"{name}: уже есть ({path})")
+                continue
+
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                with urllib.request.urlopen(url, timeout=30) as resp:
+                    data = resp.read()
+            except OSError as exc:
+                raise CommandError(f"{name}: не удалось скачать {url}: {exc}")
+
+            tmp_path = target + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, target)
+            checksums[path] = hashlib.sha256(data).hexdigest()
+            self.stdout.write(self.style.SUCCESS(f"{name}: {path} ({len(data)} байт)"))
+
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.writelines(f"{digest}  {path}\n" for path, digest in sorted(checksums.items()))
+
+        self.stdout.write("Дальше: manage.py collectstatic — соберёт хешированные и сжатые копии.")
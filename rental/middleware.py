@@ -0,0 +1,185 @@
+import mimetypes
+import os
+import re
+import time
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseForbidden, HttpResponseNotModified
+from django.middleware.gzip import GZipMiddleware
+from django.urls import reverse
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from . import audit, invalidation, versions
+from .db_routers import pin_to_primary, unpin
+from .models import Employees
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+REPLICA_PIN_SESSION_KEY = "replica_pinned_until"
+BRANCH_OVERRIDE_SESSION_KEY = "branch_override"
+EMPLOYEE_BRANCH_SESSION_KEY = "employee_branch"
+ALL_BRANCHES = "all"
+
+
+class ReplicaPinMiddleware:
+    # после записи читаем свои же данные с основной базы, пока реплика догоняет
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        session = getattr(request, "session", None)
+        pinned_until = session.get(REPLICA_PIN_SESSION_KEY, 0) if session is not None else 0
+        token = pin_to_primary(pinned_until > time.time())
+        try:
+            response = self.get_response(request)
+        finally:
+            unpin(token)
+
+        if session is not None and request.method not in SAFE_METHODS:
+            session[REPLICA_PIN_SESSION_KEY] = time.time() + getattr(settings, "REPLICA_STICKY_SECONDS", 10)
+        return response
+
+
+def _employees_version():
+    # счётчик employees из table_versions; в кеше воркера до NOTIFY об изменении таблицы
+    return invalidation.cache.get_or_set(
+        "employees_version", (Employees,), lambda: versions.get_versions(Employees)["employees"][0]
+    )
+
+
+class BranchScopeMiddleware:
+    # request.branch_id — филиал, которым ограничены списки, формы, дашборды и отчёты.
+    # Филиал сотрудника (User.username = Employees.email) ищется раз на сессию и хранится
+    # в ней вместе со счётчиком employees: любое изменение таблицы (перевод сотрудника
+    # в другой филиал, employee_bulk) меняет счётчик, и филиал ищется заново.
+    # Администратор может выбрать другой филиал или все (branch_switch).
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def _employee_branch(request, user):
+        version = _employees_version()
+        cached = request.session.get(EMPLOYEE_BRANCH_SESSION_KEY)
+        if cached is not None and cached[0] == user.pk and cached[2] == version:
+            return cached[1]
+        branch_id = (
+            Employees.objects
+            .filter(email__iexact=user.username)
+            .values_list("branch_id", flat=True)
+            .first()
+        )
+        request.session[EMPLOYEE_BRANCH_SESSION_KEY] = [user.pk, branch_id, version]
+        return branch_id
+
+    def __call__(self, request):
+        request.employee_branch_id = None
+        request.branch_id = None
+
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            request.employee_branch_id = self._employee_branch(request, user)
+            if user.is_staff:
+                request.branch_id = request.employee_branch_id
+                override = request.session.get(BRANCH_OVERRIDE_SESSION_KEY)
+                if override is not None:
+                    request.branch_id = None if override == ALL_BRANCHES else override
+            elif request.employee_branch_id is not None:
+                request.branch_id = request.employee_branch_id
+            elif request.path not in (reverse("login"), reverse("logout")):
+                # branch_id = None значит «все филиалы»: обычному пользователю
+                # без строки в employees не показываем ничего
+                return HttpResponseForbidden("Пользователь не привязан к филиалу")
+
+        return self.get_response(request)
+
+
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{12}\.[A-Za-z0-9]+$")
+STATIC_ENCODINGS = ((".br", "br"), (".gz", "gzip"))
+
+
+class AuditMiddleware:
+    # записи журнала, накопленные представлением, уходят писателю одной пачкой —
+    # только если представление отработало: при исключении (или ответе 500, в который
+    # его превратил Django) транзакция представления откатилась, и записи отбрасываются
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            audit.pending(request)
+            raise
+        entries = audit.pending(request)
+        if response.status_code < 500:
+            audit.submit(entries)
+        return response
+
+
+class StaticFilesMiddleware:
+    # раздаёт собранную статику (collectstatic) без внешнего CDN:
+    # заранее сжатые варианты и долгий кеш для хешированных имён
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.root = str(settings.STATIC_ROOT) if settings.STATIC_ROOT else None
+        self.prefix = "/" + settings.STATIC_URL.lstrip("/")
+
+    def __call__(self, request):
+        if self.root and request.method in ("GET", "HEAD") and request.path.startswith(self.prefix):
+            response = self._serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def _serve(self, request, name):
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        content_type, _ = mimetypes.guess_type(path)
+        accept = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        served_path, encoding = path, None
+        for suffix, candidate in STATIC_ENCODINGS:
+            if candidate in accept and os.path.isfile(path + suffix):
+                served_path, encoding = path + suffix, candidate
+                break
+
+        stat = os.stat(served_path)
+        if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(served_path, "rb"), content_type=content_type or "application/octet-stream")
+            response["Content-Length"] = stat.st_size
+            del response["Content-Disposition"]
+            if encoding:
+                response["Content-Encoding"] = encoding
+
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        response["Vary"] = "Accept-Encoding"
+        if HASHED_NAME_RE.search(name):
+            response["Cache-Control"] = "public, max-age=%d, immutable" % settings.STATIC_MAX_AGE
+        else:
+            response["Cache-Control"] = "public, max-age=60"
+        return response
+
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    # gzip для HTML-страниц и JSON — средствами Django: в HTML есть CSRF-токен, и
+    # GZipMiddleware добавляет к ответу случайные байты против BREACH. Brotli — только
+    # для статики (StaticFilesMiddleware). Потоки (SSE, файлы PDF) и мелкие ответы не трогаем
+    def process_response(self, request, response):
+        if response.streaming or not response.get("Content-Type", "").startswith(COMPRESSIBLE_TYPES):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            patch_vary_headers(response, ("Accept-Encoding",))
+            return response
+        return super().process_response(request, response)
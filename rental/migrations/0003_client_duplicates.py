@@ -0,0 +1,50 @@
+# Generated by Django 4.2.23 on 2026-10-19 14:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0002_table_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientDuplicates',
+            fields=[
+                ('dup_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('score', models.FloatField()),
+                ('reasons', models.CharField(blank=True, max_length=120)),
+                ('status', models.CharField(choices=[('new', 'Новая'), ('dismissed', 'Не дубликат')], default='new', max_length=12)),
+                ('found_at', models.DateTimeField(auto_now_add=True)),
+                ('client_a', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='rental.clients')),
+                ('client_b', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='rental.clients')),
+            ],
+            options={
+                'db_table': 'client_duplicates',
+                'indexes': [models.Index(fields=['status', '-score'], name='client_duplicates_review_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='clientduplicates',
+            constraint=models.UniqueConstraint(fields=('client_a', 'client_b'), name='client_duplicates_pair_uniq'),
+        ),
+        # ключи блокирования для поиска дублей по одному клиенту (clients — неуправляемая таблица)
+        migrations.RunSQL(
+            sql=r"""
+                DO $$
+                BEGIN
+                    IF to_regclass('clients') IS NOT NULL THEN
+                        CREATE INDEX IF NOT EXISTS clients_email_lower_idx ON clients (lower(btrim(email)));
+                        CREATE INDEX IF NOT EXISTS clients_phone_digits_idx ON clients (regexp_replace(phone, '\D', '', 'g'));
+                    END IF;
+                END $$;
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS clients_email_lower_idx;
+                DROP INDEX IF EXISTS clients_phone_digits_idx;
+            """,
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0003_client_duplicates'),
+    ]
+
+    operations = [
+        # Contracts.objects.active(): без индекса по return_date каждая секция
+        # последнего года читается целиком (contracts — неуправляемая таблица)
+        migrations.RunSQL(
+            sql="""
+                DO $$
+                BEGIN
+                    IF to_regclass('contracts') IS NOT NULL THEN
+                        CREATE INDEX IF NOT EXISTS contracts_return_date_idx ON contracts (return_date);
+                    END IF;
+                END $$;
+            """,
+            reverse_sql="DROP INDEX IF EXISTS contracts_return_date_idx;",
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0004_contracts_return_date_idx'),
+    ]
+
+    operations = [
+        # счётчики и списки филиала (BranchScopedQuerySet.for_branch) читают только свой срез
+        migrations.RunSQL(
+            sql="""
+                DO $$
+                BEGIN
+                    IF to_regclass('cars') IS NOT NULL THEN
+                        CREATE INDEX IF NOT EXISTS cars_branch_status_idx ON cars (branch_id, status_id);
+                    END IF;
+                    IF to_regclass('employees') IS NOT NULL THEN
+                        CREATE INDEX IF NOT EXISTS employees_branch_idx ON employees (branch_id);
+                    END IF;
+                    IF to_regclass('contracts') IS NOT NULL THEN
+                        CREATE INDEX IF NOT EXISTS contracts_issue_branch_date_idx ON contracts (issue_branch_id, issue_date);
+                        CREATE INDEX IF NOT EXISTS contracts_issue_branch_return_idx ON contracts (issue_branch_id, return_date);
+                    END IF;
+                END $$;
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS cars_branch_status_idx;
+                DROP INDEX IF EXISTS employees_branch_idx;
+                DROP INDEX IF EXISTS contracts_issue_branch_date_idx;
+                DROP INDEX IF EXISTS contracts_issue_branch_return_idx;
+            """,
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-19 14:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('rental', '0005_branch_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarHolds',
+            fields=[
+                ('hold_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('car', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='rental.cars')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'car_holds',
+                'indexes': [models.Index(fields=['car', 'expires_at'], name='car_holds_car_expires_idx'), models.Index(fields=['expires_at'], name='car_holds_expires_idx')],
+            },
+        ),
+    ]
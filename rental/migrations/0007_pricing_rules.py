@@ -0,0 +1,44 @@
+# Generated by Django 4.2.23 on 2026-10-19 15:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0006_car_holds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingRules',
+            fields=[
+                ('rule_id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=120)),
+                ('date_from', models.DateField(blank=True, null=True)),
+                ('date_to', models.DateField(blank=True, null=True)),
+                ('min_days', models.PositiveIntegerField(blank=True, null=True)),
+                ('multiplier', models.DecimalField(decimal_places=4, max_digits=6)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='rental.branches')),
+                ('category', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='rental.carcategories')),
+            ],
+            options={
+                'db_table': 'pricing_rules',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pricingrules',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('date_from__isnull', True), ('date_to__isnull', True)), models.Q(('date_from__isnull', False), ('date_from__lte', models.F('date_to')), ('date_to__isnull', False)), _connector='OR'), name='pricing_rules_period_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='pricingrules',
+            constraint=models.CheckConstraint(check=models.Q(('min_days__isnull', True), ('date_from__isnull', True), _connector='OR'), name='pricing_rules_duration_no_period'),
+        ),
+        migrations.AddConstraint(
+            model_name='pricingrules',
+            constraint=models.CheckConstraint(check=models.Q(('multiplier__gt', 0)), name='pricing_rules_multiplier_positive'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.23 on 2026-10-19 15:03
+
+from datetime import date
+
+from django.db import migrations, models
+
+from rental import partitions
+
+
+def create_partitions(apps, schema_editor):
+    # текущий месяц и три вперёд; дальше секции досоздаёт писатель журнала (rental/audit.py)
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    until = date.today()
+    for _ in range(3):
+        until = partitions.next_period(partitions.period_start(until, "month"), "month")
+    with schema_editor.connection.cursor() as cursor:
+        partitions.ensure_partitions(cursor, until, "month", table="audit_log")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0007_pricing_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditLog',
+            fields=[
+                ('audit_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('changed_at', models.DateTimeField()),
+                ('table_name', models.CharField(max_length=63)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('create', 'Создание'), ('update', 'Изменение'), ('delete', 'Удаление')], max_length=8)),
+                ('changes', models.JSONField(default=dict)),
+            ],
+            options={
+                'db_table': 'audit_log',
+                'managed': False,
+            },
+        ),
+        migrations.RunSQL(
+            sql="""
+                CREATE TABLE IF NOT EXISTS audit_log (
+                    audit_id bigint GENERATED BY DEFAULT AS IDENTITY,
+                    changed_at timestamp with time zone NOT NULL,
+                    user_id integer NULL,
+                    table_name varchar(63) NOT NULL,
+                    object_id bigint NOT NULL,
+                    action varchar(8) NOT NULL,
+                    changes jsonb NOT NULL DEFAULT '{}',
+                    PRIMARY KEY (audit_id, changed_at)
+                ) PARTITION BY RANGE (changed_at);
+
+                -- история одного объекта: последние изменения первыми
+                CREATE INDEX IF NOT EXISTS audit_log_object_idx ON audit_log (table_name, object_id, changed_at DESC);
+
+                CREATE OR REPLACE FUNCTION audit_log_append_only() RETURNS trigger AS $$
+                BEGIN
+                    RAISE EXCEPTION 'audit_log: разрешено только добавление записей';
+                END $$ LANGUAGE plpgsql;
+
+                DROP TRIGGER IF EXISTS audit_log_append_only ON audit_log;
+                CREATE TRIGGER audit_log_append_only BEFORE UPDATE OR DELETE ON audit_log
+                    FOR EACH ROW EXECUTE FUNCTION audit_log_append_only();
+            """,
+            reverse_sql="""
+                DROP TABLE IF EXISTS audit_log;
+                DROP FUNCTION IF EXISTS audit_log_append_only();
+            """,
+        ),
+        migrations.RunPython(create_partitions, migrations.RunPython.noop),
+    ]
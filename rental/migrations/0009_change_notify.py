@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+def create_triggers(apps, schema_editor):
+    # NOTIFY для живых показателей главной (rental/live.py); по триггеру на оператор,
+    # а не на строку: массовое изменение — одно уведомление. Уходит при COMMIT.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("""
+        CREATE OR REPLACE FUNCTION rental_notify_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('rental_changes', TG_TABLE_NAME);
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql;
+    """)
+    for table in ("cars", "contracts"):
+        schema_editor.execute(f"""
+            DROP TRIGGER IF EXISTS {table}_notify_change ON {table};
+            CREATE TRIGGER {table}_notify_change
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+                FOR EACH STATEMENT EXECUTE FUNCTION rental_notify_change();
+        """)
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table in ("cars", "contracts"):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_notify_change ON {table}")
+    schema_editor.execute("DROP FUNCTION IF EXISTS rental_notify_change()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0008_audit_log'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -0,0 +1,60 @@
+import logging
+
+from django.db import DatabaseError, migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+# поля поиска по спискам (icontains -> UPPER(col::text) LIKE UPPER('%...%'));
+# без триграммного индекса такой LIKE читает таблицу целиком на каждое нажатие клавиши
+SEARCH_FIELDS = {
+    "clients": ("full_name", "passport", "phone", "email"),
+    "cars": ("plate", "vin", "brand", "model"),
+}
+
+
+def _index_name(table, field):
+    return f"{table}_{field}_trgm_idx"
+
+
+def create_indexes(apps, schema_editor):
+    # pg_trgm — contrib-модуль: на сервере без него (или без прав на CREATE EXTENSION)
+    # поиск работает как раньше, просто без индексов
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            logger.warning("pg_trgm недоступен — индексы для поиска не созданы")
+            return
+    try:
+        with transaction.atomic(using=connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError:
+        logger.warning("Нет прав на CREATE EXTENSION pg_trgm — индексы для поиска не созданы", exc_info=True)
+        return
+    for table, fields in SEARCH_FIELDS.items():
+        for field in fields:
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {_index_name(table, field)} "
+                f"ON {table} USING gin (upper({field}::text) gin_trgm_ops)"
+            )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, fields in SEARCH_FIELDS.items():
+        for field in fields:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {_index_name(table, field)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0009_change_notify'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations
+
+
+def create_log(apps, schema_editor):
+    # журнал изменённых машин для снимка парка в памяти воркеров (rental/fleet.py):
+    # по нему снимок перечитывает только изменённые строки. xid — транзакция записи:
+    # по горизонту pg_snapshot_xmin читатель не пропускает транзакции, закоммиченные
+    # позже соседних (change_id раздаётся до COMMIT и порядок коммитов не отражает)
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("""
+        CREATE TABLE IF NOT EXISTS cars_changes (
+            change_id bigserial PRIMARY KEY,
+            car_id integer,
+            xid xid8 NOT NULL DEFAULT pg_current_xact_id(),
+            changed_at timestamp NOT NULL DEFAULT localtimestamp
+        );
+        CREATE INDEX IF NOT EXISTS cars_changes_xid_idx ON cars_changes (xid);
+        CREATE INDEX IF NOT EXISTS cars_changes_changed_at_idx ON cars_changes (changed_at);
+    """)
+    # car_id IS NULL — TRUNCATE: снимок перечитывается целиком
+    schema_editor.execute("""
+        CREATE OR REPLACE FUNCTION rental_log_car_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                INSERT INTO cars_changes (car_id) VALUES (NULL);
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO cars_changes (car_id) VALUES (OLD.car_id);
+            ELSE
+                INSERT INTO cars_changes (car_id) VALUES (NEW.car_id);
+                IF TG_OP = 'UPDATE' AND OLD.car_id <> NEW.car_id THEN
+                    INSERT INTO cars_changes (car_id) VALUES (OLD.car_id);
+                END IF;
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS cars_log_change ON cars;
+        CREATE TRIGGER cars_log_change
+            AFTER INSERT OR UPDATE OR DELETE ON cars
+            FOR EACH ROW EXECUTE FUNCTION rental_log_car_change();
+        DROP TRIGGER IF EXISTS cars_log_truncate ON cars;
+        CREATE TRIGGER cars_log_truncate
+            AFTER TRUNCATE ON cars
+            FOR EACH STATEMENT EXECUTE FUNCTION rental_log_car_change();
+    """)
+
+
+def drop_log(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("""
+        DROP TRIGGER IF EXISTS cars_log_change ON cars;
+        DROP TRIGGER IF EXISTS cars_log_truncate ON cars;
+        DROP FUNCTION IF EXISTS rental_log_car_change();
+        DROP TABLE IF EXISTS cars_changes;
+    """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0010_search_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_log, drop_log),
+    ]
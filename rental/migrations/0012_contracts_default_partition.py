@@ -0,0 +1,39 @@
+from django.db import migrations
+
+from rental import partitions
+
+
+def create_default(apps, schema_editor):
+    # договор вне готовых секций (задним числом или дальше окна partition_contracts --ahead)
+    # ложится в DEFAULT-секцию вместо ошибки вставки
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        if partitions.is_partitioned(cursor):
+            partitions.ensure_default_partition(cursor)
+
+
+def drop_default(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        if not partitions.is_partitioned(cursor):
+            return
+        default = partitions.default_partition(cursor)
+        if default is None:
+            return
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM "{default}")')
+        if cursor.fetchone()[0]:
+            raise RuntimeError(f"В {default} есть договоры — сначала manage.py partition_contracts")
+        cursor.execute(f'DROP TABLE "{default}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0011_cars_changes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_default, drop_default),
+    ]
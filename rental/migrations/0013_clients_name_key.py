@@ -0,0 +1,46 @@
+from django.db import migrations
+
+# Ключ блокирования по ФИО для поиска дублей (rental/dedup.py): фамилия фонетически +
+# первая буква имени. Считается в базе, чтобы и полный прогон, и проверка одного клиента
+# брали один и тот же ключ, а проверка — по индексу. Кириллицу в нижний регистр переводим
+# через translate: lower() под локалью C её не трогает.
+NAME_KEY_SQL = r"""
+    CREATE OR REPLACE FUNCTION rental_name_key(full_name text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT CASE WHEN coalesce(words[1], '') = '' THEN '' ELSE
+            regexp_replace(translate(words[1], 'бвгджзоыеэяюйьъ', 'пфктшсаиииауи'), '(.)\1+', '\1', 'g')
+            || CASE WHEN coalesce(words[2], '') <> '' THEN ' ' || left(words[2], 1) ELSE '' END
+        END
+        FROM (
+            SELECT string_to_array(btrim(regexp_replace(
+                translate(lower(coalesce(full_name, '')), 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯё', 'абвгдеежзийклмнопрстуфхцчшщъыьэюяе'),
+                '[^a-zа-я]+', ' ', 'g'
+            )), ' ') AS words
+        ) AS parts
+    $$;
+"""
+
+
+def create_name_key(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(NAME_KEY_SQL)
+    schema_editor.execute("CREATE INDEX IF NOT EXISTS clients_name_key_idx ON clients (rental_name_key(full_name))")
+
+
+def drop_name_key(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS clients_name_key_idx")
+    schema_editor.execute("DROP FUNCTION IF EXISTS rental_name_key(text)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0012_contracts_default_partition'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_name_key, drop_name_key),
+    ]
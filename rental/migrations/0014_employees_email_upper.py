@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    # филиал сотрудника ищется на каждом запросе (BranchScopeMiddleware):
+    # email__iexact -> UPPER(email::text) = UPPER(...)
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS employees_email_upper_idx ON employees (upper(email::text))"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS employees_email_upper_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0013_clients_name_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    # список клиентов сортируется по (full_name, client_id) и читается порциями
+    # LIMIT/OFFSET (client_list, client_rows): без индекса — полный просмотр и сортировка
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS clients_full_name_idx ON clients (full_name, client_id)"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS clients_full_name_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0014_employees_email_upper'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
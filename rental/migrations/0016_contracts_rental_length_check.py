@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.db import migrations
+
+CONSTRAINT = "contracts_rental_length_check"
+
+
+def add_check(apps, schema_editor):
+    # Contracts.active/in_period/overlapping ищут договоры только среди выданных за последние
+    # CONTRACTS_MAX_RENTAL_DAYS: более длинный договор выпал бы из проверки доступности машины.
+    # На секционированной таблице CHECK наследуют все секции, а partition_contracts
+    # переносит его в новую таблицу вместе с остальными (LIKE ... INCLUDING CONSTRAINTS)
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    days = int(settings.CONTRACTS_MAX_RENTAL_DAYS)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_constraint WHERE conrelid = 'contracts'::regclass AND conname = %s", [CONSTRAINT])
+        if cursor.fetchone() is not None:
+            return
+        cursor.execute("SELECT count(*) FROM contracts WHERE return_date - issue_date > %s", [days])
+        too_long = cursor.fetchone()[0]
+    if too_long:
+        raise RuntimeError(
+            f"В contracts {too_long} договоров длиннее {days} дн. — исправьте их "
+            f"или увеличьте CONTRACTS_MAX_RENTAL_DAYS, затем повторите migrate"
+        )
+    schema_editor.execute(f"ALTER TABLE contracts ADD CONSTRAINT {CONSTRAINT} CHECK (return_date - issue_date <= {days})")
+
+
+def drop_check(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"ALTER TABLE contracts DROP CONSTRAINT IF EXISTS {CONSTRAINT}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0015_clients_full_name_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_check, drop_check),
+    ]
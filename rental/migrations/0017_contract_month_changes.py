@@ -0,0 +1,125 @@
+from django.db import migrations
+
+# таблица -> (ключ, колонки, которые попадают в выгрузку договоров, как найти её договоры)
+_DIMENSIONS = {
+    "clients": ("client_id", ("birth_date",), "JOIN contracts c ON c.client_id = n.client_id"),
+    "cars": (
+        "car_id",
+        ("plate", "brand", "model", "year_made", "category_id"),
+        "JOIN contracts c ON c.car_id = n.car_id",
+    ),
+    "car_categories": (
+        "category_id",
+        ("name",),
+        "JOIN cars car ON car.category_id = n.category_id JOIN contracts c ON c.car_id = car.car_id",
+    ),
+    "branches": ("branch_id", ("name",), "JOIN contracts c ON n.branch_id IN (c.issue_branch_id, c.return_branch_id)"),
+    "contract_statuses": ("cstatus_id", ("status",), "JOIN contracts c ON c.cstatus_id = n.cstatus_id"),
+}
+
+
+def create_log(apps, schema_editor):
+    # журнал месяцев выдачи, чьи строки в выгрузке договоров (rental/exports.py) могли
+    # измениться: сами договоры и поля машин/клиентов/справочников, которые в неё входят.
+    # Выгрузка пересчитывает отпечаток только этих месяцев. xid — как в cars_changes
+    # (миграция 0011): читатель берёт записи после горизонта pg_snapshot_xmin прошлого раза.
+    # Триггеры на оператор, с таблицами переходов: массовое изменение — несколько строк
+    # журнала, а не по строке на договор. month IS NULL — TRUNCATE, пересчитать всё
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("""
+        CREATE TABLE IF NOT EXISTS contract_month_changes (
+            change_id bigserial PRIMARY KEY,
+            month date,
+            xid xid8 NOT NULL DEFAULT pg_current_xact_id(),
+            changed_at timestamp NOT NULL DEFAULT localtimestamp
+        );
+        CREATE INDEX IF NOT EXISTS contract_month_changes_xid_idx ON contract_month_changes (xid);
+        CREATE INDEX IF NOT EXISTS contract_month_changes_changed_at_idx ON contract_month_changes (changed_at);
+
+        CREATE OR REPLACE FUNCTION rental_log_contract_months() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                INSERT INTO contract_month_changes (month) VALUES (NULL);
+            ELSIF TG_OP = 'INSERT' THEN
+                INSERT INTO contract_month_changes (month)
+                SELECT DISTINCT date_trunc('month', issue_date)::date FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO contract_month_changes (month)
+                SELECT DISTINCT date_trunc('month', issue_date)::date FROM old_rows;
+            ELSE
+                INSERT INTO contract_month_changes (month)
+                SELECT date_trunc('month', issue_date)::date FROM new_rows
+                UNION
+                SELECT date_trunc('month', issue_date)::date FROM old_rows;
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS contracts_log_months_insert ON contracts;
+        CREATE TRIGGER contracts_log_months_insert
+            AFTER INSERT ON contracts REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION rental_log_contract_months();
+        DROP TRIGGER IF EXISTS contracts_log_months_update ON contracts;
+        CREATE TRIGGER contracts_log_months_update
+            AFTER UPDATE ON contracts REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION rental_log_contract_months();
+        DROP TRIGGER IF EXISTS contracts_log_months_delete ON contracts;
+        CREATE TRIGGER contracts_log_months_delete
+            AFTER DELETE ON contracts REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION rental_log_contract_months();
+        DROP TRIGGER IF EXISTS contracts_log_months_truncate ON contracts;
+        CREATE TRIGGER contracts_log_months_truncate
+            AFTER TRUNCATE ON contracts
+            FOR EACH STATEMENT EXECUTE FUNCTION rental_log_contract_months();
+    """)
+    # вставка и удаление строки справочника договоров не меняют (удалить используемую не даст FK)
+    for table, (key, columns, contracts_of) in _DIMENSIONS.items():
+        old = ", ".join(f"o.{column}" for column in columns)
+        new = ", ".join(f"n.{column}" for column in columns)
+        schema_editor.execute(f"""
+            CREATE OR REPLACE FUNCTION rental_log_{table}_months() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO contract_month_changes (month)
+                SELECT DISTINCT date_trunc('month', c.issue_date)::date
+                FROM new_rows n
+                JOIN old_rows o ON o.{key} = n.{key}
+                {contracts_of}
+                WHERE ({old}) IS DISTINCT FROM ({new});
+                RETURN NULL;
+            END $$ LANGUAGE plpgsql;
+
+            DROP TRIGGER IF EXISTS {table}_log_contract_months ON {table};
+            CREATE TRIGGER {table}_log_contract_months
+                AFTER UPDATE ON {table} REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION rental_log_{table}_months();
+        """)
+
+
+def drop_log(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table in _DIMENSIONS:
+        schema_editor.execute(f"""
+            DROP TRIGGER IF EXISTS {table}_log_contract_months ON {table};
+            DROP FUNCTION IF EXISTS rental_log_{table}_months();
+        """)
+    schema_editor.execute("""
+        DROP TRIGGER IF EXISTS contracts_log_months_insert ON contracts;
+        DROP TRIGGER IF EXISTS contracts_log_months_update ON contracts;
+        DROP TRIGGER IF EXISTS contracts_log_months_delete ON contracts;
+        DROP TRIGGER IF EXISTS contracts_log_months_truncate ON contracts;
+        DROP FUNCTION IF EXISTS rental_log_contract_months();
+        DROP TABLE IF EXISTS contract_month_changes;
+    """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0016_contracts_rental_length_check'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_log, drop_log),
+    ]
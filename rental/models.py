@@ -1,4 +1,8 @@
-﻿from django.db import models
+﻿from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils.timezone import now
 from django.contrib.postgres.fields import DateRangeField
 
 
@@ -40,6 +44,17 @@ class CarStatuses(models.Model):
         return self.status
 
 
+class BranchScopedQuerySet(models.QuerySet):
+    # поле, по которому запись относится к филиалу сотрудника (см. BranchScopeMiddleware)
+    branch_field = "branch"
+
+    def for_branch(self, branch_id):
+        # branch_id = None — без ограничения (администратор выбрал «все филиалы»)
+        if branch_id is None:
+            return self
+        return self.filter(**{f"{self.branch_field}_id": branch_id})
+
+
 class Cars(models.Model):
     car_id = models.AutoField(primary_key=True)
     plate = models.CharField(unique=True, max_length=12)
@@ -53,6 +68,8 @@ class Cars(models.Model):
     branch = models.ForeignKey(Branches, models.DO_NOTHING)
     daily_price = models.DecimalField(max_digits=10, decimal_places=2)
 
+    objects = BranchScopedQuerySet.as_manager()
+
     class Meta:
         managed = False
         db_table = 'cars'
@@ -103,6 +120,29 @@ class ContractStatuses(models.Model):
         return self.status
 
 
+class ContractsQuerySet(BranchScopedQuerySet):
+    branch_field = "issue_branch"
+
+    # фильтры по issue_date нужны, чтобы Postgres отсекал старые секции contracts;
+    # окно CONTRACTS_MAX_RENTAL_DAYS корректно, пока его держат ContractForm.clean
+    # и CHECK contracts_rental_length_check (миграция 0016)
+    def issued_since(self, day):
+        return self.filter(issue_date__gte=day)
+
+    def active(self, on_date):
+        window_start = on_date - timedelta(days=settings.CONTRACTS_MAX_RENTAL_DAYS)
+        return self.filter(return_date__gte=on_date, issue_date__gte=window_start)
+
+    def in_period(self, start, end):
+        # договоры, пересекающиеся с периодом [start, end]
+        window_start = start - timedelta(days=settings.CONTRACTS_MAX_RENTAL_DAYS)
+        return self.filter(issue_date__lte=end, return_date__gte=start, issue_date__gte=window_start)
+
+    def overlapping(self, car_id, start, end):
+        # проверка доступности машины
+        return self.in_period(start, end).filter(car_id=car_id)
+
+
 class Contracts(models.Model):
     PAYMENT_CHOICES = [
         ('наличный', 'Наличный'),
@@ -127,6 +167,8 @@ class Contracts(models.Model):
     daily_price = models.DecimalField(max_digits=10, decimal_places=2)
     total_amount = models.DecimalField(max_digits=12, decimal_places=2)
 
+    objects = ContractsQuerySet.as_manager()
+
     class Meta:
         managed = False
         db_table = 'contracts'
@@ -144,6 +186,8 @@ class Employees(models.Model):
     phone = models.CharField(max_length=20)
     email = models.CharField(max_length=255)
 
+    objects = BranchScopedQuerySet.as_manager()
+
     class Meta:
         managed = False
         db_table = 'employees'
@@ -167,3 +211,137 @@ class Maintenance(models.Model):
 
     def __str__(self):
         return f"ТО #{self.maintenance_id} — {self.car.plate}"
+
+
+class TableVersions(models.Model):
+    table_name = models.CharField(primary_key=True, max_length=63)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'table_versions'
+
+    def __str__(self):
+        return f"{self.table_name} v{self.version}"
+
+
+class ClientDuplicates(models.Model):
+    STATUS_NEW = 'new'
+    STATUS_DISMISSED = 'dismissed'
+    STATUS_CHOICES = [
+        (STATUS_NEW, 'Новая'),
+        (STATUS_DISMISSED, 'Не дубликат'),
+    ]
+
+    dup_id = models.BigAutoField(primary_key=True)
+    client_a = models.ForeignKey(Clients, models.CASCADE, db_constraint=False, related_name='+')
+    client_b = models.ForeignKey(Clients, models.CASCADE, db_constraint=False, related_name='+')
+    score = models.FloatField()
+    reasons = models.CharField(max_length=120, blank=True)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=STATUS_NEW)
+    found_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'client_duplicates'
+        constraints = [
+            models.UniqueConstraint(fields=['client_a', 'client_b'], name='client_duplicates_pair_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['status', '-score'], name='client_duplicates_review_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.client_a_id} ~ {self.client_b_id} ({self.score})"
+
+
+class CarHoldsQuerySet(models.QuerySet):
+    def live(self, at=None):
+        return self.filter(expires_at__gt=at or now())
+
+    def overlapping(self, car_id, start, end):
+        return self.filter(car_id=car_id, start_date__lte=end, end_date__gte=start)
+
+
+class CarHolds(models.Model):
+    # временная бронь машины сотрудником, пока он заполняет договор
+    hold_id = models.BigAutoField(primary_key=True)
+    car = models.ForeignKey(Cars, models.CASCADE, db_constraint=False, related_name='+')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, models.CASCADE, related_name='+')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    objects = CarHoldsQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'car_holds'
+        indexes = [
+            models.Index(fields=['car', 'expires_at'], name='car_holds_car_expires_idx'),
+            models.Index(fields=['expires_at'], name='car_holds_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"Бронь #{self.hold_id} — машина {self.car_id} до {self.expires_at:%H:%M}"
+
+
+class PricingRules(models.Model):
+    # Все подходящие правила перемножаются с базовой ценой машины за сутки.
+    # Правило с датами действует только на дни аренды внутри периода (сезон),
+    # из правил со сроком (min_days) берётся одно — с наибольшим min_days, не больше длины аренды.
+    rule_id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=120)
+    category = models.ForeignKey(CarCategories, models.CASCADE, db_constraint=False, null=True, blank=True, related_name='+')
+    branch = models.ForeignKey(Branches, models.CASCADE, db_constraint=False, null=True, blank=True, related_name='+')
+    date_from = models.DateField(null=True, blank=True)
+    date_to = models.DateField(null=True, blank=True)
+    min_days = models.PositiveIntegerField(null=True, blank=True)
+    multiplier = models.DecimalField(max_digits=6, decimal_places=4)
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'pricing_rules'
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(date_from__isnull=True, date_to__isnull=True)
+                | models.Q(date_from__isnull=False, date_to__isnull=False, date_from__lte=models.F('date_to')),
+                name='pricing_rules_period_valid',
+            ),
+            models.CheckConstraint(
+                check=models.Q(min_days__isnull=True) | models.Q(date_from__isnull=True),
+                name='pricing_rules_duration_no_period',
+            ),
+            models.CheckConstraint(check=models.Q(multiplier__gt=0), name='pricing_rules_multiplier_positive'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ×{self.multiplier}"
+
+
+class AuditLog(models.Model):
+    # Журнал изменений только на добавление: таблица секционирована по changed_at
+    # (первичный ключ — audit_id + changed_at), UPDATE и DELETE запрещены триггером.
+    ACTION_CREATE = 'create'
+    ACTION_UPDATE = 'update'
+    ACTION_DELETE = 'delete'
+    ACTION_CHOICES = [
+        (ACTION_CREATE, 'Создание'),
+        (ACTION_UPDATE, 'Изменение'),
+        (ACTION_DELETE, 'Удаление'),
+    ]
+
+    audit_id = models.BigAutoField(primary_key=True)
+    changed_at = models.DateTimeField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, models.DO_NOTHING, db_constraint=False, null=True, related_name='+')
+    table_name = models.CharField(max_length=63)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=8, choices=ACTION_CHOICES)
+    changes = models.JSONField(default=dict)
+
+    class Meta:
+        managed = False
+        db_table = 'audit_log'
+
+    def __str__(self):
+        return f"{self.table_name} #{self.object_id}: {self.action}"
@@ -0,0 +1,287 @@
+import re
+from datetime import date
+
+PARENT_TABLE = "contracts"
+LEGACY_TABLE = "contracts_unpartitioned"
+
+# границы секций по date и по timestamp (audit_log): '2026-10-01' или '2026-10-01 00:00:00+03'
+_BOUND_RE = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})[^']*'\) TO \('(\d{4}-\d{2}-\d{2})[^']*'\)")
+
+
+def period_start(day: date, interval: str) -> date:
+    return date(day.year, 1, 1) if interval == "year" else date(day.year, day.month, 1)
+
+
+def next_period(start: date, interval: str) -> date:
+    if interval == "year":
+        return date(start.year + 1, 1, 1)
+    return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def partition_name(start: date, interval: str, table: str = PARENT_TABLE) -> str:
+    if interval == "year":
+        return f"{table}_y{start.year}"
+    return f"{table}_m{start.year}_{start.month:02d}"
+
+
+def is_partitioned(cursor, table: str = PARENT_TABLE) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [table]
+    )
+    return cursor.fetchone() is not None
+
+
+def list_partitions(cursor, table: str = PARENT_TABLE):
+    # [(имя, начало, конец)] по возрастанию границ
+    cursor.execute(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        """,
+        [table],
+    )
+    result = []
+    for name, bound in cursor.fetchall():
+        match = _BOUND_RE.search(bound or "")
+        if match:
+            result.append((name, date.fromisoformat(match.group(1)), date.fromisoformat(match.group(2))))
+    return sorted(result, key=lambda p: p[1])
+
+
+def detect_interval(partitions) -> str:
+    if not partitions:
+        return "month"
+    _, start, end = partitions[-1]
+    return "year" if (end - start).days > 31 else "month"
+
+
+def partition_key(cursor, table: str = PARENT_TABLE) -> str:
+    cursor.execute("SELECT pg_get_partkeydef(%s::regclass)", [table])
+    return re.search(r"\((\w+)\)", cursor.fetchone()[0]).group(1)
+
+
+def default_partition(cursor, table: str = PARENT_TABLE):
+    # -> имя DEFAULT-секции или None
+    cursor.execute(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass AND pg_get_expr(c.relpartbound, c.oid) = 'DEFAULT'
+        """,
+        [table],
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def ensure_default_partition(cursor, table: str = PARENT_TABLE):
+    # строки вне готовых секций (задним числом, дальше окна --ahead) попадают сюда,
+    # а не обрывают INSERT ошибкой «no partition of relation found»
+    if default_partition(cursor, table):
+        return None
+    name = f"{table}_default"
+    cursor.execute(f'CREATE TABLE "{name}" PARTITION OF "{table}" DEFAULT')
+    return name
+
+
+def create_partition(cursor, start: date, interval: str, table: str = PARENT_TABLE) -> str:
+    name = partition_name(start, interval, table)
+    end = next_period(start, interval)
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    if cursor.fetchone()[0]:
+        return name
+
+    default = default_partition(cursor, table)
+    if default is not None:
+        key = partition_key(cursor, table)
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM "{default}" WHERE {key} >= %s AND {key} < %s)', [start, end])
+        if cursor.fetchone()[0]:
+            # новая секция не создаётся, пока её строки лежат в DEFAULT: переносим их
+            cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{default}"')
+            cursor.execute(f'CREATE TABLE "{name}" PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)', [start, end])
+            cursor.execute(
+                f'INSERT INTO "{name}" SELECT * FROM "{default}" WHERE {key} >= %s AND {key} < %s', [start, end]
+            )
+            cursor.execute(f'DELETE FROM "{default}" WHERE {key} >= %s AND {key} < %s', [start, end])
+            cursor.execute(f'ALTER TABLE "{table}" ATTACH PARTITION "{default}" DEFAULT')
+            return name
+
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM (%s) TO (%s)",
+        [start, end],
+    )
+    return name
+
+
+def drain_default(cursor, interval: str, table: str = PARENT_TABLE):
+    # секции для строк, осевших в DEFAULT; -> созданные секции
+    default = default_partition(cursor, table)
+    if default is None:
+        return []
+    key = partition_key(cursor, table)
+    cursor.execute(f'SELECT DISTINCT date_trunc(%s, {key})::date FROM "{default}" ORDER BY 1', [interval])
+    return [create_partition(cursor, start, interval, table) for (start,) in cursor.fetchall()]
+
+
+def ensure_partitions(cursor, until: date, interval: str = None, table: str = PARENT_TABLE):
+    partitions = list_partitions(cursor, table)
+    interval = interval or detect_interval(partitions)
+    start = next_period(partitions[-1][1], interval) if partitions else period_start(date.today(), interval)
+    created = []
+    while start <= until:
+        created.append(create_partition(cursor, start, interval, table))
+        start = next_period(start, interval)
+    return created
+
+
+def _copy_indexes(cursor):
+    cursor.execute(
+        """
+        SELECT ic.relname, pg_get_indexdef(ix.indexrelid)
+        FROM pg_index ix
+        JOIN pg_class ic ON ic.oid = ix.indexrelid
+        WHERE ix.indrelid = %s::regclass AND NOT ix.indisprimary AND NOT ix.indisunique
+        """,
+        [LEGACY_TABLE],
+    )
+    for index_name, definition in cursor.fetchall():
+        definition = re.sub(r" ON (ONLY )?(\S+\.)?\"?%s\"? " % LEGACY_TABLE, f' ON "{PARENT_TABLE}" ', definition)
+        definition = definition.replace(f"INDEX {index_name} ", f"INDEX {index_name}_p ", 1)
+        cursor.execute(definition)
+
+    cursor.execute(
+        f'CREATE INDEX IF NOT EXISTS contracts_issue_date_idx ON "{PARENT_TABLE}" (issue_date)'
+    )
+
+
+def _copy_foreign_keys(cursor):
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [LEGACY_TABLE],
+    )
+    for name, definition in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE "{PARENT_TABLE}" ADD CONSTRAINT "{name}_p" {definition}')
+
+
+def _copy_triggers(cursor):
+    cursor.execute(
+        "SELECT pg_get_triggerdef(oid) FROM pg_trigger WHERE tgrelid = %s::regclass AND NOT tgisinternal",
+        [LEGACY_TABLE],
+    )
+    for (definition,) in cursor.fetchall():
+        cursor.execute(
+            re.sub(r" ON (\S+\.)?\"?%s\"? " % LEGACY_TABLE, f' ON "{PARENT_TABLE}" ', definition)
+        )
+
+
+def _unique_constraints(cursor, table, with_key):
+    # уникальные/исключающие ограничения с ключом секционирования (with_key) или без него
+    cursor.execute(
+        f"""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype IN ('u', 'x')
+          AND {"" if with_key else "NOT "}(
+              SELECT attnum FROM pg_attribute WHERE attrelid = conrelid AND attname = 'issue_date'
+          ) = ANY(conkey)
+        """,
+        [table],
+    )
+    return cursor.fetchall()
+
+
+def blocking_constraints(cursor):
+    # без issue_date такое ограничение на секционированной таблице не создать, а молча
+    # потерять его нельзя — секционирование останавливается, пока его не поправят вручную
+    return _unique_constraints(cursor, PARENT_TABLE, with_key=False)
+
+
+def _copy_unique_constraints(cursor):
+    for name, definition in _unique_constraints(cursor, LEGACY_TABLE, with_key=True):
+        cursor.execute(f'ALTER TABLE "{PARENT_TABLE}" ADD CONSTRAINT "{name}_p" {definition}')
+
+
+def referencing_tables(cursor):
+    cursor.execute(
+        "SELECT conrelid::regclass::text FROM pg_constraint WHERE confrelid = %s::regclass AND contype = 'f'",
+        [PARENT_TABLE],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def convert_to_partitioned(cursor, interval: str, ahead: int = 1):
+    # переименовывает contracts в contracts_unpartitioned и переносит данные
+    # в новую таблицу contracts, секционированную по issue_date
+    cursor.execute(f'LOCK TABLE "{PARENT_TABLE}" IN ACCESS EXCLUSIVE MODE')
+    blocking = blocking_constraints(cursor)
+    if blocking:
+        raise ValueError(
+            "Ограничения без issue_date не переносятся на секционированную таблицу: "
+            + "; ".join(f"{name} {definition}" for name, definition in blocking)
+        )
+    cursor.execute(f'ALTER TABLE "{PARENT_TABLE}" RENAME TO "{LEGACY_TABLE}"')
+    cursor.execute(
+        f'CREATE TABLE "{PARENT_TABLE}" (LIKE "{LEGACY_TABLE}" '
+        f"INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING IDENTITY INCLUDING GENERATED) "
+        f"PARTITION BY RANGE (issue_date)"
+    )
+    cursor.execute(f'ALTER TABLE "{PARENT_TABLE}" ADD PRIMARY KEY (contract_id, issue_date)')
+
+    cursor.execute(f'SELECT MIN(issue_date), MAX(issue_date) FROM "{LEGACY_TABLE}"')
+    first, last = cursor.fetchone()
+    until = date.today()
+    for _ in range(ahead):
+        until = next_period(period_start(until, interval), interval)
+    until = max(until, last or until)
+
+    start = period_start(first or date.today(), interval)
+    while start <= until:
+        create_partition(cursor, start, interval)
+        start = next_period(start, interval)
+    ensure_default_partition(cursor)
+
+    cursor.execute(f'INSERT INTO "{PARENT_TABLE}" OVERRIDING SYSTEM VALUE SELECT * FROM "{LEGACY_TABLE}"')
+    copied = cursor.rowcount
+
+    # индексы, внешние ключи и триггеры — после загрузки данных
+    _copy_indexes(cursor)
+    _copy_unique_constraints(cursor)
+    _copy_foreign_keys(cursor)
+    _copy_triggers(cursor)
+
+    cursor.execute(
+        "SELECT pg_get_serial_sequence(%s, 'contract_id'), "
+        "(SELECT attidentity FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'contract_id')",
+        [LEGACY_TABLE, LEGACY_TABLE],
+    )
+    sequence, identity = cursor.fetchone()
+    if sequence and not identity:
+        # serial: последовательность должна пережить удаление старой таблицы
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY \"{PARENT_TABLE}\".contract_id")
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence(%s, 'contract_id'), COALESCE(MAX(contract_id), 1)) "
+        f'FROM "{PARENT_TABLE}"',
+        [PARENT_TABLE],
+    )
+    cursor.execute(f'ANALYZE "{PARENT_TABLE}"')
+    return copied
+
+
+def archive_partitions(cursor, before: date, schema: str = "archive", drop: bool = False):
+    archived = []
+    if not drop:
+        cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+    for name, _, end in list_partitions(cursor):
+        if end > before:
+            continue
+        cursor.execute(f'ALTER TABLE "{PARENT_TABLE}" DETACH PARTITION "{name}"')
+        if drop:
+            cursor.execute(f'DROP TABLE "{name}"')
+        else:
+            cursor.execute(f'ALTER TABLE "{name}" SET SCHEMA "{schema}"')
+        archived.append(name)
+    return archived
@@ -0,0 +1,127 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.utils.timezone import now
+
+from . import invalidation
+from .models import Branches, CarCategories, PricingRules
+
+# сезонные множители раскладываются по дням на этот запас вокруг сегодняшней даты;
+# за пределами горизонта и периодов правил действуют только несезонные правила
+HORIZON_DAYS = 3 * 366
+
+
+def _id_lookup(ids):
+    # id -> индекс в таблицах; 0 — «прочие» (машины категорий/филиалов, заведённых после сборки)
+    lookup = np.zeros(max(ids, default=0) + 1, dtype=np.intp)
+    lookup[list(ids)] = np.arange(1, len(ids) + 1)
+    return lookup
+
+
+def _to_days(values):
+    return np.asarray(values, dtype="datetime64[D]").astype(np.int64)
+
+
+class PricingEngine:
+    def __init__(self, rules, category_ids, branch_ids, today=None):
+        today = today or now().date()
+        self.category_lookup = _id_lookup(category_ids)
+        self.branch_lookup = _id_lookup(branch_ids)
+        shape = (len(category_ids) + 1, len(branch_ids) + 1)
+
+        periods = [r for r in rules if r.date_from is not None]
+        origin = min([today - timedelta(days=HORIZON_DAYS)] + [r.date_from for r in periods])
+        until = max([today + timedelta(days=HORIZON_DAYS)] + [r.date_to for r in periods])
+        self.origin = int(_to_days(origin))
+        horizon = (until - origin).days + 1
+
+        self.static = np.ones(shape)
+        season = np.ones(shape + (horizon,))
+        durations = sorted((r for r in rules if r.min_days), key=lambda r: (r.min_days, r.rule_id))
+        self.max_days = max([0] + [r.min_days for r in durations])
+        self.duration = np.ones(shape + (self.max_days + 1,))
+
+        for rule in rules:
+            if rule.min_days:
+                continue
+            cells, factor = self._cells(rule), float(rule.multiplier)
+            if rule.date_from is None:
+                self.static[cells] *= factor
+            else:
+                start = (rule.date_from - origin).days
+                end = (rule.date_to - origin).days + 1
+                season[cells + (slice(start, end),)] *= factor
+        # по возрастанию min_days: длинная аренда перекрывает скидку более короткой
+        for rule in durations:
+            self.duration[self._cells(rule) + (slice(rule.min_days, None),)] = float(rule.multiplier)
+
+        # сумма множителей по дням [s, e] = cumulative[e + 1] - cumulative[s]
+        daily = self.static[:, :, None] * season
+        self.cumulative = np.zeros(shape + (horizon + 1,))
+        np.cumsum(daily, axis=2, out=self.cumulative[:, :, 1:])
+        self.horizon = horizon
+
+    def _cells(self, rule):
+        rows = slice(None) if rule.category_id is None else self._index(self.category_lookup, rule.category_id)
+        cols = slice(None) if rule.branch_id is None else self._index(self.branch_lookup, rule.branch_id)
+        return rows, cols
+
+    @staticmethod
+    def _index(lookup, value):
+        value = np.asarray(value, dtype=np.intp)
+        inside = (value >= 0) & (value < len(lookup))
+        return np.where(inside, lookup[np.clip(value, 0, len(lookup) - 1)], 0)
+
+    def quote_batch(self, daily_price, category_id, branch_id, start, end):
+        # все аргументы — массивы одной длины (или скаляры); -> итог по каждой аренде, руб.
+        price = np.asarray(daily_price, dtype=np.float64)
+        rows = self._index(self.category_lookup, category_id)
+        cols = self._index(self.branch_lookup, branch_id)
+        first = _to_days(start) - self.origin
+        last = _to_days(end) - self.origin
+        days = last - first + 1
+
+        inside_from = np.clip(first, 0, self.horizon)
+        inside_to = np.clip(last + 1, 0, self.horizon)
+        seasonal = self.cumulative[rows, cols, inside_to] - self.cumulative[rows, cols, inside_from]
+        outside = days - (inside_to - inside_from)
+        factor_sum = seasonal + outside * self.static[rows, cols]
+
+        discount = self.duration[rows, cols, np.clip(days, 0, self.max_days)]
+        return np.where(days > 0, np.round(price * factor_sum * discount, 2), 0.0)
+
+    def quote_grid(self, cars, ranges):
+        # cars — [(цена за сутки, category_id, branch_id)], ranges — [(начало, конец)];
+        # -> матрица len(cars) × len(ranges)
+        price, category_id, branch_id = (np.asarray(column, dtype=np.float64) for column in zip(*cars))
+        start, end = (np.asarray(column, dtype="datetime64[D]") for column in zip(*ranges))
+        return self.quote_batch(
+            price[:, None], category_id[:, None].astype(np.intp), branch_id[:, None].astype(np.intp),
+            start[None, :], end[None, :],
+        )
+
+    def quote(self, car, start: date, end: date) -> Decimal:
+        total = self.quote_batch(float(car.daily_price), car.category_id, car.branch_id, start, end)
+        return Decimal(f"{float(total):.2f}")
+
+
+def build_engine():
+    rules = list(PricingRules.objects.filter(is_active=True).order_by("rule_id"))
+    return PricingEngine(
+        rules,
+        list(CarCategories.objects.order_by("pk").values_list("pk", flat=True)),
+        list(Branches.objects.order_by("pk").values_list("pk", flat=True)),
+    )
+
+
+def engine():
+    # собранные правила на процесс до изменения правил или справочников (и до полуночи:
+    # горизонт считается от сегодняшней даты)
+    return invalidation.cache.get_or_set(
+        "pricing_engine", (PricingRules, CarCategories, Branches), build_engine, per_day=True
+    )
+
+
+def quote(car, start, end):
+    return engine().quote(car, start, end)
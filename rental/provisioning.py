@@ -0,0 +1,119 @@
+import csv
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from . import versions
+from .forms import EmployeeForm
+from .models import Branches, Employees, Roles
+
+COLUMNS = ("full_name", "passport", "role", "branch", "phone", "email", "password")
+LABELS = {
+    "full_name": "ФИО",
+    "passport": "Паспорт",
+    "role": "Должность",
+    "branch": "Филиал",
+    "phone": "Телефон",
+    "email": "Email",
+    "password": "Пароль",
+}
+
+# меньше стольких паролей процессы не запускаем: старт воркера дороже пары хешей
+_POOL_MIN_PASSWORDS = 4
+
+
+def is_staff_role(role):
+    name = (role.name or "").strip().lower()
+    return "админ" in name or "admin" in name
+
+
+def read_csv(data):
+    # data — bytes или str; разделитель «;» (как у выгрузок Excel) или «,»
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    try:
+        dialect = csv.Sniffer().sniff(data.split("\n", 1)[0], delimiters=";,")
+    except csv.Error:
+        raise ValueError("Не удалось определить разделитель: нужен «;» или «,»")
+    reader = csv.DictReader(io.StringIO(data), dialect=dialect)
+    missing = [name for name in COLUMNS if name not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError("В файле нет колонок: " + ", ".join(missing))
+    return [{name: (row.get(name) or "").strip() for name in COLUMNS} for row in reader]
+
+
+def _lookup(model, field):
+    # роль и филиал в файле — по названию (без учёта регистра) или по id
+    by_key = {}
+    for obj in model.objects.all():
+        by_key[str(obj.pk)] = obj.pk
+        by_key[getattr(obj, field).strip().lower()] = obj.pk
+    return by_key
+
+
+def validate(rows):
+    # -> (формы, ошибки [(строка файла, текст)]); строка 1 — заголовок
+    roles, branches = _lookup(Roles, "name"), _lookup(Branches, "name")
+    forms, errors = [], []
+    seen = {"email": {}, "passport": {}}
+
+    for line, row in enumerate(rows, start=2):
+        data = dict(row)
+        data["role"] = roles.get(row["role"].lower(), row["role"])
+        data["branch"] = branches.get(row["branch"].lower(), row["branch"])
+        form = EmployeeForm(data)
+        if form.is_valid():
+            # EmployeeForm сверяет только с базой; повторы внутри файла ловим здесь
+            for field in seen:
+                value = form.cleaned_data[field].lower()
+                if value in seen[field]:
+                    form.add_error(field, f"Повторяется в строке {seen[field][value]}")
+                else:
+                    seen[field][value] = line
+        if form.errors:
+            for field, messages in form.errors.items():
+                errors.append((line, f"{LABELS.get(field, field)}: {'; '.join(messages)}"))
+        else:
+            forms.append(form)
+    return forms, errors
+
+
+def hash_passwords(passwords, workers=None):
+    # PBKDF2 намеренно медленный и держит GIL — параллелим процессами, а не потоками
+    workers = min(workers or os.cpu_count() or 1, len(passwords))
+    if workers <= 1 or len(passwords) < _POOL_MIN_PASSWORDS:
+        return [make_password(password) for password in passwords]
+    # spawn, а не fork: веб-процесс многопоточный (журнал изменений, сервер).
+    # Воркер начинает с чистого интерпретатора — настраивает Django по DJANGO_SETTINGS_MODULE
+    # и не импортирует этот модуль (в нём модели)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as pool:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def provision(forms, workers=None):
+    # все сотрудники и их учётные записи одной транзакцией: ошибка — не создаётся никто
+    hashes = hash_passwords([form.cleaned_data["password"] for form in forms], workers)
+    employees = [form.save(commit=False) for form in forms]
+    users = [
+        User(
+            username=employee.email,
+            email=employee.email,
+            is_active=True,
+            is_staff=is_staff_role(employee.role),
+            password=password_hash,
+        )
+        for employee, password_hash in zip(employees, hashes)
+    ]
+    with transaction.atomic():
+        Employees.objects.bulk_create(employees)
+        User.objects.bulk_create(users)
+    # bulk_create не шлёт сигналы — счётчик изменений сдвигаем сами
+    versions.bump(Employees)
+    return employees
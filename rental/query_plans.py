@@ -0,0 +1,249 @@
+import hashlib
+import json
+import re
+from contextlib import ExitStack
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils.timezone import now
+
+from . import invalidation
+from .models import Branches, Cars
+
+WATCHED_TABLES = ("contracts", "clients", "cars")
+
+# у запросов к почти пустым таблицам стоимость скачет от статистики (1 -> 4) —
+# рост меньше этого регрессией не считаем
+MIN_COST_GROWTH = 50
+
+# секции contracts (contracts_m2024_01, contracts_y2024, contracts_default) считаем за contracts
+_PARTITION_RE = re.compile(r"^(contracts)_(m\d{4}_\d{2}|y\d{4}|default)$")
+
+# справочники и служебные таблицы: запросы только к ним в проверку не берём
+_LOOKUP_TABLES = {
+    "branches", "car_categories", "car_statuses", "contract_statuses", "roles", "table_versions",
+}
+
+# estimated_count() сам выполняет EXPLAIN — план берём у запроса внутри
+_EXPLAIN_PREFIX_RE = re.compile(r"^\s*EXPLAIN\s*(\([^)]*\))?\s*", re.IGNORECASE)
+_TABLE_RE = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?', re.IGNORECASE)
+
+# отпечаток запроса без значений: дата «сегодня» и id не должны менять имя запроса
+_LITERAL_RES = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\?(?:, \?)*\)"), "(...)"),
+)
+
+
+def hot_pages(params):
+    # (имя, метод, адрес, данные POST, филиал, таблицы, полный просмотр которых ожидаем).
+    # Запросы не копируются из представлений: страница открывается тестовым клиентом,
+    # и проверяется ровно тот SQL, который она выполнила.
+    today = params["today"]
+    term = params["search"]
+    car_id = params["car_id"]
+    branch_id = params["branch_id"]
+    week = {"issue_date": today.isoformat(), "return_date": (today + timedelta(days=7)).isoformat()}
+    whole = ("contracts", "clients", "cars")
+    everywhere = "all"
+
+    def url(path, **query):
+        return path + ("?" + urlencode(query) if query else "")
+
+    return [
+        ("home", "get", url("/"), None, everywhere, ()),
+        # то же для сотрудника филиала (BranchScopeMiddleware)
+        ("home.branch", "get", url("/"), None, branch_id, ()),
+
+        # агрегаты по всей истории: полный просмотр ожидаем, следим за стоимостью
+        ("dashboard.contracts", "get", url("/dashboard/contracts/"), None, everywhere, ("contracts",)),
+        ("dashboard.revenue", "get", url("/dashboard/revenue/"), None, everywhere, ("contracts",)),
+        ("dashboard.avgcheck", "get", url("/dashboard/avgcheck/"), None, everywhere, ("contracts",)),
+        ("dashboard.categories", "get", url("/dashboard/categories/"), None, everywhere, ("cars",)),
+        ("dashboard.topcars", "get", url("/dashboard/topcars/"), None, everywhere, ("contracts", "cars")),
+        ("dashboard.cohorts", "get", url("/dashboard/cohorts/"), None, everywhere, ("contracts",)),
+
+        ("cars.list", "get", url("/cars/"), None, everywhere, ()),
+        ("cars.search", "get", url("/cars/rows/", search=term, offset=50), None, everywhere, ("cars",)),
+        ("clients.list", "get", url("/clients/"), None, everywhere, ()),
+        ("clients.search", "get", url("/clients/rows/", search=term, offset=50), None, everywhere, ("clients",)),
+        ("contracts.list", "get", url("/contracts/"), None, everywhere, ()),
+        ("contracts.search", "get", url("/contracts/rows/", search=term, offset=50), None, everywhere, whole),
+        ("contracts.branch", "get", url("/contracts/rows/", offset=50), None, branch_id, ()),
+        ("employees.search", "get", url("/employees/rows/", search=term), None, everywhere, ()),
+
+        ("get_car_price", "get", url(f"/cars/get_price/{car_id}/"), None, everywhere, ()),
+        ("contracts.quote", "get", url("/contracts/quote/", car=car_id, **week), None, everywhere, ()),
+        ("contracts.hold", "post", url("/contracts/hold/"), {"car": car_id, **week}, everywhere, ()),
+        ("audit.history", "get", url(f"/audit/cars/{car_id}/"), None, everywhere, ()),
+        ("calendar.window", "get",
+         url("/contracts/calendar/data/", start=(today - timedelta(days=15)).isoformat(), days=31, cars=1),
+         None, branch_id, ()),
+
+        # объём отчёта считается по тому же queryset с фильтрами формы, что уйдёт в PDF
+        ("report.contracts", "get", url("/reports/", report="contracts"), None, everywhere, whole),
+        ("report.contracts.filtered", "get",
+         url("/reports/", report="contracts", date_from=(today - timedelta(days=30)).isoformat(),
+             date_to=today.isoformat(), branch=branch_id),
+         None, everywhere, ()),
+        ("report.cars.filtered", "get", url("/reports/", report="cars", branch=branch_id), None, everywhere, ()),
+    ]
+
+
+def default_params():
+    return {
+        "today": now().date(),
+        "search": "ива",
+        "car_id": Cars.objects.order_by("pk").values_list("pk", flat=True).first() or 1,
+        "branch_id": Branches.objects.order_by("pk").values_list("pk", flat=True).first() or 1,
+    }
+
+
+def _checked_tables():
+    tables = {model._meta.db_table for model in apps.get_app_config("rental").get_models()}
+    return tables - _LOOKUP_TABLES
+
+
+def _select_of(sql):
+    # -> SELECT без EXPLAIN-обёртки или None (запись, SAVEPOINT и т. п.)
+    sql = _EXPLAIN_PREFIX_RE.sub("", sql, count=1) if sql.lstrip().upper().startswith("EXPLAIN") else sql
+    return sql if sql.lstrip().upper().startswith("SELECT") else None
+
+
+def _fingerprint(sql):
+    for pattern, replacement in _LITERAL_RES:
+        sql = pattern.sub(replacement, sql)
+    return hashlib.sha1(" ".join(sql.split()).encode()).hexdigest()[:8]
+
+
+def _tables(sql):
+    return [_table_of(name) for name in _TABLE_RE.findall(sql)]
+
+
+def capture(params):
+    # -> [(имя, alias, sql, таблицы с допустимым полным просмотром)]
+    # Имя — «страница:таблица#n», n — порядковый номер запроса страницы к этой таблице.
+    # От текста SQL оно не зависит: изменённый запрос сравнивается со своей прежней
+    # стоимостью, а не получает новое имя без базовой.
+    # Всё — в транзакции, которая откатывается: бронь, сессия и служебный пользователь
+    # в базе не остаются. Кеши воркера (и снимок парка) сбрасываются перед каждой страницей,
+    # иначе запросы, ответ на которые уже закеширован, в проверку не попадут, а набор
+    # запросов страницы зависел бы от того, что процесс открывал до неё.
+    # снимок парка тянет numpy — импортируем только здесь, как и представления
+    from .fleet import fleet
+
+    aliases = [alias for alias in settings.DATABASES if connections[alias].vendor == "postgresql"]
+    checked_tables = _checked_tables()
+    statements = []
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]), \
+            transaction.atomic(using="default"):
+        user = User.objects.create(username="query-plans@check.local", is_staff=True)
+        client = Client()
+        client.force_login(user)
+        current_branch, seen = None, set()
+        for name, method, path, data, branch, full_scan_ok in hot_pages(params):
+            if branch != current_branch:
+                client.post("/branch/", {"branch": branch})
+                current_branch = branch
+            invalidation.cache.clear()
+            fleet.clear()
+            with ExitStack() as stack:
+                contexts = {alias: stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in aliases}
+                response = getattr(client, method)(path, data) if data else getattr(client, method)(path)
+            if response.status_code >= 400 and response.status_code != 409:
+                raise RuntimeError(f"{name}: {path} ответил {response.status_code}")
+
+            ordinals = {}
+            for alias, context in contexts.items():
+                for query in context.captured_queries:
+                    sql = _select_of(query["sql"])
+                    tables = [table for table in _tables(sql or "") if table in checked_tables]
+                    if not tables:
+                        continue
+                    # номер считаем до отбрасывания повторов, чтобы он не зависел от других страниц
+                    ordinals[tables[0]] = ordinals.get(tables[0], 0) + 1
+                    # общий для всех страниц SQL (middleware) проверяем один раз — у первой страницы
+                    fingerprint = _fingerprint(sql)
+                    if (alias, fingerprint) in seen:
+                        continue
+                    seen.add((alias, fingerprint))
+                    statements.append((f"{name}:{tables[0]}#{ordinals[tables[0]]}", alias, sql, full_scan_ok))
+        transaction.set_rollback(True, using="default")
+    return statements
+
+
+def explain(cursor, sql):
+    cursor.execute("EXPLAIN (FORMAT JSON) " + sql)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def _nodes(plan):
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.get("Plans", []))
+
+
+def _table_of(relation):
+    match = _PARTITION_RE.match(relation)
+    return match.group(1) if match else relation
+
+
+def seq_scanned_rows(cursor, plan):
+    # {таблица: сколько строк читается полным просмотром} — по размеру таблицы (reltuples),
+    # а не по Plan Rows: тот считает строки уже после фильтра
+    relations = {node["Relation Name"] for node in _nodes(plan) if node["Node Type"] == "Seq Scan"}
+    if not relations:
+        return {}
+    cursor.execute(
+        "SELECT relname, GREATEST(reltuples, 0)::bigint FROM pg_class "
+        "WHERE relname = ANY(%s) AND relkind IN ('r', 'p')",
+        [sorted(relations)],
+    )
+    result = {}
+    for relation, rows in cursor.fetchall():
+        table = _table_of(relation)
+        result[table] = result.get(table, 0) + rows
+    return result
+
+
+def check_plans(baseline, row_threshold=10_000, tolerance=0.25, params=None):
+    # -> [(имя, стоимость, {таблица: строк seq scan}, [проблемы], sql)]
+    # baseline=None — без сравнения стоимостей (запись новых базовых).
+    # Запрос без базовой и базовая без запроса — тоже проблемы: иначе новый или
+    # переименованный запрос молча выпадает из проверки стоимости.
+    # У базовой без запроса стоимость None.
+    params = params or default_params()
+    results = []
+    for name, alias, sql, full_scan_ok in capture(params):
+        with connections[alias].cursor() as cursor:
+            plan = explain(cursor, sql)
+            scanned = seq_scanned_rows(cursor, plan)
+        cost = float(plan["Total Cost"])
+        problems = []
+        for table, rows in sorted(scanned.items()):
+            if table in WATCHED_TABLES and table not in full_scan_ok and rows > row_threshold:
+                problems.append(f"Seq Scan по {table} (~{rows} строк)")
+        if baseline is not None:
+            expected = baseline.get(name)
+            if expected is None:
+                problems.append("нет базовой стоимости")
+            elif cost > max(expected * (1 + tolerance), expected + MIN_COST_GROWTH):
+                problems.append(f"стоимость {cost:.0f} > базовой {expected:.0f}")
+        results.append((name, cost, scanned, problems, sql))
+    if baseline is not None:
+        captured = {name for name, *_ in results}
+        for name in sorted(set(baseline) - captured):
+            results.append((name, None, {}, ["запрос из базовых больше не выполняется"], ""))
+    return results
@@ -0,0 +1,107 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from . import versions
+
+# незаконченные файлы от упавших рендеров старше этого возраста удаляются при вытеснении
+_STALE_TMP_SECONDS = 3600
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _key_lock(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def cache_key(kind, params, models):
+    # тип отчёта + параметры + счётчики таблиц: изменились данные — другой ключ,
+    # старый файл уйдёт при вытеснении
+    parts = [kind]
+    parts += [f"{name}={value}" for name, value in sorted(params.items())]
+    parts += [f"{table}:{version}" for table, (version, _) in sorted(versions.get_versions(*models).items())]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def get_or_render(kind, params, models, render):
+    # -> путь к PDF; render(path) вызывается только при промахе
+    cache_dir = settings.REPORT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{kind}-{cache_key(kind, params, models)}.pdf")
+
+    if _touch(path):
+        return path
+
+    lock = _key_lock(path)
+    with lock:
+        # пока ждали, отчёт мог построить соседний запрос
+        if _touch(path):
+            return path
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=f"{kind}-", suffix=".tmp")
+        os.close(fd)
+        try:
+            render(tmp_path)
+            # читатели видят либо старый файл, либо целиком записанный новый
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    with _locks_guard:
+        _locks.pop(path, None)
+
+    evict(settings.REPORT_CACHE_MAX_BYTES, keep=path)
+    return path
+
+
+def _touch(path):
+    # время изменения файла служит отметкой последнего обращения для LRU
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def evict(max_bytes, keep=None):
+    cache_dir = settings.REPORT_CACHE_DIR
+    entries = []
+    moment = time.time()
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith(".tmp"):
+                if moment - stat.st_mtime > _STALE_TMP_SECONDS:
+                    _remove(entry.path)
+                continue
+            if entry.name.endswith(".pdf"):
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        if _remove(path):
+            total -= size
+            removed += 1
+    return removed
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
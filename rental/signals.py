@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+
+from . import versions
+
+
+def _bump_table_version(sender, **kwargs):
+    versions.bump(sender)
+
+
+for _model in versions.TRACKED_MODELS:
+    post_save.connect(_bump_table_version, sender=_model, dispatch_uid=f"bump_version_{_model.__name__}")
+    post_delete.connect(_bump_table_version, sender=_model, dispatch_uid=f"bump_version_{_model.__name__}")
@@ -0,0 +1,139 @@
+import gzip
+import hashlib
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен — тогда только gzip
+    brotli = None
+
+
+# Сторонние ассеты, которые раньше грузились с CDN. Скачиваются командой
+# `manage.py vendor_static` в rental/static/vendor/ и дальше раздаются сами.
+VENDOR_ASSETS = {
+    "bootstrap_css": (
+        "vendor/bootstrap/bootstrap.min.css",
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css",
+    ),
+    "bootstrap_js": (
+        "vendor/bootstrap/bootstrap.bundle.min.js",
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js",
+    ),
+    "chartjs": (
+        "vendor/chartjs/chart.umd.js",
+        "https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.js",
+    ),
+}
+
+# sha256 скачанных файлов пишет vendor_static; коммитится вместе с ними
+VENDOR_CHECKSUMS = "vendor/SHA256SUMS"
+
+
+def missing_vendor_assets():
+    return [path for path, _ in VENDOR_ASSETS.values() if finders.find(path) is None]
+
+
+def vendor_checksums():
+    # -> {путь: sha256} из VENDOR_CHECKSUMS (формат sha256sum)
+    manifest = finders.find(VENDOR_CHECKSUMS)
+    if manifest is None:
+        return {}
+    with open(manifest, encoding="utf-8") as f:
+        return {path: digest for digest, path in (line.split(None, 1) for line in f.read().splitlines() if line)}
+
+
+def file_sha256(full_path):
+    digest = hashlib.sha256()
+    with open(full_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def corrupted_vendor_assets():
+    checksums = vendor_checksums()
+    return [
+        path for path, _ in VENDOR_ASSETS.values()
+        if path in checksums and finders.find(path) and file_sha256(finders.find(path)) != checksums[path]
+    ]
+
+
+def _vendor_problems():
+    missing = missing_vendor_assets()
+    corrupted = corrupted_vendor_assets()
+    problems = []
+    if missing:
+        problems.append("не скачаны: " + ", ".join(missing))
+    if corrupted:
+        problems.append(f"не совпадает sha256 с {VENDOR_CHECKSUMS}: " + ", ".join(corrupted))
+    return "Сторонние ассеты: " + "; ".join(problems) if problems else None
+
+
+_VENDOR_HINT = "manage.py vendor_static, затем collectstatic; файлы и SHA256SUMS коммитятся в rental/static/vendor/"
+
+
+def check_vendor_assets(app_configs=None, **kwargs):
+    # обычная проверка — предупреждение: из-за ассетов не должны падать runserver и тесты
+    # (тестовый прогон идёт с DEBUG=False); на CDN страницы уходят только при DEBUG
+    message = _vendor_problems()
+    if message is None:
+        return []
+    return [checks.Warning(message, hint=_VENDOR_HINT, id="rental.W001")]
+
+
+def check_vendor_assets_deploy(app_configs=None, **kwargs):
+    # manage.py check --deploy: без ассетов выкладывать нельзя
+    message = _vendor_problems()
+    if message is None:
+        return []
+    return [checks.Error(message, hint=_VENDOR_HINT, id="rental.E001")]
+
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".ttf", ".json", ".map", ".txt", ".html"}
+MIN_COMPRESS_SIZE = 512
+
+
+def _compress_file(full_path: str):
+    with open(full_path, "rb") as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return
+
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data, quality=11)))
+
+    for suffix, payload in variants:
+        if len(payload) >= len(data):
+            continue
+        tmp_path = f"{full_path}{suffix}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, full_path + suffix)
+
+
+# Хешированные имена файлов + заранее сжатые .gz/.br рядом с ними
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        message = _vendor_problems()
+        if message is not None:
+            # собранная без них статика отдала бы страницы без стилей и графиков
+            raise ImproperlyConfigured(message + " — сначала manage.py vendor_static")
+        hashed_names = []
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.append(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+
+        for hashed_name in set(hashed_names):
+            if os.path.splitext(hashed_name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                _compress_file(self.path(hashed_name))
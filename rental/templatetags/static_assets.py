@@ -0,0 +1,25 @@
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+
+from ..staticfiles import VENDOR_ASSETS
+
+register = template.Library()
+
+
+@lru_cache(maxsize=None)
+def _is_vendored(path: str) -> bool:
+    return finders.find(path) is not None
+
+
+@register.simple_tag(name="vendor_static")
+def vendor_static(name):
+    path, cdn_url = VENDOR_ASSETS[name]
+    # CDN — только в разработке, пока ассет не скачан командой vendor_static;
+    # без DEBUG отсутствие файла ловят check --deploy (rental.E001) и collectstatic
+    if settings.DEBUG and not _is_vendored(path):
+        return cdn_url
+    return static(path)
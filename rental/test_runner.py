@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from . import invalidation
+
+
+class RentalTestRunner(DiscoverRunner):
+    # Тесты открывают страницы без collectstatic: манифеста хешированных имён нет,
+    # поэтому статика — без хешей (сжатие и манифест проверяет сама collectstatic).
+    # Журнал изменений пишется в транзакции теста: фоновый писатель работает в своём
+    # соединении, его записи пережили бы откат, а audit_log только для добавления.
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._test_settings = override_settings(
+            STORAGES={
+                **settings.STORAGES,
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            },
+            AUDIT_ASYNC=False,
+        )
+        self._test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._test_settings.disable()
+        super().teardown_test_environment(**kwargs)
+
+    # Тестовая база — копия рабочей (см. DATABASES["default"]["TEST"]); удалить её Postgres
+    # даст, только когда к ней никто не подключён, а поток шины сброса кеша держит LISTEN.
+    def teardown_databases(self, old_config, **kwargs):
+        invalidation.cache.stop()
+        super().teardown_databases(old_config, **kwargs)
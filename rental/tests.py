@@ -1,3 +1,851 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from . import cohorts, db_routers, dedup, exports, holds, invalidation, live, pricing, query_plans, report_cache, versions
+from .management.commands.check_query_plans import DEFAULT_BASELINE
+from .counts import EstimatedCountPaginator, estimated_count
+from .fleet import Fleet
+from .forms import ContractForm
+from .middleware import REPLICA_PIN_SESSION_KEY
+from .models import (
+    AuditLog, Branches, CarCategories, CarHolds, Cars, CarStatuses, ClientDuplicates, Clients, Contracts, ContractStatuses, Employees,
+    PricingRules,
+)
+from .views import reports
+from .views.reports import _cache_params
+
+# Тестовая база — копия рабочей (settings.DATABASES["default"]["TEST"]["TEMPLATE"]):
+# справочники, машины и клиенты уже есть. Договоры тестов кладём в далёкое будущее,
+# где рабочих договоров нет, и удаляем за собой: contracts unmanaged, flush её не чистит.
+FUTURE = date(2099, 3, 1)
+
+
+def contract_data(car, start, end, **extra):
+    branch = Branches.objects.order_by("pk").first()
+    data = {
+        "cstatus": ContractStatuses.objects.order_by("pk").first().pk,
+        "client": Clients.objects.order_by("pk").first().pk,
+        "car": car.pk,
+        "created_at": start.isoformat(),
+        "issue_date": start.isoformat(),
+        "return_date": end.isoformat(),
+        "payment": Contracts.PAYMENT_CHOICES[0][0],
+        "issue_branch": branch.pk,
+        "return_branch": branch.pk,
+    }
+    data.update(extra)
+    return data
+
+
+def employee_user(branch_id, email="clerk@test.local"):
+    # сотрудник филиала без прав администратора: BranchScopeMiddleware ограничит его своим филиалом
+    admin = Employees.objects.order_by("pk").first()
+    employee = Employees.objects.create(
+        full_name="Тестов Тест", passport="0000 000000", role=admin.role, branch_id=branch_id,
+        phone="+7 900 000-00-00", email=email,
+    )
+    return employee, User.objects.create(username=email)
+
+
+def run_concurrently(target, count):
+    # target(i) в count потоках, стартующих одновременно; -> результаты или исключения
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(i):
+        try:
+            barrier.wait()
+            results[i] = target(i)
+        except Exception as exc:
+            results[i] = exc
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class LockedCar:
+    # держит строку машины (SELECT ... FOR UPDATE) в другом соединении, пока открыт with
+    def __init__(self, car_id):
+        self.car_id = car_id
+        self.locked = threading.Event()
+        self.release = threading.Event()
+        self.thread = threading.Thread(target=self._run)
+
+    def _run(self):
+        try:
+            with transaction.atomic():
+                Cars.objects.select_for_update().filter(pk=self.car_id).exists()
+                self.locked.set()
+                self.release.wait(10)
+        finally:
+            connections.close_all()
+
+    def __enter__(self):
+        self.thread.start()
+        self.locked.wait(10)
+        return self
+
+    def __exit__(self, *exc):
+        self.release.set()
+        self.thread.join()
+
+
+class ReplicaRoutingTests(TestCase):
+    def replica_up(self):
+        return mock.patch.object(db_routers, "replica_available", return_value=True)
+
+    def test_marked_reads_go_to_replica(self):
+        reads = db_routers.read_from_replica(lambda: router.db_for_read(Contracts))
+        with self.replica_up():
+            self.assertEqual(reads(), db_routers.REPLICA_ALIAS)
+            self.assertEqual(router.db_for_read(Contracts), "default")
+            self.assertEqual(db_routers.read_from_replica(lambda: router.db_for_write(Contracts))(), "default")
+
+    def test_pinned_reads_stay_on_primary(self):
+        reads = db_routers.read_from_replica(lambda: router.db_for_read(Contracts))
+        token = db_routers.pin_to_primary(True)
+        try:
+            with self.replica_up():
+                self.assertEqual(reads(), "default")
+        finally:
+            db_routers.unpin(token)
+
+    @override_settings(REPLICA_MAX_LAG_SECONDS=5, REPLICA_LAG_CHECK_INTERVAL=0)
+    def test_lagging_or_unreachable_replica_is_skipped(self):
+        with mock.patch.dict(settings.DATABASES, {db_routers.REPLICA_ALIAS: {}}), \
+                mock.patch.dict(db_routers._lag_state, checked_at=0.0, ok=True):
+            with mock.patch.object(db_routers, "_replica_lag_seconds", return_value=1):
+                self.assertTrue(db_routers.replica_available())
+            with mock.patch.object(db_routers, "_replica_lag_seconds", return_value=30):
+                self.assertFalse(db_routers.replica_available())
+            with mock.patch.object(db_routers, "_replica_lag_seconds", side_effect=OSError):
+                self.assertFalse(db_routers.replica_available())
+
+    def test_post_pins_session_to_primary(self):
+        self.client.force_login(User.objects.create(username="pin@test.local", is_staff=True))
+        self.client.post("/branch/", {"branch": "all"})
+        self.assertGreater(self.client.session[REPLICA_PIN_SESSION_KEY], time.time())
+
+
+class ConditionalPageTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create(username="etag@test.local", is_staff=True))
+        self.client.post("/branch/", {"branch": "all"})
+        # csrf-cookie входит в ETag; первая страница её только выставляет
+        self.client.get("/")
+
+    def test_unchanged_page_is_304(self):
+        response = self.client.get("/cars/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+        again = self.client.get("/cars/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+    def test_table_change_renews_etag(self):
+        etag = self.client.get("/cars/")["ETag"]
+        versions.bump(Cars)
+        response = self.client.get("/cars/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_branch_renews_etag(self):
+        etag = self.client.get("/cars/")["ETag"]
+        self.client.post("/branch/", {"branch": Branches.objects.order_by("pk").first().pk})
+        self.assertEqual(self.client.get("/cars/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_pages_are_gzipped(self):
+        response = self.client.get("/cars/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+
+class EstimatedCountTests(TestCase):
+    def count_queries(self, func):
+        with CaptureQueriesContext(connections["default"]) as context:
+            result = func()
+        return result, [q["sql"] for q in context.captured_queries if "COUNT(" in q["sql"].upper()]
+
+    def test_large_table_uses_statistics(self):
+        rows, counts = self.count_queries(lambda: estimated_count(Contracts.objects.all(), threshold=1))
+        self.assertEqual(counts, [])
+        # оценка по reltuples секций, а не по родителю (у него статистика пустая)
+        self.assertAlmostEqual(rows, Contracts.objects.count(), delta=Contracts.objects.count() * 0.1)
+
+    def test_filtered_queryset_uses_plan(self):
+        since = Contracts.objects.order_by("-issue_date").values_list("issue_date", flat=True).first() - timedelta(days=365)
+        rows, counts = self.count_queries(lambda: estimated_count(Contracts.objects.issued_since(since), threshold=1))
+        self.assertEqual(counts, [])
+        self.assertGreater(rows, 0)
+
+    def test_small_result_is_exact(self):
+        exact = Cars.objects.count()
+        rows, counts = self.count_queries(lambda: estimated_count(Cars.objects.all(), threshold=exact + 1))
+        self.assertEqual(rows, exact)
+        self.assertEqual(len(counts), 1)
+
+    def test_paginator(self):
+        paginator = EstimatedCountPaginator(Cars.objects.order_by("pk"), 50)
+        self.assertEqual(paginator.count, Cars.objects.count())
+
+
+class BulkActionTests(TestCase):
+    def setUp(self):
+        branch_id = Cars.objects.order_by("pk").values_list("branch_id", flat=True).first()
+        self.own = list(Cars.objects.filter(branch=branch_id).order_by("pk")[:3])
+        self.foreign = Cars.objects.exclude(branch=branch_id).order_by("pk").first()
+        _, self.user = employee_user(branch_id)
+        self.client.force_login(self.user)
+
+    def bulk(self, cars, **data):
+        return self.client.post("/cars/bulk/", {"ids": [car.pk for car in cars], **data}, follow=True)
+
+    def prices(self, cars):
+        return dict(Cars.objects.filter(pk__in=[car.pk for car in cars]).values_list("pk", "daily_price"))
+
+    def test_price_change_is_one_update_and_audited(self):
+        before = self.prices(self.own)
+        version = versions.get_versions(Cars)["cars"][0]
+        with CaptureQueriesContext(connections["default"]) as context:
+            self.bulk(self.own, action="price", percent="10")
+        updates = [q["sql"] for q in context.captured_queries if q["sql"].startswith('UPDATE "cars"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.prices(self.own), {pk: (price * Decimal("1.1")).quantize(Decimal("0.01"), ROUND_HALF_UP) for pk, price in before.items()})
+        self.assertEqual(
+            AuditLog.objects.filter(table_name="cars", user_id=self.user.pk, action=AuditLog.ACTION_UPDATE).count(), 3
+        )
+        self.assertGreater(versions.get_versions(Cars)["cars"][0], version)
+
+    def test_foreign_branch_ids_are_ignored(self):
+        before = self.prices([self.foreign])
+        self.bulk(self.own + [self.foreign], action="price", percent="10")
+        self.assertEqual(self.prices([self.foreign]), before)
+
+    def test_invalid_percent_changes_nothing(self):
+        before = self.prices(self.own)
+        response = self.bulk(self.own, action="price", percent="1000")
+        self.assertContains(response, "Процент изменения цены")
+        self.assertEqual(self.prices(self.own), before)
+
+    def test_delete_of_used_cars_is_all_or_nothing(self):
+        used = Cars.objects.filter(pk__in=Contracts.objects.values("car_id"), branch=self.own[0].branch_id).first()
+        response = self.bulk([used], action="delete")
+        self.assertContains(response, "ничего не удалено")
+        self.assertTrue(Cars.objects.filter(pk=used.pk).exists())
+
+
+def pricing_rule(rule_id, multiplier, **fields):
+    return PricingRules(rule_id=rule_id, name=f"правило {rule_id}", multiplier=Decimal(multiplier), **fields)
+
+
+class PricingEngineTests(SimpleTestCase):
+    # категории 1, 2 и филиалы 10, 20; горизонт сезонов — от 2026-01-01
+    TODAY = date(2026, 1, 1)
+
+    def engine(self, *rules):
+        return pricing.PricingEngine(list(rules), [1, 2], [10, 20], today=self.TODAY)
+
+    def total(self, engine, start, end, category_id=1, branch_id=10, price=1000):
+        return float(engine.quote_batch(price, category_id, branch_id, start, end))
+
+    def test_season_applies_only_to_days_inside_period(self):
+        engine = self.engine(
+            pricing_rule(1, "1.2", category_id=1),
+            pricing_rule(2, "1.5", date_from=date(2026, 1, 2), date_to=date(2026, 1, 3)),
+        )
+        self.assertEqual(self.total(engine, date(2026, 1, 1), date(2026, 1, 4)), 1000 * 1.2 * (1 + 1.5 + 1.5 + 1))
+        self.assertEqual(self.total(engine, date(2026, 1, 1), date(2026, 1, 4), category_id=2), 1000 * (1 + 1.5 + 1.5 + 1))
+
+    def test_longest_fitting_duration_discount_wins(self):
+        engine = self.engine(pricing_rule(1, "0.9", min_days=3), pricing_rule(2, "0.8", min_days=7))
+        start = date(2026, 2, 1)
+        self.assertEqual(self.total(engine, start, start + timedelta(days=1)), 2000)
+        self.assertEqual(self.total(engine, start, start + timedelta(days=4)), 4500)
+        self.assertEqual(self.total(engine, start, start + timedelta(days=7)), 6400)
+
+    def test_unknown_category_and_branch_get_only_general_rules(self):
+        engine = self.engine(pricing_rule(1, "1.1"), pricing_rule(2, "2", category_id=1), pricing_rule(3, "3", branch_id=10))
+        self.assertAlmostEqual(self.total(engine, self.TODAY, self.TODAY, category_id=99, branch_id=30), 1100)
+
+    def test_outside_horizon_only_static_rules(self):
+        engine = self.engine(
+            pricing_rule(1, "1.2"),
+            pricing_rule(2, "1.5", date_from=date(2026, 1, 2), date_to=date(2026, 1, 3)),
+        )
+        self.assertAlmostEqual(self.total(engine, date(2035, 1, 1), date(2035, 1, 3)), 3600)
+
+    def test_reversed_dates_cost_nothing(self):
+        self.assertEqual(self.total(self.engine(), date(2026, 1, 5), date(2026, 1, 4)), 0)
+
+    def test_grid_matches_single_quotes(self):
+        engine = self.engine(
+            pricing_rule(1, "1.3", branch_id=20),
+            pricing_rule(2, "1.5", category_id=2, date_from=date(2026, 3, 1), date_to=date(2026, 3, 10)),
+            pricing_rule(3, "0.85", min_days=5),
+        )
+        cars = [(1000, 1, 10), (2500, 2, 20), (1800, 2, 10)]
+        ranges = [(date(2026, 2, 27), date(2026, 3, 2)), (date(2026, 3, 5), date(2026, 3, 14)), (date(2026, 3, 1), date(2026, 3, 1))]
+        grid = engine.quote_grid(cars, ranges)
+        for i, (price, category_id, branch_id) in enumerate(cars):
+            for j, (start, end) in enumerate(ranges):
+                self.assertEqual(grid[i, j], self.total(engine, start, end, category_id, branch_id, price))
+
+    def test_quote_is_decimal_in_roubles(self):
+        car = Cars(daily_price=Decimal("1234.56"), category_id=1, branch_id=10)
+        self.assertEqual(self.engine(pricing_rule(1, "1.1")).quote(car, self.TODAY, self.TODAY), Decimal("1358.02"))
+
+
+class PricingQuoteTests(TestCase):
+    def setUp(self):
+        invalidation.cache.clear()
+        self.car = Cars.objects.order_by("pk").first()
+        self.client.force_login(User.objects.create(username="quote@test.local", is_staff=True))
+
+    def tearDown(self):
+        # собранные правила из откаченной транзакции не должны остаться в кеше воркера
+        invalidation.cache.clear()
+
+    def quote(self, start, end, car=None):
+        return self.client.get("/contracts/quote/", {
+            "car": (car or self.car).pk, "issue_date": start.isoformat(), "return_date": end.isoformat(),
+        })
+
+    def test_rule_change_rebuilds_engine(self):
+        week = FUTURE + timedelta(days=6)
+        self.assertEqual(pricing.quote(self.car, FUTURE, week), self.car.daily_price * 7)
+        with self.captureOnCommitCallbacks(execute=True):
+            PricingRules.objects.create(name="наценка", category_id=self.car.category_id, multiplier=Decimal("1.5"))
+        self.assertEqual(pricing.quote(self.car, FUTURE, week), (self.car.daily_price * Decimal("10.5")).quantize(Decimal("0.01")))
+
+    def test_endpoint_returns_total(self):
+        response = self.quote(FUTURE, FUTURE + timedelta(days=2))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["days"], 3)
+        self.assertEqual(Decimal(str(response.json()["total_amount"])), self.car.daily_price * 3)
+
+    def test_endpoint_rejects_bad_dates(self):
+        self.assertEqual(self.quote(FUTURE, FUTURE - timedelta(days=1)).status_code, 400)
+        response = self.client.get("/contracts/quote/", {"car": self.car.pk, "issue_date": "завтра"})
+        self.assertEqual(response.status_code, 400)
+
+
+def kpi_snapshot(contract_ids=(1, 2), **values):
+    return {"total_cars": 10, "free_cars": 4, **values, "last_contracts": [{"contract_id": pk} for pk in contract_ids]}
+
+
+class LiveKpiHubTests(SimpleTestCase):
+    def setUp(self):
+        self.hub = live.KpiHub()
+        # без LISTEN: пересчёт вызываем сами
+        self.hub._start = lambda: None
+        self.snapshots = {}
+        patcher = mock.patch.object(live, "_snapshot", side_effect=lambda branch_id: self.snapshots[branch_id])
+        self.snapshot = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_delta_has_only_changed_values_and_new_rows(self):
+        old = kpi_snapshot()
+        self.assertEqual(live._delta(old, kpi_snapshot()), {})
+        delta = live._delta(old, kpi_snapshot((3, 1), free_cars=3))
+        self.assertEqual(delta["free_cars"], 3)
+        self.assertNotIn("total_cars", delta)
+        self.assertEqual(delta["new_contracts"], [3])
+
+    def test_snapshot_is_computed_once_per_branch(self):
+        self.snapshots[1] = kpi_snapshot()
+
+        async def run():
+            first, snapshot = await self.hub.subscribe(1)
+            second, _ = await self.hub.subscribe(1)
+            self.snapshots[1] = kpi_snapshot(free_cars=3)
+            await self.hub._broadcast()
+            return snapshot, first.get_nowait(), second.get_nowait()
+
+        snapshot, first, second = asyncio.run(run())
+        self.assertEqual(snapshot, kpi_snapshot())
+        self.assertEqual(first, {"free_cars": 3})
+        self.assertEqual(second, first)
+        # одна подписка и один пересчёт на две вкладки
+        self.assertEqual(self.snapshot.call_count, 2)
+
+    def test_unchanged_snapshot_sends_nothing(self):
+        self.snapshots[1] = kpi_snapshot()
+
+        async def run():
+            queue, _ = await self.hub.subscribe(1)
+            await self.hub._broadcast()
+            return queue.empty()
+
+        self.assertTrue(asyncio.run(run()))
+
+    @override_settings(LIVE_QUEUE_SIZE=1)
+    def test_slow_tab_is_closed(self):
+        async def run():
+            self.snapshots[1] = kpi_snapshot()
+            queue, _ = await self.hub.subscribe(1)
+            for free_cars in (3, 2):
+                self.snapshots[1] = kpi_snapshot(free_cars=free_cars)
+                await self.hub._broadcast()
+            return queue.get_nowait()
+
+        self.assertIsNone(asyncio.run(run()))
+        self.assertNotIn(1, self.hub.subscribers)
+        self.assertNotIn(1, self.hub.snapshots)
+
+
+class LiveKpiStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="live@test.local", is_staff=True)
+
+    def test_anonymous_is_rejected(self):
+        self.assertEqual(self.client.get("/dashboard/stream/").status_code, 401)
+
+    def test_wsgi_gets_no_stream(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get("/dashboard/stream/").status_code, 204)
+
+    async def test_stream_starts_with_snapshot(self):
+        client = AsyncClient()
+        await sync_to_async(client.force_login)(self.user)
+        queue = asyncio.Queue()
+        await queue.put({"free_cars": 3})
+        await queue.put(None)
+        with mock.patch("rental.views.dashboards.hub") as hub:
+            hub.subscribe = mock.AsyncMock(return_value=(queue, kpi_snapshot()))
+            response = await client.get("/dashboard/stream/")
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            body = "".join([chunk.decode() async for chunk in response.streaming_content])
+        self.assertTrue(body.startswith(f"retry: {settings.LIVE_RETRY_MS}\nevent: snapshot\n"))
+        self.assertIn('event: kpi\ndata: {"free_cars": 3}\n\n', body)
+        hub.unsubscribe.assert_called_once_with(None, queue)
+
+
+class FleetSnapshotTests(TestCase):
+    def setUp(self):
+        invalidation.cache.clear()
+        self.fleet = Fleet()
+        self.free_status = CarStatuses.objects.get(status="свободен")
+        self.car = Cars.objects.filter(status=self.free_status).order_by("pk").first()
+
+    def tearDown(self):
+        # маркер парка из откаченной транзакции не должен остаться в кеше воркера
+        invalidation.cache.clear()
+
+    def change(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            Cars.objects.filter(pk=self.car.pk).update(**fields)
+            versions.bump(Cars)
+
+    def loads(self):
+        # какие id перечитал снимок: None — весь парк
+        return mock.patch.object(Fleet, "_load", side_effect=Fleet._load)
+
+    def test_matches_table(self):
+        branch_id = self.car.branch_id
+        self.assertEqual(self.fleet.count(), Cars.objects.count())
+        self.assertEqual(self.fleet.count(branch_id=branch_id), Cars.objects.filter(branch=branch_id).count())
+        self.assertEqual(
+            self.fleet.count(free=True), Cars.objects.filter(status=self.free_status).count()
+        )
+        self.assertEqual(
+            self.fleet.ids(max_price=self.car.daily_price),
+            list(Cars.objects.filter(daily_price__lte=self.car.daily_price).order_by("pk").values_list("pk", flat=True)),
+        )
+
+    def test_get_is_scoped_by_branch(self):
+        car = self.fleet.get(self.car.pk, self.car.branch_id)
+        self.assertEqual((car.pk, car.daily_price, car.free), (self.car.pk, self.car.daily_price, True))
+        other = Branches.objects.exclude(pk=self.car.branch_id).order_by("pk").first()
+        self.assertIsNone(self.fleet.get(self.car.pk, other.pk))
+        self.assertIsNone(self.fleet.get(0))
+        self.assertIsNone(self.fleet.get(2**40))
+
+    def test_change_rereads_only_changed_cars(self):
+        free = self.fleet.count(free=True)
+        busy = CarStatuses.objects.exclude(pk=self.free_status.pk).order_by("pk").first()
+        self.change(status=busy, daily_price=F("daily_price") + 1)
+        with self.loads() as load:
+            car = self.fleet.get(self.car.pk)
+        self.assertEqual([call.args[1:] for call in load.call_args_list], [([self.car.pk],)])
+        self.assertEqual(car.daily_price, self.car.daily_price + 1)
+        self.assertFalse(car.free)
+        self.assertEqual(self.fleet.count(free=True), free - 1)
+
+    def test_unchanged_tables_are_not_reread(self):
+        self.fleet.count()
+        with self.loads() as load, CaptureQueriesContext(connections["default"]) as context:
+            self.fleet.count()
+        load.assert_not_called()
+        self.assertFalse([q["sql"] for q in context.captured_queries if "FROM cars" in " ".join(q["sql"].split())])
+
+    def test_clear_reloads_whole_fleet(self):
+        self.fleet.count()
+        self.fleet.clear()
+        with self.loads() as load:
+            self.fleet.count()
+        self.assertEqual([call.args[1:] for call in load.call_args_list], [()])
+
+
+class ReportCacheKeyTests(SimpleTestCase):
+    def key(self, params, branch_id=None):
+        with mock.patch.object(report_cache.versions, "get_versions", return_value={}):
+            return report_cache.cache_key(
+                "report_contracts", _cache_params(params, branch_id, date(2026, 1, 1)), (Contracts,)
+            )
+
+    def test_branch_filter_changes_key(self):
+        self.assertNotEqual(self.key({"branch": "1"}), self.key({"branch": "2"}))
+
+    def test_branch_filter_is_not_overwritten_by_scope(self):
+        self.assertNotEqual(self.key({"branch": "1"}, branch_id=1), self.key({"branch": "2"}, branch_id=1))
+
+    def test_scope_changes_key(self):
+        self.assertNotEqual(self.key({}, branch_id=1), self.key({}, branch_id=None))
+
+
+class ReportCacheModelsTests(TestCase):
+    # всё, что читает отчёт, должно быть в ключе его кеша: иначе правка справочника
+    # (название филиала, статуса) не сбросит готовый PDF
+    def read_tables(self, generate, params):
+        with tempfile.TemporaryDirectory() as tmp, CaptureQueriesContext(connections["default"]) as context:
+            generate(os.path.join(tmp, "report.pdf"), None, params)
+        return {table for query in context.captured_queries for table in query_plans._tables(query["sql"])}
+
+    def cached_tables(self, models):
+        return {model._meta.db_table for model in models}
+
+    def test_contract_report(self):
+        last = Contracts.objects.order_by("-issue_date").values_list("issue_date", flat=True).first()
+        params = {
+            "date_from": (last - timedelta(days=7)).isoformat(),
+            "date_to": last.isoformat(),
+            "branch": str(Branches.objects.order_by("pk").first().pk),
+            "cstatus": str(ContractStatuses.objects.order_by("pk").first().pk),
+            "category": str(CarCategories.objects.order_by("pk").first().pk),
+        }
+        tables = self.read_tables(reports.generate_contract_report, params)
+        self.assertLessEqual(tables, self.cached_tables(reports.CONTRACT_REPORT_MODELS))
+
+    def test_cars_report(self):
+        car = Cars.objects.order_by("pk").first()
+        params = {"branch": str(car.branch_id), "status": str(car.status_id), "category": str(car.category_id)}
+        tables = self.read_tables(reports.generate_cars_report, params)
+        self.assertIn("car_statuses", tables)
+        self.assertLessEqual(tables, self.cached_tables(reports.CARS_REPORT_MODELS))
+
+
+class CohortTests(TestCase):
+    def setUp(self):
+        invalidation.cache.clear()
+
+    def test_scoped_by_branch(self):
+        branch = Branches.objects.order_by("pk").first()
+        everywhere = cohorts.cohort_analysis()
+        scoped = cohorts.cohort_analysis(branch.pk)
+        self.assertEqual(everywhere["contracts"], Contracts.objects.count())
+        self.assertEqual(scoped["contracts"], Contracts.objects.for_branch(branch.pk).count())
+        self.assertLess(scoped["contracts"], everywhere["contracts"])
+
+    def test_reads_replica(self):
+        # выгрузку договоров и счётчики, с которыми запоминается результат, читаем с реплики
+        seen = {}
+
+        def load(branch_id=None):
+            seen["contracts"] = cohorts.router.db_for_read(Contracts)
+            return cohorts.np.array([], dtype=cohorts.np.int64), cohorts.np.array([]), cohorts.np.array([])
+
+        def get_versions(*tables, using="default"):
+            seen["versions"] = using
+            return {table: (0, None) for table in tables}
+
+        with mock.patch.object(db_routers, "replica_available", return_value=True), \
+                mock.patch.object(cohorts, "load_contract_arrays", side_effect=load), \
+                mock.patch.object(invalidation.versions, "get_versions", side_effect=get_versions):
+            cohorts.cohort_analysis(1)
+        self.assertEqual(seen, {"contracts": db_routers.REPLICA_ALIAS, "versions": db_routers.REPLICA_ALIAS})
+
+    def test_view_is_scoped_by_branch(self):
+        branch = Branches.objects.order_by("pk").first()
+        self.client.force_login(User.objects.create(username="cohorts@test.local", is_staff=True))
+        self.client.post("/branch/", {"branch": branch.pk})
+        with mock.patch.object(cohorts, "cohort_analysis", wraps=cohorts.cohort_analysis) as analysis:
+            response = self.client.get("/dashboard/cohorts.csv")
+        self.assertEqual(response.status_code, 200)
+        analysis.assert_called_once_with(branch.pk)
+
+
+class DuplicateBlockingTests(TestCase):
+    def client_named(self, n, birth_date, passport):
+        return Clients.objects.create(
+            full_name="Щукозвонов Тестислав", birth_date=birth_date, passport=passport,
+            dl_number="00 00 000000", phone=f"+7 900 000-{n:04d}", email=f"dup{n}@test.local", address="-",
+        )
+
+    def test_large_block_is_split_and_leftovers_reported(self):
+        # блок ФИО из 6 клиентов при max_block=3: пара с общей датой рождения сравнивается,
+        # четверо с одной датой и серией паспорта не делятся и попадают в статистику
+        pair = [self.client_named(i, date(1990, 1, 1), f"1111 00000{i}") for i in range(2)]
+        for i in range(2, 6):
+            self.client_named(i, date(1980, 1, 1), f"7777 00000{i}")
+        key = Clients.objects.annotate(key=dedup.NameKey("full_name")).values_list("key", flat=True).get(pk=pair[0].pk)
+
+        stats = {}
+        found = {(a, b) for a, b, _, _ in dedup.find_candidates(threshold=0.55, max_block=3, stats=stats)}
+
+        self.assertIn((pair[0].pk, pair[1].pk), found)
+        self.assertIn((f"n:{key}", 4), stats["skipped_blocks"])
+        self.assertEqual(stats["clients"], Clients.objects.count())
+
+
+class ExportChangesTests(TestCase):
+    # журнал contract_month_changes (миграция 0017): выгрузка подписывает только месяцы из него
+    def test_only_exported_columns_mark_months(self):
+        car = Cars.objects.filter(pk__in=Contracts.objects.values("car_id")).order_by("pk").first()
+        months = {day.strftime("%Y-%m") for day in Contracts.objects.filter(car=car).dates("issue_date", "month")}
+        horizon = exports.changes_horizon("default")
+
+        Cars.objects.filter(pk=car.pk).update(mileage=F("mileage") + 1)
+        self.assertEqual(exports.changed_months("default", horizon), set())
+
+        Cars.objects.filter(pk=car.pk).update(model=F("model"))
+        self.assertEqual(exports.changed_months("default", horizon), set())
+
+        Cars.objects.filter(pk=car.pk).update(brand=car.brand + "·")
+        self.assertEqual(exports.changed_months("default", horizon), months)
+
+    def test_export_touches_only_changed_months(self):
+        with tempfile.TemporaryDirectory() as out:
+            exports.save_manifest(out, {
+                "schema_version": exports.SCHEMA_VERSION, "format": "parquet", "months": {},
+                "changes_horizon": {"xid": exports.changes_horizon("default"), "at": now().isoformat()},
+            })
+            form = ContractForm(contract_data(Cars.objects.order_by("pk").first(), FUTURE, FUTURE))
+            self.assertTrue(form.is_valid(), form.errors)
+            contract = form.save()
+
+            self.assertEqual(exports.export_contracts(out, log=lambda line: None), [("2099-03", 1)])
+            self.assertEqual(exports.export_contracts(out, log=lambda line: None), [])
+
+            contract.delete()
+            self.assertEqual(exports.export_contracts(out, log=lambda line: None), [])
+            self.assertEqual(exports.load_manifest(out)["months"], {})
+            self.assertFalse(os.path.exists(os.path.join(out, "contracts", "month=2099-03")))
+
+
+class EmployeeBranchTests(TestCase):
+    def setUp(self):
+        invalidation.cache.clear()
+        self.own_car = Cars.objects.order_by("pk").first()
+        self.other_car = Cars.objects.exclude(branch=self.own_car.branch_id).order_by("pk").first()
+        self.employee, user = employee_user(self.own_car.branch_id)
+        self.client.force_login(user)
+
+    def tearDown(self):
+        # счётчик employees из откаченной транзакции не должен остаться в кеше воркера
+        invalidation.cache.clear()
+
+    def price(self, car):
+        return self.client.get(f"/cars/get_price/{car.pk}/")
+
+    def test_price_is_scoped_by_branch(self):
+        self.assertEqual(self.price(self.own_car).status_code, 200)
+        self.assertEqual(self.price(self.other_car).status_code, 404)
+
+    def test_branch_is_looked_up_once_per_session(self):
+        self.price(self.own_car)
+        with CaptureQueriesContext(connections["default"]) as context:
+            self.assertEqual(self.price(self.own_car).status_code, 200)
+        self.assertFalse([q["sql"] for q in context.captured_queries if '"employees"' in q["sql"]])
+
+    def test_branch_change_is_picked_up(self):
+        self.assertEqual(self.price(self.own_car).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            Employees.objects.filter(pk=self.employee.pk).update(branch=self.other_car.branch_id)
+            versions.bump(Employees)
+        self.assertEqual(self.price(self.own_car).status_code, 404)
+        self.assertEqual(self.price(self.other_car).status_code, 200)
+
+
+class MergeClientsAuditTests(TestCase):
+    def test_merge_is_audited(self):
+        keep = Clients.objects.order_by("pk").first()
+        drop = Clients.objects.create(
+            full_name=keep.full_name, birth_date=keep.birth_date, passport="0000 000000",
+            dl_number="00 00 000000", phone=keep.phone, email=keep.email, address=keep.address,
+        )
+        form = ContractForm(contract_data(Cars.objects.order_by("pk").first(), FUTURE, FUTURE, client=drop.pk))
+        self.assertTrue(form.is_valid(), form.errors)
+        contract = form.save()
+        pair = ClientDuplicates.objects.create(client_a=keep, client_b=drop, score=0.9)
+        user = User.objects.create(username="merge@test.local", is_staff=True)
+        self.client.force_login(user)
+
+        self.client.post(f"/clients/duplicates/{pair.pk}/resolve/", {"action": "keep_a"})
+
+        contract.refresh_from_db()
+        self.assertEqual(contract.client_id, keep.pk)
+        self.assertFalse(Clients.objects.filter(pk=drop.pk).exists())
+        entries = {(e.table_name, e.object_id): e for e in AuditLog.objects.filter(user_id=user.pk)}
+        moved = entries[("contracts", contract.pk)]
+        self.assertEqual((moved.action, moved.changes), (AuditLog.ACTION_UPDATE, {"client_id": [drop.pk, keep.pk]}))
+        dropped = entries[("clients", drop.pk)]
+        self.assertEqual(dropped.action, AuditLog.ACTION_DELETE)
+        self.assertEqual(dropped.changes["passport"], ["0000 000000", None])
+
+
+class RentalLengthTests(TestCase):
+    # окно по issue_date в Contracts.overlapping верно, только пока договоры не длиннее
+    # CONTRACTS_MAX_RENTAL_DAYS
+    def setUp(self):
+        self.car = Cars.objects.order_by("pk").first()
+        self.too_long = FUTURE + timedelta(days=settings.CONTRACTS_MAX_RENTAL_DAYS + 1)
+
+    def test_form_rejects_too_long_rental(self):
+        form = ContractForm(contract_data(self.car, FUTURE, self.too_long))
+        self.assertFalse(form.is_valid())
+        self.assertIn("Срок аренды не может превышать", str(form.errors))
+
+    def test_form_accepts_longest_rental(self):
+        end = FUTURE + timedelta(days=settings.CONTRACTS_MAX_RENTAL_DAYS)
+        form = ContractForm(contract_data(self.car, FUTURE, end))
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_hold_rejects_too_long_rental(self):
+        user = User.objects.create(username="clerk@test.local")
+        with self.assertRaisesMessage(holds.HoldError, "Срок аренды не может превышать"):
+            holds.place_hold(user, self.car.pk, FUTURE, self.too_long)
+
+    def test_database_rejects_too_long_contract(self):
+        form = ContractForm(contract_data(self.car, FUTURE, FUTURE + timedelta(days=1)))
+        self.assertTrue(form.is_valid(), form.errors)
+        contract = form.save(commit=False)
+        contract.return_date = self.too_long
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            contract.save()
+
+
+class QueryPlanTests(TestCase):
+    # тестовая база — копия рабочей, так что планы и стоимости те же, что у manage.py check_query_plans
+    def baseline(self):
+        with open(DEFAULT_BASELINE, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_hot_pages_match_baseline(self):
+        call_command("check_query_plans", stdout=io.StringIO())
+
+    def test_query_without_baseline_fails(self):
+        baseline = self.baseline()
+        missing = sorted(baseline)[0]
+        del baseline[missing]
+        problems = {name: problems for name, _, _, problems, _ in query_plans.check_plans(baseline)}
+        self.assertEqual(problems[missing], ["нет базовой стоимости"])
+
+    def test_orphaned_baseline_fails(self):
+        baseline = {**self.baseline(), "home:contracts#99": 1.0}
+        results = query_plans.check_plans(baseline)
+        self.assertIn(("home:contracts#99", None, {}, ["запрос из базовых больше не выполняется"], ""), results)
+
+
+class CarHoldConcurrencyTests(TransactionTestCase):
+    CLERKS = 6
+
+    def setUp(self):
+        self.car = Cars.objects.order_by("pk").first()
+        self.users = [User.objects.create(username=f"clerk{i}@test.local") for i in range(self.CLERKS)]
+
+    def tearDown(self):
+        Contracts.objects.filter(car=self.car, issue_date__gte=FUTURE).delete()
+
+    def test_parallel_bookings_do_not_overlap(self):
+        # сотрудники одновременно оформляют одну машину на пересекающиеся даты
+        def book(i):
+            start = FUTURE + timedelta(days=i % 3)
+            form = ContractForm(contract_data(self.car, start, start + timedelta(days=5)))
+            if not form.is_valid():
+                raise AssertionError(form.errors)
+            return holds.book_contract(form, self.users[i])
+
+        results = run_concurrently(book, self.CLERKS)
+
+        unexpected = [r for r in results if not isinstance(r, (Contracts, holds.HoldError))]
+        self.assertEqual(unexpected, [])
+        self.assertEqual(sum(isinstance(r, Contracts) for r in results), 1)
+        periods = sorted(
+            Contracts.objects.filter(car=self.car, issue_date__gte=FUTURE).values_list("issue_date", "return_date")
+        )
+        for (_, previous_end), (start, _) in zip(periods, periods[1:]):
+            self.assertLess(previous_end, start)
+
+    def test_parallel_holds_leave_one_hold(self):
+        def hold(i):
+            return holds.place_hold(self.users[i], self.car.pk, FUTURE, FUTURE + timedelta(days=3))
+
+        results = run_concurrently(hold, self.CLERKS)
+
+        unexpected = [r for r in results if not isinstance(r, (CarHolds, holds.HoldError))]
+        self.assertEqual(unexpected, [])
+        self.assertEqual(sum(isinstance(r, CarHolds) for r in results), 1)
+        self.assertEqual(CarHolds.objects.live().overlapping(self.car.pk, FUTURE, FUTURE).count(), 1)
+
+    def test_hold_does_not_wait_for_locked_car(self):
+        # NOWAIT: пока строку машины держит другая транзакция, отказ приходит сразу
+        with LockedCar(self.car.pk):
+            with self.assertRaisesMessage(holds.HoldError, "сейчас бронирует"):
+                holds.place_hold(self.users[0], self.car.pk, FUTURE, FUTURE + timedelta(days=1))
+        self.assertIsNotNone(holds.place_hold(self.users[0], self.car.pk, FUTURE, FUTURE + timedelta(days=1)))
+
+    def test_expire_skips_locked_holds(self):
+        # SKIP LOCKED: бронь, которую прямо сейчас превращают в договор, сборщик не трогает
+        expired = [
+            CarHolds.objects.create(
+                car=self.car, user=user, start_date=FUTURE, end_date=FUTURE,
+                expires_at=FUTURE - timedelta(days=36500),
+            )
+            for user in self.users[:3]
+        ]
+        locked = threading.Event()
+        release = threading.Event()
+
+        def lock_hold():
+            try:
+                with transaction.atomic():
+                    CarHolds.objects.select_for_update().filter(pk=expired[0].pk).exists()
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=lock_hold)
+        thread.start()
+        locked.wait(10)
+        try:
+            removed = holds.expire_holds()
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(removed, 2)
+        self.assertEqual(list(CarHolds.objects.values_list("pk", flat=True)), [expired[0].pk])
@@ -4,39 +4,60 @@ from . import views
 urlpatterns = [
     path('', views.dashboard_home, name='home'),
     path('dashboard/', views.dashboard_home, name='dashboard'),
+    path('dashboard/stream/', views.dashboard_stream, name='dashboard_stream'),
 
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
+    path('branch/', views.branch_switch, name='branch_switch'),
 
     path('reports/', views.reports_page, name='reports_page'),
     path('reports/contracts/', views.report_contracts, name='report_contracts'),
     path('reports/cars/', views.report_cars, name='report_cars'),
 
     path('clients/', views.client_list, name='client_list'),
+    path('clients/rows/', views.client_rows, name='client_rows'),
     path('clients/add/', views.client_add, name='client_add'),
+    path('clients/bulk/', views.client_bulk, name='client_bulk'),
+    path('clients/duplicates/', views.client_duplicates, name='client_duplicates'),
+    path('clients/duplicates/<int:pk>/resolve/', views.client_duplicate_resolve, name='client_duplicate_resolve'),
     path('clients/<int:pk>/edit/', views.client_edit, name='client_edit'),
     path('clients/<int:pk>/delete/', views.client_delete, name='client_delete'),
 
     path('cars/', views.car_list, name='car_list'),
+    path('cars/rows/', views.car_rows, name='car_rows'),
     path('cars/add/', views.car_add, name='car_add'),
+    path('cars/bulk/', views.car_bulk, name='car_bulk'),
     path('cars/<int:pk>/edit/', views.car_edit, name='car_edit'),
     path('cars/<int:pk>/delete/', views.car_delete, name='car_delete'),
     path('cars/get_price/<int:car_id>/', views.get_car_price, name='get_car_price'),
 
     path('contracts/', views.contract_list, name='contract_list'),
+    path('contracts/rows/', views.contract_rows, name='contract_rows'),
     path('contracts/add/', views.contract_add, name='contract_add'),
+    path('contracts/bulk/', views.contract_bulk, name='contract_bulk'),
+    path('contracts/hold/', views.contract_hold, name='contract_hold'),
+    path('contracts/quote/', views.contract_quote, name='contract_quote'),
     path('contracts/<int:pk>/edit/', views.contract_edit, name='contract_edit'),
     path('contracts/<int:pk>/delete/', views.contract_delete, name='contract_delete'),
+    path('contracts/<int:pk>/pdf/', views.contract_pdf, name='contract_pdf'),
+    path('contracts/calendar/', views.booking_calendar, name='booking_calendar'),
+    path('contracts/calendar/data/', views.booking_calendar_data, name='booking_calendar_data'),
 
     path('employees/', views.employee_list, name='employee_list'),
+    path('employees/rows/', views.employee_rows, name='employee_rows'),
     path('employees/add/', views.employee_add, name='employee_add'),
+    path('employees/bulk/', views.employee_bulk, name='employee_bulk'),
+    path('employees/import/', views.employee_import, name='employee_import'),
     path('employees/<int:pk>/edit/', views.employee_edit, name='employee_edit'),
     path('employees/<int:pk>/delete/', views.employee_delete, name='employee_delete'),
+    path('audit/<str:table>/<int:pk>/', views.audit_history, name='audit_history'),
     path("dashboard/contracts/", views.dashboard_contracts, name="dashboard_contracts"),
     path("dashboard/revenue/", views.dashboard_revenue, name="dashboard_revenue"),
     path("dashboard/avgcheck/", views.dashboard_avgcheck, name="dashboard_avgcheck"),
     path("dashboard/categories/", views.dashboard_categories, name="dashboard_categories"),
     path("dashboard/topcars/", views.dashboard_topcars, name="dashboard_topcars"),
+    path("dashboard/cohorts/", views.dashboard_cohorts, name="dashboard_cohorts"),
+    path("dashboard/cohorts.csv", views.dashboard_cohorts_csv, name="dashboard_cohorts_csv"),
     path("statistics/", views.statistics_page, name="statistics"),
 
 ]
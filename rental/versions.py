@@ -0,0 +1,111 @@
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.cache import patch_cache_control
+from django.utils.timezone import now
+from django.views.decorators.http import condition
+
+from . import invalidation
+from .models import (
+    Branches,
+    CarCategories,
+    CarStatuses,
+    Cars,
+    Clients,
+    ContractStatuses,
+    Contracts,
+    Employees,
+    PricingRules,
+    Roles,
+    TableVersions,
+)
+
+# справочники тоже: по ним строятся кеши воркеров (rental/invalidation.py)
+TRACKED_MODELS = (
+    Cars, Clients, Contracts, Employees, PricingRules,
+    Branches, CarCategories, CarStatuses, ContractStatuses, Roles,
+)
+
+
+def _table(model_or_table) -> str:
+    return model_or_table if isinstance(model_or_table, str) else model_or_table._meta.db_table
+
+
+def bump(*models):
+    # счётчик изменений таблицы; вызывается из сигналов и после массовых update()/delete().
+    # Заодно NOTIFY для кешей остальных воркеров
+    moment = now()
+    tables = {_table(m) for m in models}
+    for table in tables:
+        updated = TableVersions.objects.filter(table_name=table).update(
+            version=F("version") + 1, updated_at=moment
+        )
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                TableVersions.objects.create(table_name=table, version=1, updated_at=moment)
+        except IntegrityError:
+            TableVersions.objects.filter(table_name=table).update(
+                version=F("version") + 1, updated_at=moment
+            )
+    invalidation.publish(sorted(tables))
+
+
+def get_versions(*models, using="default") -> dict:
+    tables = [_table(m) for m in models]
+    found = {
+        row["table_name"]: (row["version"], row["updated_at"])
+        for row in TableVersions.objects.using(using)
+        .filter(table_name__in=tables)
+        .values("table_name", "version", "updated_at")
+    }
+    return {t: found.get(t, (0, None)) for t in tables}
+
+
+def _request_versions(request, models):
+    cache = request.__dict__.setdefault("_table_versions", {})
+    key = tuple(_table(m) for m in models)
+    if key not in cache:
+        cache[key] = get_versions(*models)
+    return cache[key]
+
+
+def conditional_on(*models, per_day=False):
+    # ETag/Last-Modified из счётчиков таблиц: неизменившаяся страница отдаёт 304,
+    # не выполняя основной запрос представления
+    def etag_func(request, *args, **kwargs):
+        versions = _request_versions(request, models)
+        parts = [f"{t}:{v}" for t, (v, _) in sorted(versions.items())]
+        parts.append(f"user:{request.user.pk}")
+        parts.append(f"branch:{getattr(request, 'branch_id', None)}")
+        # в страницах есть формы с csrf-токеном: после нового входа кеш браузера не годится
+        parts.append(request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""))
+        parts.append(request.get_full_path())
+        if len(get_messages(request)):
+            # есть непоказанные сообщения — страницу нужно отрисовать заново
+            parts.append(str(time.time_ns()))
+        if per_day:
+            parts.append(now().date().isoformat())
+        return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+    def last_modified_func(request, *args, **kwargs):
+        stamps = [ts for _, ts in _request_versions(request, models).values() if ts]
+        return max(stamps) if stamps else None
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+
+    return decorator
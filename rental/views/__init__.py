@@ -0,0 +1,57 @@
+# Представления разнесены по модулям; тяжёлые зависимости (reportlab, numpy)
+# импортируются внутри функций, которым они нужны.
+from .auth import branch_switch, login_view, logout_view
+from .calendar import booking_calendar, booking_calendar_data
+from .crud import (
+    car_list,
+    car_rows,
+    car_add,
+    car_edit,
+    car_delete,
+    car_bulk,
+    client_list,
+    client_rows,
+    client_add,
+    client_edit,
+    client_delete,
+    client_bulk,
+    client_duplicates,
+    client_duplicate_resolve,
+    contract_list,
+    contract_rows,
+    contract_add,
+    contract_edit,
+    contract_delete,
+    contract_bulk,
+    contract_hold,
+    contract_quote,
+    employee_list,
+    employee_rows,
+    employee_add,
+    employee_edit,
+    employee_delete,
+    employee_bulk,
+    employee_import,
+    get_car_price,
+)
+from .dashboards import (
+    dashboard_home,
+    dashboard_stream,
+    dashboard_contracts,
+    dashboard_revenue,
+    dashboard_avgcheck,
+    dashboard_categories,
+    dashboard_topcars,
+    dashboard_cohorts,
+    dashboard_cohorts_csv,
+    statistics_page,
+)
+from .history import audit_history
+from .reports import (
+    reports_page,
+    generate_contract_report,
+    report_contracts,
+    generate_cars_report,
+    report_cars,
+    contract_pdf,
+)
@@ -0,0 +1,54 @@
+from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse
+from django.shortcuts import redirect, render
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
+
+from ..middleware import ALL_BRANCHES, BRANCH_OVERRIDE_SESSION_KEY
+from ..models import Branches
+from .common import _normalize_email
+
+
+def login_view(request):
+    if request.method == "POST":
+        email = _normalize_email(request.POST.get("email", ""))
+        password = request.POST.get("password", "").strip()
+
+        user = authenticate(request, username=email, password=password)
+        if user is None:
+            return render(request, "login.html", {"error": "Неверный email или пароль"})
+        if not user.is_active:
+            return render(request, "login.html", {"error": "Пользователь отключён"})
+
+        login(request, user)
+        return redirect(request.GET.get("next") or "/")
+
+    return render(request, "login.html")
+
+
+@login_required
+def logout_view(request):
+    logout(request)
+    return redirect("login")
+
+
+@login_required
+@require_POST
+def branch_switch(request):
+    if not request.user.is_staff:
+        return HttpResponse(status=403)
+
+    raw = request.POST.get("branch", "")
+    if raw == ALL_BRANCHES:
+        request.session[BRANCH_OVERRIDE_SESSION_KEY] = ALL_BRANCHES
+    elif raw.isdigit() and Branches.objects.filter(pk=int(raw)).exists():
+        request.session[BRANCH_OVERRIDE_SESSION_KEY] = int(raw)
+    else:
+        # пустое значение — снова свой филиал
+        request.session.pop(BRANCH_OVERRIDE_SESSION_KEY, None)
+
+    next_url = request.POST.get("next", "")
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = "/"
+    return redirect(next_url)
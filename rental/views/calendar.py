@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.shortcuts import render
+from django.utils.timezone import now
+
+from ..db_routers import read_from_replica
+from ..models import Cars, ContractStatuses, Contracts
+from ..versions import conditional_on
+
+CALENDAR_MAX_DAYS = 92
+CALENDAR_MAX_CARS = 500
+
+
+@login_required
+def booking_calendar(request):
+    return render(request, "contracts/calendar.html", {
+        "today": now().date(),
+        "cstatuses": {s.cstatus_id: s.status for s in ContractStatuses.objects.all()},
+    })
+
+
+@login_required
+@conditional_on(Contracts, Cars)
+@read_from_replica
+def booking_calendar_data(request):
+    # Окно календаря: машины филиала [offset, offset + limit) и дни [start, start + days).
+    # Брони кодируются как [индекс машины в странице, день начала, день конца от start, id договора, статус].
+    try:
+        start = date.fromisoformat(request.GET.get("start", ""))
+        days = max(1, min(int(request.GET.get("days", 31)), CALENDAR_MAX_DAYS))
+        offset = max(0, int(request.GET.get("offset", 0)))
+        limit = max(1, min(int(request.GET.get("limit", 100)), CALENDAR_MAX_CARS))
+    except ValueError:
+        return HttpResponseBadRequest("Неверные параметры окна календаря")
+
+    fleet = Cars.objects.for_branch(request.branch_id)
+    cars = list(
+        fleet.order_by("plate", "car_id")
+        .values_list("car_id", "plate", "brand", "model")[offset:offset + limit]
+    )
+    index = {car[0]: i for i, car in enumerate(cars)}
+
+    end = start + timedelta(days=days - 1)
+    rows = (
+        Contracts.objects
+        .in_period(start, end)
+        .filter(car_id__in=list(index))
+        .order_by()
+        .values_list("car_id", "issue_date", "return_date", "contract_id", "cstatus_id")
+    )
+    payload = {
+        "start": start.isoformat(),
+        "offset": offset,
+        "bookings": [
+            [index[car_id], (issue - start).days, (returned - start).days, contract_id, cstatus_id]
+            for car_id, issue, returned, contract_id, cstatus_id in rows
+        ],
+    }
+    if request.GET.get("cars") == "1":
+        payload["cars"] = [[car_id, plate, f"{brand} {model}"] for car_id, plate, brand, model in cars]
+        payload["total"] = fleet.count()
+    return JsonResponse(payload)
@@ -0,0 +1,67 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.contrib import messages
+from django.db import connection
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.template.loader import render_to_string
+
+
+def _normalize_email(email: str) -> str:
+    return (email or "").strip().lower()
+
+
+def _selected_ids(request, scope=None):
+    # scope — queryset филиала: чужие id из формы молча отбрасываются
+    ids = sorted({int(raw) for raw in request.POST.getlist("ids") if raw.isdigit()})
+    if scope is not None and ids:
+        ids = sorted(scope.filter(pk__in=ids).values_list("pk", flat=True))
+    return ids
+
+
+def _bulk_delete(model, ids) -> int:
+    # один DELETE по списку id, без поштучной загрузки объектов и сигналов
+    table = model._meta.db_table
+    pk_column = model._meta.pk.column
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{table}" WHERE "{pk_column}" = ANY(%s)', [ids])
+        return cursor.rowcount
+
+
+def _parse_percent(raw):
+    try:
+        percent = Decimal((raw or "").replace(",", "."))
+    except InvalidOperation:
+        return None
+    return percent if Decimal("-90") <= percent <= Decimal("500") else None
+
+
+def _bulk_result(request, affected, list_url):
+    messages.success(request, f"Готово, затронуто записей: {affected}")
+    return redirect(list_url)
+
+
+def _list_params(request):
+    search = (request.GET.get("search", "") or "").strip()
+    sort = (request.GET.get("sort", "") or "").strip()
+    offset = request.GET.get("offset", "")
+    # дальше LIST_MAX_OFFSET не листаем: OFFSET всё равно читает пропущенные строки
+    return search, sort, min(int(offset), settings.LIST_MAX_OFFSET) if offset.isdigit() else 0
+
+
+def _page_rows(rows, offset=0):
+    # limit + 1: лишняя строка только говорит, что дальше есть ещё
+    limit = settings.LIST_PAGE_ROWS
+    rows = list(rows[offset:offset + limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def _rows_response(request, template, rows, more, offset):
+    # ответ поиска по мере ввода: только строки таблицы, без base.html
+    next_offset = offset + len(rows)
+    return JsonResponse({
+        "html": render_to_string(template, {"rows": rows}, request=request),
+        "more": more and next_offset <= settings.LIST_MAX_OFFSET,
+        "next": next_offset,
+    })
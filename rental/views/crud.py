@@ -0,0 +1,672 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Min, Q
+from django.db.models.functions import Lower, Round
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.core.paginator import Paginator
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_POST
+
+from ..forms import CarForm, ClientForm, ContractForm, EmployeeForm
+from ..models import Branches, CarStatuses, Cars, ClientDuplicates, Clients, ContractStatuses, Contracts, Employees
+from .. import audit, dedup, holds, provisioning, versions
+from ..versions import conditional_on
+from .common import (
+    _bulk_delete,
+    _bulk_result,
+    _list_params,
+    _normalize_email,
+    _page_rows,
+    _parse_percent,
+    _rows_response,
+    _selected_ids,
+)
+
+
+def _cars_matching(request, search):
+    cars = Cars.objects.for_branch(request.branch_id).select_related("category", "status")
+    if search:
+        cars = cars.filter(
+            Q(plate__icontains=search) |
+            Q(vin__icontains=search) |
+            Q(brand__icontains=search) |
+            Q(model__icontains=search)
+        )
+    return cars.order_by("brand", "model", "car_id")
+
+
+@login_required
+@conditional_on(Cars)
+def car_list(request):
+    search, _, _ = _list_params(request)
+    cars, more = _page_rows(_cars_matching(request, search))
+    return render(request, "cars/car_list.html", {
+        "cars": cars,
+        "more": more,
+        "search": search,
+        "statuses": CarStatuses.objects.all(),
+        "branches": Branches.objects.all(),
+    })
+
+
+@login_required
+@conditional_on(Cars)
+def car_rows(request):
+    search, _, offset = _list_params(request)
+    cars, more = _page_rows(_cars_matching(request, search), offset)
+    return _rows_response(request, "cars/_car_rows.html", cars, more, offset)
+
+
+@login_required
+def car_add(request):
+    form = CarForm(request.POST or None, branch_id=request.branch_id)
+    if request.method == "POST" and form.is_valid():
+        audit.record(request, form.save(), audit.CREATE)
+        return redirect("car_list")
+    return render(request, "cars/car_form.html", {"form": form, "title": "Добавить авто"})
+
+
+@login_required
+def car_edit(request, pk):
+    car = get_object_or_404(Cars.objects.for_branch(request.branch_id), pk=pk)
+    before = audit.snapshot(car)
+    form = CarForm(request.POST or None, instance=car, branch_id=request.branch_id)
+    if request.method == "POST" and form.is_valid():
+        audit.record(request, form.save(), audit.UPDATE, before)
+        return redirect("car_list")
+    return render(request, "cars/car_form.html", {"form": form, "title": "Редактировать авто"})
+
+
+@login_required
+def car_delete(request, pk):
+    car = get_object_or_404(Cars.objects.for_branch(request.branch_id), pk=pk)
+    audit.record(request, car, audit.DELETE)
+    car.delete()
+    return redirect("car_list")
+
+
+def _record_bulk(request, model, queryset, action, before):
+    # before — snapshot_rows() в начале транзакции; после update() перечитываем теми же id
+    if action == "delete":
+        audit.record_rows(request, model, before, audit.DELETE)
+    else:
+        audit.record_rows(request, model, before, audit.UPDATE, audit.snapshot_rows(queryset))
+
+
+@login_required
+@require_POST
+def car_bulk(request):
+    ids = _selected_ids(request, Cars.objects.for_branch(request.branch_id))
+    action = request.POST.get("action", "")
+    if not ids:
+        messages.warning(request, "Не выбрано ни одного автомобиля")
+        return redirect("car_list")
+
+    cars = Cars.objects.filter(pk__in=ids)
+    try:
+        with transaction.atomic():
+            before = audit.snapshot_rows(cars.select_for_update())
+            if action == "delete":
+                affected = _bulk_delete(Cars, ids)
+            elif action == "status":
+                status = CarStatuses.objects.filter(pk=request.POST.get("status_id") or None).first()
+                if status is None:
+                    messages.error(request, "Выберите статус")
+                    return redirect("car_list")
+                affected = cars.update(status=status)
+            elif action == "branch":
+                branch = Branches.objects.filter(pk=request.POST.get("branch_id") or None).first()
+                if branch is None:
+                    messages.error(request, "Выберите филиал")
+                    return redirect("car_list")
+                affected = cars.update(branch=branch)
+            elif action == "price":
+                percent = _parse_percent(request.POST.get("percent"))
+                if percent is None:
+                    messages.error(request, "Процент изменения цены должен быть от -90 до 500")
+                    return redirect("car_list")
+                affected = cars.update(daily_price=Round(F("daily_price") * (100 + percent) / 100, 2))
+            else:
+                return HttpResponseBadRequest("Неизвестное действие")
+            _record_bulk(request, Cars, cars, action, before)
+            versions.bump(Cars)
+    except IntegrityError:
+        messages.error(request, "Часть автомобилей используется в договорах или ТО — ничего не удалено")
+        return redirect("car_list")
+
+    return _bulk_result(request, affected, "car_list")
+
+
+def _clients_matching(search, sort):
+    clients = Clients.objects.all()
+
+    if search:
+        clients = clients.filter(
+            Q(full_name__icontains=search) |
+            Q(passport__icontains=search) |
+            Q(phone__icontains=search) |
+            Q(email__icontains=search)
+        )
+
+    if sort == "name_desc":
+        return clients.order_by("-full_name", "-client_id")
+    return clients.order_by("full_name", "client_id")
+
+
+@login_required
+@conditional_on(Clients)
+def client_list(request):
+    search, sort, _ = _list_params(request)
+    clients, more = _page_rows(_clients_matching(search, sort))
+    return render(request, "clients/client_list.html", {
+        "clients": clients,
+        "more": more,
+        "search": search,
+        "sort": sort,
+    })
+
+
+@login_required
+@conditional_on(Clients)
+def client_rows(request):
+    search, sort, offset = _list_params(request)
+    clients, more = _page_rows(_clients_matching(search, sort), offset)
+    return _rows_response(request, "clients/_client_rows.html", clients, more, offset)
+
+
+@login_required
+def client_add(request):
+    form = ClientForm(request.POST or None)
+    if request.method == "POST" and form.is_valid():
+        audit.record(request, form.save(), audit.CREATE)
+        return redirect("client_list")
+    return render(request, "clients/client_form.html", {"form": form, "title": "Добавить клиента"})
+
+
+@login_required
+def client_edit(request, pk):
+    client = get_object_or_404(Clients, pk=pk)
+    before = audit.snapshot(client)
+    form = ClientForm(request.POST or None, instance=client)
+    if request.method == "POST" and form.is_valid():
+        audit.record(request, form.save(), audit.UPDATE, before)
+        return redirect("client_list")
+    return render(request, "clients/client_form.html", {"form": form, "title": "Редактировать клиента"})
+
+
+@login_required
+def client_delete(request, pk):
+    client = get_object_or_404(Clients, pk=pk)
+    audit.record(request, client, audit.DELETE)
+    client.delete()
+    return redirect("client_list")
+
+
+@login_required
+@require_POST
+def client_bulk(request):
+    ids = _selected_ids(request)
+    if not ids:
+        messages.warning(request, "Не выбрано ни одного клиента")
+        return redirect("client_list")
+    if request.POST.get("action") != "delete":
+        return HttpResponseBadRequest("Неизвестное действие")
+
+    try:
+        with transaction.atomic():
+            before = audit.snapshot_rows(Clients.objects.filter(pk__in=ids).select_for_update())
+            affected = _bulk_delete(Clients, ids)
+            _record_bulk(request, Clients, None, "delete", before)
+            versions.bump(Clients)
+    except IntegrityError:
+        messages.error(request, "У части клиентов есть договоры — ничего не удалено")
+        return redirect("client_list")
+
+    return _bulk_result(request, affected, "client_list")
+
+
+@login_required
+def client_duplicates(request):
+    pairs = (
+        ClientDuplicates.objects
+        .filter(status=ClientDuplicates.STATUS_NEW)
+        .select_related("client_a", "client_b")
+        .order_by("-score", "dup_id")
+    )
+    page = Paginator(pairs, 50).get_page(request.GET.get("page"))
+    return render(request, "clients/client_duplicates.html", {"page": page})
+
+
+@login_required
+@require_POST
+def client_duplicate_resolve(request, pk):
+    pair = get_object_or_404(ClientDuplicates, pk=pk)
+    action = request.POST.get("action", "")
+
+    if action == "dismiss":
+        pair.status = ClientDuplicates.STATUS_DISMISSED
+        pair.save(update_fields=["status"])
+        messages.info(request, "Пара отмечена как «не дубликат»")
+    elif action in ("keep_a", "keep_b"):
+        keep, drop = (pair.client_a_id, pair.client_b_id) if action == "keep_a" else (pair.client_b_id, pair.client_a_id)
+        moved = dedup.merge_clients(request, keep, drop)
+        messages.success(request, f"Клиенты объединены, перенесено договоров: {moved}")
+    else:
+        return HttpResponseBadRequest("Неизвестное действие")
+
+    return redirect("client_duplicates")
+
+
+# совпавших клиентов/машин не больше этого — договоры ищем по индексам client_id/car_id
+CONTRACT_SEARCH_MAX_IDS = 1000
+# первое окно по issue_date при частом совпадении; каждое следующее вдвое шире
+CONTRACT_SEARCH_FIRST_WINDOW_DAYS = 31
+
+
+def _contract_rows(request, search, sort, offset, limit):
+    # -> договоры списка [offset, offset + limit). ILIKE по ФИО/номеру планировщик оценивает
+    # в десятки строк, поэтому соединение с clients/cars по всем секциям contracts
+    # уходит в секунды; ищем так, чтобы запрос оставался ограниченным
+    descending = sort != "issue_asc"
+    order = ("-issue_date", "-contract_id") if descending else ("issue_date", "contract_id")
+    contracts = Contracts.objects.for_branch(request.branch_id).select_related("client", "car").order_by(*order)
+    if not search:
+        return list(contracts[offset:offset + limit])
+
+    client_ids = list(
+        Clients.objects.filter(full_name__icontains=search).values_list("pk", flat=True)[:CONTRACT_SEARCH_MAX_IDS + 1]
+    )
+    car_ids = list(
+        Cars.objects.filter(plate__icontains=search).values_list("pk", flat=True)[:CONTRACT_SEARCH_MAX_IDS + 1]
+    )
+    if len(client_ids) <= CONTRACT_SEARCH_MAX_IDS and len(car_ids) <= CONTRACT_SEARCH_MAX_IDS:
+        return list(contracts.filter(Q(client_id__in=client_ids) | Q(car_id__in=car_ids))[offset:offset + limit])
+
+    # частое совпадение: идём окнами по issue_date от края списка — каждое окно
+    # читает только свои секции, а нужные строки находятся в первых же окнах;
+    # окна, целиком попавшие в offset, только считаются, без загрузки строк
+    matching = contracts.filter(Q(client__full_name__icontains=search) | Q(car__plate__icontains=search))
+    bounds = Contracts.objects.aggregate(first=Min("issue_date"), last=Max("issue_date"))
+    if bounds["first"] is None:
+        return []
+    rows, skip, days = [], offset, CONTRACT_SEARCH_FIRST_WINDOW_DAYS
+    edge = bounds["last"] if descending else bounds["first"]
+    while len(rows) < limit and bounds["first"] <= edge <= bounds["last"]:
+        step = timedelta(days=days)
+        if descending:
+            window = matching.filter(issue_date__lte=edge, issue_date__gt=edge - step)
+            edge -= step
+        else:
+            window = matching.filter(issue_date__gte=edge, issue_date__lt=edge + step)
+            edge += step
+        found = window.count() if skip else None
+        if found is not None and found <= skip:
+            skip -= found
+        else:
+            rows += window[skip:skip + limit - len(rows)]
+            skip = 0
+        days *= 2
+    return rows
+
+
+def _contract_page(request, search, sort, offset):
+    limit = settings.LIST_PAGE_ROWS
+    rows = _contract_rows(request, search, sort, offset, limit + 1)
+    return rows[:limit], len(rows) > limit
+
+
+@login_required
+@conditional_on(Contracts, Clients, Cars)
+def contract_list(request):
+    search, sort, _ = _list_params(request)
+    contracts, more = _contract_page(request, search, sort, 0)
+    return render(request, "contracts/contract_list.html", {
+        "contracts": contracts,
+        "more": more,
+        "search": search,
+        "sort": sort,
+        "cstatuses": ContractStatuses.objects.all(),
+    })
+
+
+@login_required
+@conditional_on(Contracts, Clients, Cars)
+def contract_rows(request):
+    search, sort, offset = _list_params(request)
+    contracts, more = _contract_page(request, search, sort, offset)
+    return _rows_response(request, "contracts/_contract_rows.html", contracts, more, offset)
+
+
+@login_required
+def contract_add(request):
+    form = ContractForm(request.POST or None, branch_id=request.branch_id)
+    if request.method == "POST" and form.is_valid():
+        try:
+            contract = holds.book_contract(form, request.user)
+        except holds.HoldError as exc:
+            form.add_error(None, str(exc))
+        else:
+            audit.record(request, contract, audit.CREATE)
+            return redirect("contract_list")
+    return render(request, "contracts/contract_form.html", {
+        "form": form,
+        "title": "Добавить договор",
+        "hold_ttl": settings.CAR_HOLD_TTL_SECONDS,
+    })
+
+
+@login_required
+def contract_edit(request, pk):
+    contract = get_object_or_404(Contracts.objects.for_branch(request.branch_id), pk=pk)
+    before = audit.snapshot(contract)
+    form = ContractForm(request.POST or None, instance=contract, branch_id=request.branch_id)
+    if request.method == "POST" and form.is_valid():
+        try:
+            contract = holds.book_contract(form, request.user)
+        except holds.HoldError as exc:
+            form.add_error(None, str(exc))
+        else:
+            audit.record(request, contract, audit.UPDATE, before)
+            return redirect("contract_list")
+    return render(request, "contracts/contract_form.html", {
+        "form": form,
+        "title": "Редактировать договор",
+        "hold_ttl": settings.CAR_HOLD_TTL_SECONDS,
+    })
+
+
+@login_required
+def contract_quote(request):
+    # итог по правилам ценообразования для формы договора
+    # снимок парка (и numpy) грузится при первом запросе, а не при старте каждого воркера
+    from ..fleet import fleet
+    try:
+        start = date.fromisoformat(request.GET.get("issue_date", ""))
+        end = date.fromisoformat(request.GET.get("return_date", ""))
+        car = fleet.get(int(request.GET.get("car", "")), request.branch_id)
+    except ValueError:
+        return HttpResponseBadRequest("Неверные параметры расчёта")
+    if car is None:
+        raise Http404("Машина не найдена")
+    if end < start:
+        return HttpResponseBadRequest("Дата возврата не может быть раньше даты выдачи")
+
+    from ..pricing import quote
+    return JsonResponse({
+        "daily_price": car.daily_price,
+        "days": (end - start).days + 1,
+        "total_amount": quote(car, start, end),
+    })
+
+
+@login_required
+@require_POST
+def contract_hold(request):
+    # бронь машины на время заполнения формы; без машины — снять свою бронь
+    from ..fleet import fleet
+    car_id = request.POST.get("car") or ""
+    if not car_id:
+        holds.release_holds(request.user)
+        return JsonResponse({"ok": True})
+    try:
+        start = date.fromisoformat(request.POST.get("issue_date", ""))
+        end = date.fromisoformat(request.POST.get("return_date", ""))
+        car_id = int(car_id)
+        contract_id = int(request.POST["contract"]) if request.POST.get("contract") else None
+    except ValueError:
+        return HttpResponseBadRequest("Неверные параметры брони")
+    # наличие — по снимку парка; саму машину place_hold() всё равно блокирует в базе
+    if fleet.get(car_id, request.branch_id) is None:
+        return JsonResponse({"ok": False, "error": "Машина не найдена"}, status=404)
+
+    try:
+        hold = holds.place_hold(request.user, car_id, start, end, exclude_contract=contract_id)
+    except holds.HoldError as exc:
+        return JsonResponse({"ok": False, "error": str(exc)}, status=409)
+    return JsonResponse({"ok": True, "hold_id": hold.hold_id, "expires_at": hold.expires_at.isoformat()})
+
+
+@login_required
+def contract_delete(request, pk):
+    contract = get_object_or_404(Contracts.objects.for_branch(request.branch_id), pk=pk)
+    audit.record(request, contract, audit.DELETE)
+    contract.delete()
+    return redirect("contract_list")
+
+
+@login_required
+@require_POST
+def contract_bulk(request):
+    ids = _selected_ids(request, Contracts.objects.for_branch(request.branch_id))
+    action = request.POST.get("action", "")
+    if not ids:
+        messages.warning(request, "Не выбрано ни одного договора")
+        return redirect("contract_list")
+
+    contracts = Contracts.objects.filter(pk__in=ids)
+    with transaction.atomic():
+        before = audit.snapshot_rows(contracts.select_for_update())
+        if action == "delete":
+            affected = _bulk_delete(Contracts, ids)
+        elif action == "status":
+            cstatus = ContractStatuses.objects.filter(pk=request.POST.get("cstatus_id") or None).first()
+            if cstatus is None:
+                messages.error(request, "Выберите статус договора")
+                return redirect("contract_list")
+            affected = contracts.update(cstatus=cstatus)
+        else:
+            return HttpResponseBadRequest("Неизвестное действие")
+        _record_bulk(request, Contracts, contracts, action, before)
+        versions.bump(Contracts)
+
+    return _bulk_result(request, affected, "contract_list")
+
+
+def _employees_matching(request, search, sort):
+    employees = Employees.objects.for_branch(request.branch_id).select_related("role", "branch")
+
+    if search:
+        employees = employees.filter(
+            Q(full_name__icontains=search) |
+            Q(passport__icontains=search) |
+            Q(phone__icontains=search) |
+            Q(email__icontains=search)
+        )
+
+    if sort == "name_desc":
+        return employees.order_by("-full_name", "-employee_id")
+    return employees.order_by("full_name", "employee_id")
+
+
+@login_required
+@conditional_on(Employees)
+def employee_list(request):
+    search, sort, _ = _list_params(request)
+    employees, more = _page_rows(_employees_matching(request, search, sort))
+    return render(request, "employees/employee_list.html", {
+        "employees": employees,
+        "more": more,
+        "search": search,
+        "sort": sort,
+        "branches": Branches.objects.all(),
+    })
+
+
+@login_required
+@conditional_on(Employees)
+def employee_rows(request):
+    search, sort, offset = _list_params(request)
+    employees, more = _page_rows(_employees_matching(request, search, sort), offset)
+    return _rows_response(request, "employees/_employee_rows.html", employees, more, offset)
+
+
+@login_required
+def employee_add(request):
+    if not request.user.is_staff:
+        return HttpResponse(status=403)
+
+    form = EmployeeForm(request.POST or None)
+    if request.method == "POST" and form.is_valid():
+        employee = form.save()
+        audit.record(request, employee, audit.CREATE)
+        email = _normalize_email(employee.email)
+        password = form.cleaned_data.get("password") or ""
+
+        if not password:
+            form.add_error("password", "Пароль обязателен для создания пользователя")
+            return render(request, "employees/employee_form.html", {"form": form, "title": "Добавить сотрудника"})
+
+        is_staff = provisioning.is_staff_role(employee.role)
+
+        user, _ = User.objects.get_or_create(username=email, defaults={"email": email})
+        user.email = email
+        user.is_active = True
+        user.is_staff = is_staff
+        user.set_password(password)
+        user.save()
+
+        return redirect("employee_list")
+
+    return render(request, "employees/employee_form.html", {"form": form, "title": "Добавить сотрудника"})
+
+
+@login_required
+def employee_edit(request, pk):
+    if not request.user.is_staff:
+        return HttpResponse(status=403)
+
+    employee = get_object_or_404(Employees.objects.for_branch(request.branch_id), pk=pk)
+    old_email = _normalize_email(employee.email)
+    before = audit.snapshot(employee)
+
+    form = EmployeeForm(request.POST or None, instance=employee)
+    if request.method == "POST" and form.is_valid():
+        employee = form.save()
+        audit.record(request, employee, audit.UPDATE, before)
+        new_email = _normalize_email(employee.email)
+        password = (form.cleaned_data.get("password") or "").strip()
+
+        is_staff = provisioning.is_staff_role(employee.role)
+
+        if old_email != new_email:
+            User.objects.filter(username=old_email).delete()
+
+        user, _ = User.objects.get_or_create(username=new_email, defaults={"email": new_email})
+        user.email = new_email
+        user.is_active = True
+        user.is_staff = is_staff
+        if password:
+            user.set_password(password)
+        user.save()
+
+        return redirect("employee_list")
+
+    return render(request, "employees/employee_form.html", {"form": form, "title": "Редактировать сотрудника"})
+
+
+@login_required
+def employee_delete(request, pk):
+    if not request.user.is_staff:
+        return HttpResponse(status=403)
+
+    employee = get_object_or_404(Employees.objects.for_branch(request.branch_id), pk=pk)
+    User.objects.filter(username__iexact=_normalize_email(employee.email)).delete()
+    audit.record(request, employee, audit.DELETE)
+    employee.delete()
+    return redirect("employee_list")
+
+
+@login_required
+@require_POST
+def employee_bulk(request):
+    if not request.user.is_staff:
+        return HttpResponse(status=403)
+
+    ids = _selected_ids(request, Employees.objects.for_branch(request.branch_id))
+    action = request.POST.get("action", "")
+    if not ids:
+        messages.warning(request, "Не выбрано ни одного сотрудника")
+        return redirect("employee_list")
+
+    employees = Employees.objects.filter(pk__in=ids)
+    try:
+        with transaction.atomic():
+            before = audit.snapshot_rows(employees.select_for_update())
+            if action == "delete":
+                emails = {_normalize_email(e) for e in employees.values_list("email", flat=True)}
+                (
+                    User.objects
+                    .annotate(username_lower=Lower("username"))
+                    .filter(username_lower__in=emails)
+                    .delete()
+                )
+                affected = _bulk_delete(Employees, ids)
+            elif action == "branch":
+                branch = Branches.objects.filter(pk=request.POST.get("branch_id") or None).first()
+                if branch is None:
+                    messages.error(request, "Выберите филиал")
+                    return redirect("employee_list")
+                affected = employees.update(branch=branch)
+            else:
+                return HttpResponseBadRequest("Неизвестное действие")
+            _record_bulk(request, Employees, employees, action, before)
+            versions.bump(Employees)
+    except IntegrityError:
+        messages.error(request, "У части сотрудников есть записи о ТО — ничего не удалено")
+        return redirect("employee_list")
+
+    return _bulk_result(request, affected, "employee_list")
+
+
+@login_required
+def employee_import(request):
+    # загрузка сотрудников нового филиала из CSV: проверка по правилам EmployeeForm,
+    # затем все записи разом (пароли хешируются параллельно, см. rental/provisioning.py)
+    if not request.user.is_staff:
+        return HttpResponse(status=403)
+
+    context = {"columns": provisioning.COLUMNS, "errors": []}
+    if request.method == "POST":
+        upload = request.FILES.get("file")
+        if upload is None:
+            context["errors"] = [(None, "Выберите файл")]
+            return render(request, "employees/employee_import.html", context)
+        try:
+            rows = provisioning.read_csv(upload.read())
+        except (UnicodeDecodeError, ValueError) as exc:
+            message = "Файл должен быть в UTF-8" if isinstance(exc, UnicodeDecodeError) else str(exc)
+            context["errors"] = [(None, message)]
+            return render(request, "employees/employee_import.html", context)
+
+        forms, errors = provisioning.validate(rows)
+        if errors or not forms:
+            context["errors"] = errors or [(None, "В файле нет сотрудников")]
+            return render(request, "employees/employee_import.html", context)
+
+        try:
+            employees = provisioning.provision(forms)
+        except IntegrityError:
+            # кто-то успел завести такого же сотрудника между проверкой и вставкой
+            context["errors"] = [(None, "Часть сотрудников уже существует — никто не добавлен")]
+            return render(request, "employees/employee_import.html", context)
+        for employee in employees:
+            audit.record(request, employee, audit.CREATE)
+        messages.success(request, f"Добавлено сотрудников: {len(employees)}")
+        return redirect("employee_list")
+
+    return render(request, "employees/employee_import.html", context)
+
+
+@login_required
+@conditional_on(Cars)
+def get_car_price(request, car_id):
+    from ..fleet import fleet
+    car = fleet.get(car_id, request.branch_id)
+    if car is None:
+        raise Http404("Машина не найдена")
+    return JsonResponse({"daily_price": float(car.daily_price)})
@@ -0,0 +1,269 @@
+import asyncio
+import csv
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.urls import reverse
+
+from .. import kpis
+from ..db_routers import read_from_replica
+from ..live import hub
+from ..models import Cars, Clients, Contracts
+from ..versions import conditional_on
+
+
+@login_required
+@conditional_on(Cars, Clients, Contracts, per_day=True)
+@read_from_replica
+def dashboard_home(request):
+    return render(request, "dashboard_home.html", {
+        **kpis.cached_snapshot(request.branch_id),
+        "live_url": reverse("dashboard_stream"),
+    })
+
+
+async def dashboard_stream(request):
+    # Server-Sent Events для главной: сначала полный снимок, затем только изменившиеся
+    # показатели. Пересчёт — один на филиал в rental/live.py, а не на каждую вкладку.
+    if not await sync_to_async(lambda: request.user.is_authenticated)():
+        return HttpResponse(status=401)
+    if not hasattr(request, "scope"):
+        # под WSGI поток занял бы рабочий процесс целиком; 204 — EventSource не переподключается
+        return HttpResponse(status=204)
+
+    branch_id = request.branch_id
+
+    async def events():
+        queue, snapshot = await hub.subscribe(branch_id)
+        loop = asyncio.get_running_loop()
+        # Django 4.2 не замечает отключение клиента, поэтому поток ограничен по времени;
+        # браузер переподключится сам через retry
+        deadline = loop.time() + settings.LIVE_STREAM_MAX_SECONDS
+        try:
+            yield f"retry: {settings.LIVE_RETRY_MS}\n" + _sse("snapshot", snapshot)
+            while loop.time() < deadline:
+                try:
+                    delta = await asyncio.wait_for(queue.get(), timeout=settings.LIVE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if delta is None:
+                    break
+                yield _sse("kpi", delta)
+        finally:
+            hub.unsubscribe(branch_id, queue)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@login_required
+@conditional_on(Contracts)
+@read_from_replica
+def dashboard_contracts(request):
+    qs = (
+        Contracts.objects.for_branch(request.branch_id)
+        .annotate(month=TruncMonth("issue_date"))
+        .values("month")
+        .annotate(cnt=Count("contract_id"))
+        .order_by("month")
+    )
+
+    labels = [q["month"].strftime("%m.%Y") for q in qs]
+    values = [q["cnt"] for q in qs]
+
+    return render(request, "dashboard_single.html", {
+        "title": "Количество договоров по месяцам",
+        "chart_type": "line",
+        "labels": json.dumps(labels),
+        "values": json.dumps(values),
+        "dataset_label": "Договоры",
+        "fill_area": True,
+    })
+
+@login_required
+@conditional_on(Contracts)
+@read_from_replica
+def dashboard_revenue(request):
+    qs = (
+        Contracts.objects.for_branch(request.branch_id)
+        .annotate(month=TruncMonth("issue_date"))
+        .values("month")
+        .annotate(sum=Sum("total_amount"))
+        .order_by("month")
+    )
+
+    labels = [q["month"].strftime("%m.%Y") for q in qs]
+    values = [float(q["sum"]) for q in qs]
+
+    return render(request, "dashboard_single.html", {
+        "title": "Выручка по месяцам",
+        "chart_type": "bar",
+        "labels": json.dumps(labels),
+        "values": json.dumps(values),
+        "dataset_label": "Выручка ₽",
+        "fill_area": False,
+    })
+
+@login_required
+@conditional_on(Contracts)
+@read_from_replica
+def dashboard_avgcheck(request):
+    qs = (
+        Contracts.objects.for_branch(request.branch_id)
+        .annotate(month=TruncMonth("issue_date"))
+        .values("month")
+        .annotate(avg=Sum("total_amount") / Count("contract_id"))
+        .order_by("month")
+    )
+
+    labels = [q["month"].strftime("%m.%Y") for q in qs]
+    values = [float(q["avg"]) for q in qs]
+
+    return render(request, "dashboard_single.html", {
+        "title": "Средний чек по месяцам",
+        "chart_type": "line",
+        "labels": json.dumps(labels),
+        "values": json.dumps(values),
+        "dataset_label": "Средний чек ₽",
+        "fill_area": True,
+    })
+
+
+@login_required
+@conditional_on(Cars)
+@read_from_replica
+def dashboard_categories(request):
+    qs = (
+        Cars.objects.for_branch(request.branch_id)
+        .values("category__name")
+        .annotate(cnt=Count("car_id"))
+    )
+
+    labels = [q["category__name"] for q in qs]
+    values = [q["cnt"] for q in qs]
+
+    return render(request, "dashboard_single.html", {
+        "title": "Распределение автомобилей по категориям",
+        "chart_type": "pie",
+        "labels": json.dumps(labels),
+        "values": json.dumps(values),
+        "labels_list": labels,
+        "dataset_label": "Авто",
+        "fill_area": False,
+    })
+
+
+@login_required
+@conditional_on(Contracts, Cars)
+@read_from_replica
+def dashboard_topcars(request):
+    qs = (
+        Contracts.objects.for_branch(request.branch_id)
+        .values("car__brand", "car__model", "car__plate")
+        .annotate(sum=Sum("total_amount"))
+        .order_by("-sum")[:5]
+    )
+
+    labels = [
+        f'{q["car__brand"]} {q["car__model"]} ({q["car__plate"]})'
+        for q in qs
+    ]
+    values = [float(q["sum"]) for q in qs]
+
+    return render(request, "dashboard_single.html", {
+        "title": "Автомобили с наибольшей выручкой",
+        "chart_type": "bar",
+        "labels": json.dumps(labels),
+        "values": json.dumps(values),
+        "dataset_label": "Выручка ₽",
+        "fill_area": False,
+    })
+
+
+def _cohort_months(request, default=12):
+    try:
+        return max(1, min(int(request.GET.get("months", default)), 120))
+    except ValueError:
+        return default
+
+
+@login_required
+@conditional_on(Contracts)
+@read_from_replica
+def dashboard_cohorts(request):
+    # numpy нужен только аналитике — не тянем его при старте остальных страниц
+    from ..cohorts import cohort_analysis
+
+    data = cohort_analysis(request.branch_id)
+    months = _cohort_months(request)
+    rows = []
+    ltv_curve = []
+    if data:
+        width = min(months, data["retention"].shape[1])
+        for label, size, retention, ltv in zip(data["labels"], data["sizes"], data["retention"], data["ltv"]):
+            rows.append({
+                "label": label,
+                "size": int(size),
+                # (процент, прозрачность ячейки тепловой карты)
+                "retention": [(round(float(v) * 100, 1), round(float(v), 2)) for v in retention[:width]],
+                "ltv": round(float(ltv[width - 1]), 2),
+            })
+        # средний LTV по всем когортам, взвешенный размером когорты
+        sizes = data["sizes"].astype(float)
+        ltv_curve = [round(float((data["ltv"][:, i] * sizes).sum() / sizes.sum()), 2) for i in range(width)]
+
+    return render(request, "dashboard_cohorts.html", {
+        "title": "Когорты клиентов и LTV",
+        "data": data,
+        "rows": rows,
+        "months": months,
+        "offsets": range(len(ltv_curve)),
+        "ltv_labels": json.dumps([f"+{i} мес." for i in range(len(ltv_curve))]),
+        "ltv_values": json.dumps(ltv_curve),
+    })
+
+
+@login_required
+@conditional_on(Contracts)
+@read_from_replica
+def dashboard_cohorts_csv(request):
+    from ..cohorts import cohort_analysis
+
+    data = cohort_analysis(request.branch_id)
+    response = HttpResponse(content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = 'attachment; filename="cohorts.csv"'
+    writer = csv.writer(response, delimiter=";")
+    if not data:
+        return response
+
+    width = data["retention"].shape[1]
+    writer.writerow(
+        ["Когорта", "Клиентов"]
+        + [f"Удержание +{i}" for i in range(width)]
+        + [f"LTV +{i}" for i in range(width)]
+    )
+    for label, size, retention, ltv in zip(data["labels"], data["sizes"], data["retention"], data["ltv"]):
+        writer.writerow(
+            [label, int(size)]
+            + [f"{v:.4f}" for v in retention]
+            + [f"{v:.2f}" for v in ltv]
+        )
+    return response
+
+
+@login_required
+def statistics_page(request):
+    return render(request, "statistics.html")
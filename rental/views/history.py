@@ -0,0 +1,39 @@
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import Http404, HttpResponse
+from django.shortcuts import render
+
+from ..models import AuditLog, Cars, Clients, Contracts, Employees
+
+AUDITED_MODELS = {
+    "cars": (Cars, "Автомобиль"),
+    "clients": (Clients, "Клиент"),
+    "contracts": (Contracts, "Договор"),
+    "employees": (Employees, "Сотрудник"),
+}
+
+
+@login_required
+def audit_history(request, table, pk):
+    # история одного объекта по индексу audit_log (table_name, object_id, changed_at DESC)
+    if not request.user.is_staff:
+        return HttpResponse(status=403)
+    if table not in AUDITED_MODELS:
+        raise Http404("Для этой таблицы журнал не ведётся")
+    model, title = AUDITED_MODELS[table]
+
+    labels = {field.attname: str(field.verbose_name) for field in model._meta.concrete_fields}
+    entries = (
+        AuditLog.objects
+        .filter(table_name=table, object_id=pk)
+        .select_related("user")
+        .order_by("-changed_at", "-audit_id")
+    )
+    page = Paginator(entries, 50).get_page(request.GET.get("page"))
+    for entry in page:
+        entry.rows = [(labels.get(name, name), old, new) for name, (old, new) in sorted(entry.changes.items())]
+
+    return render(request, "audit_history.html", {
+        "page": page,
+        "title": f"{title} #{pk}",
+    })
@@ -0,0 +1,387 @@
+import contextvars
+import hashlib
+import io
+import math
+import os
+import threading
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.http import FileResponse, HttpResponse, HttpResponseBadRequest
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils.timezone import now
+
+from ..counts import estimated_count
+from ..db_routers import read_from_replica
+from .. import report_cache
+from ..forms import CarReportForm, ContractReportForm
+from ..models import Branches, CarCategories, CarStatuses, Cars, Clients, ContractStatuses, Contracts
+from .common import _normalize_email
+
+# печатная форма меняется только вместе с данными договора, ключ — хеш содержимого
+CONTRACT_PDF_CACHE_SECONDS = 24 * 3600
+
+
+# таблицы, из которых печатается отчёт (включая справочники в карточках и в строке фильтров):
+# их версии входят в ключ готового PDF в report_cache
+CONTRACT_REPORT_MODELS = (Contracts, Cars, Clients, Branches, ContractStatuses, CarCategories)
+CARS_REPORT_MODELS = (Cars, Branches, CarStatuses, CarCategories)
+
+# карточек на страницу A4 в generate_contract_report / generate_cars_report — для оценки объёма
+CONTRACTS_PER_PAGE = 4
+CARS_PER_PAGE = 5
+
+
+@login_required
+@read_from_replica
+def reports_page(request):
+    # у каждого отчёта своя форма параметров; объём считается до рендера,
+    # по тому же queryset, что потом уйдёт в PDF
+    selected = request.GET.get("report")
+    cards = []
+    for key, report in REPORTS.items():
+        data = request.GET if key == selected else {}
+        form = report["form"](data, branch_id=request.branch_id)
+        card = {"key": key, "title": report["title"], "note": report["note"], "form": form}
+        if form.is_valid():
+            rows = estimated_count(form.filter(report["model"].objects.for_branch(request.branch_id)))
+            card["rows"] = rows
+            card["pages"] = max(1, math.ceil(rows / report["per_page"]))
+            params = form.params()
+            card["download"] = reverse(report["url"]) + ("?" + urlencode(params) if params else "")
+        cards.append(card)
+    return render(request, "reports.html", {"cards": cards, "selected": selected})
+
+
+def _register_font(pdf):
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    # разбор TTF стоит десятки миллисекунд — регистрируем шрифт один раз на процесс
+    if "DejaVu" not in pdfmetrics.getRegisteredFontNames():
+        font_path = os.path.join(settings.BASE_DIR, "rental", "static", "fonts", "DejaVuSans.ttf")
+        pdfmetrics.registerFont(TTFont("DejaVu", font_path))
+    pdf.setFont("DejaVu", 11)
+
+
+def _contract_status_text(contract: Contracts) -> str:
+    today = now().date()
+    db_status = (getattr(contract.cstatus, "status", "") or "").strip().lower()
+
+    if any(x in db_status for x in ["закры", "заверш", "окончен"]):
+        return "ДОГОВОР ЗАКРЫТ"
+    if contract.return_date and contract.return_date < today:
+        return "ДОГОВОР ЗАВЕРШЁН"
+    return "ДОГОВОР АКТИВЕН"
+
+
+def _report_form(form_class, branch_id, params):
+    # параметры уже проверены во view; в потоке рендера форма собирается заново из строк
+    form = form_class(params or {}, branch_id=branch_id)
+    if not form.is_valid():
+        raise ValueError(form.errors.as_text())
+    return form
+
+
+def _draw_params(pdf, width, y, form):
+    summary = form.summary()
+    if not summary:
+        return y
+    pdf.setFont("DejaVu", 9)
+    pdf.drawCentredString(width / 2, y, summary)
+    pdf.setFont("DejaVu", 11)
+    return y - 20
+
+
+@read_from_replica
+def generate_contract_report(path: str, branch_id=None, params=None):
+    # reportlab грузится только при построении отчёта, а не при старте каждого воркера
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    pdf = canvas.Canvas(path, pagesize=A4)
+    _register_font(pdf)
+
+    width, height = A4
+    y = height - 40
+
+    pdf.drawCentredString(width / 2, y, "ОТЧЁТ ПО ДОГОВОРАМ АРЕНДЫ")
+    y -= 25
+    pdf.setFont("DejaVu", 9)
+    pdf.drawCentredString(width / 2, y, f"Сформировано: {now().strftime('%d.%m.%Y %H:%M')}")
+    pdf.setFont("DejaVu", 11)
+    y -= 25
+    form = _report_form(ContractReportForm, branch_id, params)
+    y = _draw_params(pdf, width, y, form)
+
+    contracts = (
+        form.filter(Contracts.objects.for_branch(branch_id))
+        .select_related("client", "car", "issue_branch", "return_branch", "cstatus")
+        .order_by("-issue_date")
+    )
+
+    if not contracts.exists():
+        pdf.drawString(40, y, "Договоры отсутствуют")
+        pdf.save()
+        return
+
+    for c in contracts:
+        if y < 190:
+            pdf.showPage()
+            _register_font(pdf)
+            y = height - 40
+
+        status_text = _contract_status_text(c)
+
+        pdf.roundRect(35, y - 160, width - 70, 160, 10)
+
+        pdf.setFont("DejaVu", 10)
+        pdf.drawString(45, y - 18, f"ДОГОВОР № {c.contract_id}")
+        pdf.drawRightString(width - 45, y - 18, status_text)
+        pdf.line(45, y - 26, width - 45, y - 26)
+
+        pdf.setFont("DejaVu", 11)
+        ty = y - 45
+
+        pdf.drawString(45, ty, f"Клиент: {c.client.full_name}")
+        ty -= 16
+
+        pdf.drawString(
+            45, ty,
+            f"Авто: {c.car.brand} {c.car.model}   |   Гос. номер: {c.car.plate}"
+        )
+        ty -= 16
+
+        pdf.drawString(45, ty, f"VIN: {c.car.vin}")
+        ty -= 16
+
+        pdf.drawString(
+            45, ty,
+            f"Период: {c.issue_date.strftime('%d.%m.%Y')} — {c.return_date.strftime('%d.%m.%Y')}"
+        )
+        ty -= 16
+
+        pdf.drawString(45, ty, f"Филиал выдачи: {c.issue_branch.name}")
+        ty -= 14
+        pdf.drawString(45, ty, f"Филиал возврата: {c.return_branch.name}")
+        ty -= 16
+
+        pdf.drawString(
+            45, ty,
+            f"Оплата: {c.payment}   |   Статус БД: {c.cstatus.status}"
+        )
+        ty -= 16
+
+        pdf.drawString(
+            45, ty,
+            f"Цена/сутки: {c.daily_price} ₽   |   Итог: {c.total_amount} ₽"
+        )
+
+        y -= 180
+
+    pdf.save()
+
+
+def _render_in_thread(generate, path, branch_id, params):
+    t = threading.Thread(target=contextvars.copy_context().run, args=(generate, path, branch_id, params))
+    t.start()
+    t.join()
+
+
+def _cache_params(params, branch_id, day):
+    # branch в params — фильтр из формы отчёта, scope — филиал пользователя (BranchScopeMiddleware)
+    return {**params, "scope": branch_id, "day": day.isoformat()}
+
+
+def _cached_report(request, kind, generate, models, form_class):
+    form = form_class(request.GET, branch_id=request.branch_id)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    params = form.params()
+    # тот же отчёт по неизменившимся данным отдаётся с диска без повторного рендера;
+    # день в ключе — статусы «завершён/активен» зависят от сегодняшней даты
+    path = report_cache.get_or_render(
+        kind,
+        _cache_params(params, request.branch_id, now().date()),
+        models,
+        lambda tmp_path: _render_in_thread(generate, tmp_path, request.branch_id, params),
+    )
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=f"{kind}.pdf", content_type="application/pdf")
+
+
+@login_required
+def report_contracts(request):
+    return _cached_report(
+        request, "report_contracts", generate_contract_report, CONTRACT_REPORT_MODELS, ContractReportForm
+    )
+
+
+def _agreement_lines(c: Contracts):
+    # всё, что печатается в договоре; по этим строкам считается ключ кеша
+    car, client = c.car, c.client
+    return [
+        ("title", f"ДОГОВОР АРЕНДЫ АВТОМОБИЛЯ № {c.contract_id}"),
+        ("subtitle", f"от {c.created_at.strftime('%d.%m.%Y')}   ·   {_contract_status_text(c)}"),
+        ("section", "Арендодатель"),
+        ("text", f"Филиал: {c.issue_branch.name}"),
+        ("text", f"Адрес: {c.issue_branch.address}"),
+        ("text", f"Контакты: {c.issue_branch.contacts}"),
+        ("section", "Арендатор"),
+        ("text", f"ФИО: {client.full_name}"),
+        ("text", f"Дата рождения: {client.birth_date.strftime('%d.%m.%Y')}"),
+        ("text", f"Паспорт: {client.passport}   |   ВУ: {client.dl_number}"),
+        ("text", f"Телефон: {client.phone}   |   Email: {client.email}"),
+        ("text", f"Адрес: {client.address}"),
+        ("section", "Автомобиль"),
+        ("text", f"{car.brand} {car.model}, {car.year_made} г."),
+        ("text", f"Гос. номер: {car.plate}   |   VIN: {car.vin}"),
+        ("text", f"Пробег при выдаче: {car.mileage} км"),
+        ("section", "Условия аренды"),
+        ("text", f"Период: {c.issue_date.strftime('%d.%m.%Y')} — {c.return_date.strftime('%d.%m.%Y')}"),
+        ("text", f"Филиал возврата: {c.return_branch.name}"),
+        ("text", f"Цена за сутки: {c.daily_price} ₽"),
+        ("text", f"Итого к оплате: {c.total_amount} ₽   |   Оплата: {c.payment}"),
+    ]
+
+
+def _render_agreement(lines) -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    _register_font(pdf)
+    width, height = A4
+    y = height - 50
+
+    for kind, text in lines:
+        if kind == "title":
+            pdf.setFont("DejaVu", 14)
+            pdf.drawCentredString(width / 2, y, text)
+            y -= 20
+        elif kind == "subtitle":
+            pdf.setFont("DejaVu", 10)
+            pdf.drawCentredString(width / 2, y, text)
+            y -= 30
+        elif kind == "section":
+            y -= 8
+            pdf.setFont("DejaVu", 11)
+            pdf.drawString(45, y, text.upper())
+            pdf.line(45, y - 5, width - 45, y - 5)
+            y -= 22
+        else:
+            pdf.setFont("DejaVu", 10)
+            pdf.drawString(55, y, text)
+            y -= 16
+
+    y -= 50
+    pdf.setFont("DejaVu", 10)
+    pdf.drawString(45, y, "Арендодатель: ____________________")
+    pdf.drawRightString(width - 45, y, "Арендатор: ____________________")
+
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+@login_required
+def contract_pdf(request, pk):
+    contract = get_object_or_404(
+        Contracts.objects.for_branch(request.branch_id)
+        .select_related("client", "car", "issue_branch", "return_branch", "cstatus"),
+        pk=pk,
+    )
+    lines = _agreement_lines(contract)
+    key = "contract_pdf:" + hashlib.sha1(repr(lines).encode()).hexdigest()
+    content = cache.get(key)
+    if content is None:
+        content = _render_agreement(lines)
+        cache.set(key, content, CONTRACT_PDF_CACHE_SECONDS)
+
+    response = HttpResponse(content, content_type="application/pdf")
+    response["Content-Disposition"] = f'inline; filename="contract_{contract.contract_id}.pdf"'
+    return response
+
+
+@read_from_replica
+def generate_cars_report(path: str, branch_id=None, params=None):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    pdf = canvas.Canvas(path, pagesize=A4)
+    _register_font(pdf)
+
+    width, height = A4
+    y = height - 40
+
+    pdf.drawCentredString(width / 2, y, "ОТЧЁТ ПО АВТОМОБИЛЯМ")
+    y -= 25
+    pdf.setFont("DejaVu", 9)
+    pdf.drawCentredString(width / 2, y, f"Сформировано: {now().strftime('%d.%m.%Y %H:%M')}")
+    pdf.setFont("DejaVu", 11)
+    y -= 25
+    form = _report_form(CarReportForm, branch_id, params)
+    y = _draw_params(pdf, width, y, form)
+
+    cars = form.filter(Cars.objects.for_branch(branch_id)).select_related("category", "status", "branch").order_by("brand", "model", "plate")
+
+    if not cars.exists():
+        pdf.drawString(40, y, "Автомобили отсутствуют")
+        pdf.save()
+        return
+
+    for car in cars:
+        if y < 165:
+            pdf.showPage()
+            _register_font(pdf)
+            y = height - 40
+
+        free_label = "СВОБОДЕН/ДОСТУПЕН" if (_normalize_email(car.status.status).lower() in ["свободен", "доступен"]) else car.status.status
+
+        pdf.roundRect(35, y - 135, width - 70, 135, 10)
+        pdf.setFont("DejaVu", 10)
+        pdf.drawString(45, y - 18, f"{car.brand} {car.model}")
+        pdf.drawRightString(width - 45, y - 18, f"Статус: {free_label}")
+        pdf.line(45, y - 26, width - 45, y - 26)
+
+        pdf.setFont("DejaVu", 11)
+        ty = y - 45
+        pdf.drawString(45, ty, f"Гос. номер: {car.plate}   |   VIN: {car.vin}")
+        ty -= 16
+        pdf.drawString(45, ty, f"Категория: {car.category.name}   |   Филиал: {car.branch.name}")
+        ty -= 16
+        pdf.drawString(45, ty, f"Год: {car.year_made}   |   Пробег: {car.mileage} км")
+        ty -= 16
+        pdf.drawString(45, ty, f"Цена за сутки: {car.daily_price} ₽")
+
+        y -= 155
+
+    pdf.save()
+
+
+@login_required
+def report_cars(request):
+    return _cached_report(request, "report_cars", generate_cars_report, CARS_REPORT_MODELS, CarReportForm)
+
+
+REPORTS = {
+    "contracts": {
+        "title": "📄 Договоры аренды",
+        "note": "Отчёт по договорам",
+        "url": "report_contracts",
+        "form": ContractReportForm,
+        "model": Contracts,
+        "per_page": CONTRACTS_PER_PAGE,
+    },
+    "cars": {
+        "title": "🚗 Автомобили",
+        "note": "Список автомобилей",
+        "url": "report_cars",
+        "form": CarReportForm,
+        "model": Cars,
+        "per_page": CARS_PER_PAGE,
+    },
+}